@@ -14,7 +14,6 @@ import argparse
 import re
 
 import metrics_knowledge_base
-from libs.nationalities.nat_loader import NatLoader
 
 
 # KB struct variable
@@ -25,7 +24,6 @@ KB_MULTIVALUE_DELIM = metrics_knowledge_base.KB_MULTIVALUE_DELIM
 
 args = None
 name_typeflag = []
-nationalities = []
 
 def extract_names_from_line(line):
     names = kb_struct.get_data_for(line, 'ALIASES').split(KB_MULTIVALUE_DELIM)
@@ -103,7 +101,6 @@ if __name__ == "__main__":
     parser.add_argument('-l', '--lang', help = 'Language to process.')
     args = parser.parse_args()
 
-    nationalities = NatLoader.load(args.lang).get_nationalities()
     kb_struct =  metrics_knowledge_base.KnowledgeBase(lang = args.lang, path_to_kb = args.kb_path)
     kb_struct.check_or_load_kb()
 
@@ -41,7 +41,7 @@ class Namelist(ABC):
     def __init__(self, lang: str) -> None:
         self._lang = lang
 
-        self._ntokb = NatLoader.load(lang)
+        self._ntokb = NatLoader.get(lang)
         self._persons = EntityLoader.load(
             module="persons", lang=lang, initiate="Persons"
         )
@@ -140,7 +140,8 @@ def autocomplete(dictionary, input_str, max_entity_count=5, remove_accent=False,
 		return
 
 	seek_names = figa.marker(True, False, True, max_entity_count, return_all)
-	seek_names.load_dict(dictionary)
+	# mapped read-only, so that each call does not read the whole automata again
+	seek_names.load_dict(dictionary, True)
 
 	if remove_accent:
 		input_str = to_remove_accent(input_str)
@@ -1,3 +1,13 @@
+#include <atomic>
+#include <exception>
+#include <mutex>
+#include <thread>
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
 #include "figa.h"
 
 marker::marker(bool print_bool, bool over, bool autocom, int m,
@@ -19,34 +29,141 @@ std::vector<std::string> marker::split_lines(std::string str)
 	return ret;
 }
 
-bool marker::load_dict(std::string dict_file_name)
+figa_automata::~figa_automata()
+{
+	unmap_dict();
+}
+
+/* mapped - automat se namapuje do pameti jen pro cteni misto nacteni
+ * na haldu, takze ho sdili vsechny procesy (pres page cache) a nacteni
+ * je temer okamzite; soubor se behem pouzivani nesmi prepsat */
+bool figa_automata::load(std::string dict_file_name, bool mapped)
 {
         if (figa_cedar::checkFileNameForDictType(dict_file_name.c_str(), cedar))
 		return false;
 
+	unmap_dict();
+	if (mapped)
+		return map_dict(dict_file_name);
+
 	if (cedar)
 		return dict_cedar.open(dict_file_name.c_str()) ? false : true;
 	else
 		return dict_darts.open(dict_file_name.c_str()) ? false : true;
 }
 
+bool figa_automata::map_dict(std::string dict_file_name)
+{
+	struct stat st;
+	std::size_t unit_size = cedar ? sizeof(dict_type_cedar::node) : dict_darts.unit_size();
+	int fd = open(dict_file_name.c_str(), O_RDONLY);
+
+	if (fd < 0)
+		return false;
+	if (fstat(fd, &st) != 0 || st.st_size == 0 || st.st_size % unit_size != 0
+		|| (!cedar && (st.st_size / unit_size) % 256 != 0)) {
+		close(fd);
+		return false;
+	}
+
+	void *data = mmap(NULL, st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+	close(fd);
+	if (data == MAP_FAILED)
+		return false;
+
+	mapped_dict = data;
+	mapped_size = st.st_size;
+	if (cedar)
+		dict_cedar.set_array(mapped_dict, mapped_size / unit_size);
+	else
+		dict_darts.set_array(mapped_dict, mapped_size / unit_size);
+
+	return true;
+}
+
+void figa_automata::unmap_dict()
+{
+	if (mapped_dict) {
+		/* automaty uz na namapovanou pamet nesmi odkazovat */
+		dict_cedar.clear();
+		dict_darts.clear();
+		munmap(mapped_dict, mapped_size);
+		mapped_dict = NULL;
+		mapped_size = 0;
+	}
+}
+
+/* Vyhledava v textu pomoci kopie nastaveni (scanner), ktera urcuje,
+ * kam se vysledky ulozi. Slovnik se pri vyhledavani nemeni, proto muze
+ * vice vlaken vyhledavat soucasne (kazde s vlastni kopii nastaveni). */
+void figa_automata::lookup(figa_cedar &scanner, std::istream &input)
+{
+	scanner.fold = fold;
+	if (cedar)
+		scanner.KBlookup<dict_type_cedar>(dict_cedar, input);
+	else
+		scanner.KBlookup<dict_type_darts>(dict_darts, input);
+}
+
+/* Vyhledava v jiz rozdelenych slovech (viz figa_cedar::tokenize) */
+void figa_automata::lookup(figa_cedar &scanner, const std::vector<figa_cedar::t_context> &words)
+{
+	scanner.fold = fold;
+	if (cedar)
+		scanner.KBlookup<dict_type_cedar>(dict_cedar, words);
+	else
+		scanner.KBlookup<dict_type_darts>(dict_darts, words);
+}
+
+/* Nacte automat (predchozi automaty se zahodi), vsechna vyhledavani
+ * krome lookup_variants() pouzivaji jen tento automat;
+ * fold - slova textu se pred vyhledanim prevedou na mala pismena
+ * (FOLD_LOWERCASE) a/nebo bez diakritiky (FOLD_NONACCENT) stejne jako
+ * jmena v automatu, offsety a fragmenty zustanou z puvodniho textu */
+bool marker::load_dict(std::string dict_file_name, bool mapped, int fold)
+{
+	automata.clear();
+	automata.emplace_back(0, fold);
+	if (!automata.back().load(dict_file_name, mapped)) {
+		automata.clear();
+		return false;
+	}
+
+	return true;
+}
+
+/* Prida dalsi automat (variantu, napr. AutomataVariants.LOWERCASE),
+ * shody z nej vraci lookup_variants() oznacene cislem variant */
+bool marker::add_dict(std::string dict_file_name, int variant, bool mapped, int fold)
+{
+	automata.emplace_back(variant, fold);
+	if (!automata.back().load(dict_file_name, mapped)) {
+		automata.pop_back();
+		return false;
+	}
+
+	return true;
+}
+
+void marker::_lookup(figa_cedar &scanner, std::istream &input)
+{
+	if (!automata.empty())
+		automata.front().lookup(scanner, input);
+}
+
 std::string marker::_lookup_string(std::string input_string)
 {
 	std::stringstream buffer;
-	std::streambuf *old_sbuf;
 	std::istringstream ss(input_string);
+	figa_cedar scanner(*this);
 
-	/* Presmerovani vystupu do streamu, abychom
-	 * mohli vratit vysledek jako retezec, jelikoz
-	 * KBlookup tiskne vysledky na stdout */
-	old_sbuf = std::cout.rdbuf(buffer.rdbuf());
-	if (cedar)
-		KBlookup<dict_type_cedar>(dict_cedar, ss);
-	else
-		KBlookup<dict_type_darts>(dict_darts, ss);
-	std::cout.rdbuf(old_sbuf);
+	/* KBlookup tiskne vysledky do vlastniho streamu
+	 * (misto presmerovani std::cout, ktere sdili vsechna vlakna) */
+	scanner.out = &buffer;
+	scanner.matches = NULL;
+	_lookup(scanner, ss);
 
-        return buffer.str();
+	return buffer.str();
 }
 
 std::string marker::lookup_string(std::string input_string)
@@ -66,6 +183,91 @@ std::string marker::lookup_string(std::string input_string)
 	return ret;
 }
 
+/* Vraci vysledky jako struktury (bez presmerovani std::cout
+ * a bez formatovani a naslednho parsovani textoveho vystupu) */
+std::vector<figa_cedar::t_match> marker::lookup_matches(std::string input_string)
+{
+	std::vector<t_match> ret;
+	std::istringstream ss(input_string);
+	figa_cedar scanner(*this);
+
+	scanner.matches = &ret;
+	_lookup(scanner, ss);
+
+	return ret;
+}
+
+/* Vyhleda entity ve vice textech soucasne pomoci vlaken (threads = 0
+ * znamena pocet jader), vysledky jsou ve stejnem poradi jako texty */
+std::vector<std::vector<figa_cedar::t_match> > marker::lookup_matches_batch(std::vector<std::string> input_strings, unsigned int threads)
+{
+	std::vector<std::vector<t_match> > ret(input_strings.size());
+	std::vector<std::thread> workers;
+	std::atomic<std::size_t> next(0);
+	std::exception_ptr error;
+	std::mutex error_mutex;
+
+	if (threads == 0)
+		threads = std::max(1u, std::thread::hardware_concurrency());
+	threads = std::min<std::size_t>(threads, input_strings.size());
+
+	auto work = [&]() {
+		try {
+			for (std::size_t i = next++; i < input_strings.size(); i = next++) {
+				std::istringstream ss(input_strings[i]);
+				figa_cedar scanner(*this);
+
+				scanner.matches = &ret[i];
+				_lookup(scanner, ss);
+			}
+		} catch (...) {
+			std::lock_guard<std::mutex> lock(error_mutex);
+			if (!error)
+				error = std::current_exception();
+		}
+	};
+
+	if (threads <= 1) {
+		work();
+	} else {
+		for (unsigned int i = 0; i < threads; i++)
+			workers.push_back(std::thread(work));
+		for (std::size_t i = 0; i < workers.size(); i++)
+			workers[i].join();
+	}
+
+	if (error)
+		std::rethrow_exception(error);
+
+	return ret;
+}
+
+/* Vyhleda entity ve vsech nactenych automatech, text se na slova
+ * rozdeli jen jednou; shody jsou serazene podle zacatku a u stejneho
+ * zacatku podle poradi nacteni automatu */
+variant_matches marker::lookup_variants(std::string input_string)
+{
+	variant_matches ret;
+	std::vector<t_context> words;
+	std::istringstream ss(input_string);
+	figa_cedar scanner(*this);
+
+	scanner.tokenize(ss, words);
+	scanner.matches = &ret;
+	for (std::list<figa_automata>::iterator it = automata.begin(); it != automata.end(); it++) {
+		std::size_t first = ret.size();
+
+		it->lookup(scanner, words);
+		for (std::size_t i = first; i < ret.size(); i++)
+			ret[i].variant = it->variant;
+	}
+	std::stable_sort(ret.begin(), ret.end(), [](const t_match &a, const t_match &b) {
+		return a.start < b.start;
+	});
+
+	return ret;
+}
+
 std::string marker::auto_lookup_string(std::string input_string)
 {
 	std::string buffer;
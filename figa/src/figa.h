@@ -5,27 +5,55 @@
 #ifndef FIGA_H
 #define FIGA_H
 
+#include <list>
 #include <vector>
 
 #include "figa_cedar.h"
 
-class marker : public figa_cedar
+/* Jeden nacteny automat (darts nebo cedar) a jeho oznaceni (varianta) */
+class figa_automata
 {
 	private:
 		dict_type_darts dict_darts;
 		dict_type_cedar dict_cedar;
-		bool cedar;
+		bool cedar = false;
+		void *mapped_dict = NULL; // automata mapped by load(..., true)
+		std::size_t mapped_size = 0;
+		bool map_dict(std::string dict_file_name);
+		void unmap_dict();
+		figa_automata(const figa_automata &); // nelze kopirovat
+	public:
+		int variant;
+		int fold; // FOLD_* flags of words looked up in this automata
+		figa_automata(int variant = 0, int fold = 0) : variant(variant), fold(fold) {}
+		~figa_automata();
+		bool load(std::string dict_file_name, bool mapped = false);
+		void lookup(figa_cedar &scanner, std::istream &input);
+		void lookup(figa_cedar &scanner, const std::vector<figa_cedar::t_context> &words);
+};
+
+/* Vysledky lookup_variants() (shody vcetne oznaceni varianty) */
+typedef std::vector<figa_cedar::t_match> variant_matches;
+
+class marker : public figa_cedar
+{
+	private:
+		std::list<figa_automata> automata;
 		std::vector <std::string> split_lines(std::string str);
+		void _lookup(figa_cedar &scanner, std::istream &input);
 		std::string _lookup_string(std::string input_string);
 	public:
 		marker(bool print_bool = true, bool over = false,
 			bool autocom = false, int m = 5,
 			bool returnall = false, bool spellche = false,
 			bool in_bytes = false);
-		bool load_dict(std::string dict_file_name);
+		bool load_dict(std::string dict_file_name, bool mapped = false, int fold = 0);
+		bool add_dict(std::string dict_file_name, int variant, bool mapped = false, int fold = 0);
 		std::string lookup_string(std::string input_string);
+		std::vector<t_match> lookup_matches(std::string input_string);
+		std::vector<std::vector<t_match> > lookup_matches_batch(std::vector<std::string> input_strings, unsigned int threads = 0);
+		variant_matches lookup_variants(std::string input_string);
 		std::string auto_lookup_string(std::string input_string);
 };
 
 #endif //FIGA_H
-
@@ -1,4 +1,5 @@
 #include "figa_cedar.h"
+#include "fold_table.h"
 
 /* Name:        sortFunc
  * Class:       none
@@ -80,6 +81,163 @@ bool figa_cedar::isStrongDelimiter(char c){
     return false;
 }
 
+/* Name:        fold_word
+ * Class:       figa_cedar
+ * Purpose:     fold a word to lowercase and/or without accents
+ * Parameters:  word    - word encoded in UTF-8
+ *              fold    - FOLD_* flags
+ * Returns:     folded word
+ * Remarks:     every character is folded to one character, so offsets of
+ *              folded words are the same as offsets in the original text;
+ *              invalid UTF-8 bytes are copied unchanged
+ */
+string figa_cedar::fold_word(const string &word, int fold){
+    string result;
+    int column = (fold & FOLD_LOWERCASE ? 1 : 0) + (fold & FOLD_NONACCENT ? 2 : 0);
+
+    result.reserve(word.size());
+    for(std::size_t i = 0; i < word.size();){
+        unsigned char c = word[i];
+        if(c < UTF_8_0){ // ASCII
+            result.push_back(fold & FOLD_LOWERCASE && c >= 'A' && c <= 'Z' ? c + ('a' - 'A') : c);
+            i++;
+            continue;
+        }
+
+        // decoding a UTF-8 symbol
+        std::size_t length = c >= UTF_8_3 ? 4 : c >= UTF_8_2 ? 3 : c >= UTF_8_1 ? 2 : 1;
+        uint32_t code = length == 4 ? c & 0x07 : length == 3 ? c & 0x0F : c & 0x1F;
+        bool valid = length > 1 && c < UTF_8_4 && i + length <= word.size();
+        for(std::size_t j = 1; valid && j < length; j++){
+            unsigned char next = word[i + j];
+            valid = (next & UTF_8_1) == UTF_8_0;
+            code = (code << 6) | (next & 0x3F);
+        }
+        if(!valid){
+            result.push_back(c);
+            i++;
+            continue;
+        }
+
+        // looking up the symbol in the table of folded characters
+        const uint32_t (*row)[4] = std::lower_bound(FOLD_TABLE, FOLD_TABLE + FOLD_TABLE_SIZE, code,
+            [](const uint32_t (&row)[4], uint32_t code){ return row[0] < code; });
+        if(column == 0 || row == FOLD_TABLE + FOLD_TABLE_SIZE || (*row)[0] != code){
+            result.append(word, i, length);
+        }else{ // encoding the folded symbol to UTF-8
+            uint32_t folded = (*row)[column];
+            if(folded < 0x80){
+                result.push_back(folded);
+            }else if(folded < 0x800){
+                result.push_back(0xC0 | (folded >> 6));
+                result.push_back(0x80 | (folded & 0x3F));
+            }else if(folded < 0x10000){
+                result.push_back(0xE0 | (folded >> 12));
+                result.push_back(0x80 | ((folded >> 6) & 0x3F));
+                result.push_back(0x80 | (folded & 0x3F));
+            }else{
+                result.push_back(0xF0 | (folded >> 18));
+                result.push_back(0x80 | ((folded >> 12) & 0x3F));
+                result.push_back(0x80 | ((folded >> 6) & 0x3F));
+                result.push_back(0x80 | (folded & 0x3F));
+            }
+        }
+        i += length;
+    }
+
+    return result;
+}
+
+/* Name:        tokenize
+ * Class:       figa_cedar
+ * Purpose:     parse input stream into words for KBlookup
+ * Parameters:  ifs     - input stream
+ *              words   - vector to fill with loaded words
+ * Returns:     Nothing. Fills vector words with contexts of words (offsets, delimiters)
+ * Remarks:     every load from the stream is stored, also the ones without
+ *              a word (e.g. between two delimiters), so the words can be
+ *              processed the same way as when they are loaded from the stream
+ */
+void figa_cedar::tokenize(istream &ifs, vector<t_context> &words){
+    string word;
+    bool word_is_uri = false;
+    bool word_is_punct = false;
+
+    // initialinzg structure tah hold context of the word
+    t_context cont;
+    cont.start = 0;
+    cont.end = 0;
+    cont.from = 0;
+    cont.value = 0;
+    cont.word.clear(); 
+    
+    // counting bytes
+    std::size_t  count = 1;
+    std::size_t  end_offset = count;
+
+    while(ifs.good()){ // while there is somthing to read
+        word.clear();
+        char c;
+        cont.start = count;
+        word_is_uri = false;
+        word_is_punct = false;
+        while(true){ // loading new word
+            c = ifs.peek(); // see what character is waiting at stream
+            
+            #define CONSUME_CHAR() \
+            { \
+                bool is_ascii = (unsigned char) c < UTF_8_0; \
+                bool is_utf8_begin = (unsigned char) c >= UTF_8_1; /* if c is 11xxxxxx or higher -> utf-8 symbol begin */ \
+                if (this->bytes || is_ascii || is_utf8_begin) { \
+                    end_offset = count; \
+                    count++; /* always increase if counting in bytes, increase if ASCII symbol or begin of UTF-8 symbol */ \
+                } \
+                ifs.get(); /* consume a character from the stream */ \
+            }
+            
+            if ((word.size() == 4 && word == "http" || word.size() == 5 && word == "https") && c == ':') {
+                word_is_uri = true;
+            }
+            
+            if (!ifs.good()) {
+                break;
+            } else {
+                if (ispunct(c)) {
+                    if (word.empty()) {
+                        word_is_punct = true;
+                    } else if (! word_is_uri) {
+                        break;
+                    }
+                } else {
+                    if (isDelimiter(c)) {
+                        CONSUME_CHAR(); // consume a space delimiter from the stream and increase counter of characters/bytes
+                        break; // end at a delimiter if is not a punctuation
+                    } else if (word_is_punct) {
+                        break; // end at anything; when word is punctuation, it has just one character
+                    }
+                }
+            }
+            word.push_back(c); // append a character from the stream to the string
+            CONSUME_CHAR(); // consume a character from the stream and increase counter of characters/bytes
+            cont.end = end_offset; // set end of word
+            #undef CONSUME_CHAR
+        }
+        cont.word = word;
+        if(word.size() > 0){ // delimiter of new word
+            if (!ifs.good()) {
+                cont.word_delimiter = "\n"; // when a word ends with EOF set EOL as word delimiter
+            } else if (isStrongDelimiter(c)) {
+                cont.word_delimiter = c;
+            } else if (isDelimiter(c) && ! ispunct(c)) {
+                cont.word_delimiter = " ";
+            } else {
+                cont.word_delimiter = "";
+            }
+        }
+        words.push_back(cont);
+    }
+}
+
 /* Name:        get_numbers
  * Class:       figa_cedar
  * Purpose:     parse string for associated values
@@ -275,9 +433,37 @@ void figa_cedar::print_values(vector<int> &values){
         else
             tmp = *ent_it;
         if(!first_start)
-            cout << ";";
+            *this->out << ";";
         else
             first_start = false;
-        cout << *ent_it;
+        *this->out << *ent_it;
     } 
 }
+
+/* Name:        save_match
+ * Class:       figa_cedar
+ * Purpose:     store a result into vector matches instead of printing it
+ * Parameters:  values     - vector of associated values
+ *              start      - offset of the first symbol (counted from 1)
+ *              end        - offset of the last symbol (counted from 1)
+ *              flag       - 'F' for found entity, 'S' for spellchecked entity
+ * Returns:     Nothing.
+ * Remarks:     values are filtered the same way as in print_values
+ */
+void figa_cedar::save_match(vector<int> &values, std::size_t start, std::size_t end, char flag){
+    t_match match;
+    int tmp = -1;
+
+    sort(values.begin(),values.end());
+    for(std::vector<int>::iterator ent_it = values.begin();ent_it < values.end();ent_it++) {
+        if(tmp == *ent_it)
+            continue; // skip duplicates
+        tmp = *ent_it;
+        match.values.push_back(*ent_it);
+    }
+    match.start = start - 1;
+    match.end = end;
+    match.flag = flag;
+    match.variant = 0;
+    this->matches->push_back(match);
+}
@@ -37,6 +37,10 @@ typedef struct items{
 #define UTF_8_4 0b11111000
 #define UTF_8_0 0b10000000
 
+// folding of words before looking them up (the same values as AutomataVariants)
+#define FOLD_LOWERCASE 1
+#define FOLD_NONACCENT 2
+
 class figa_cedar{
     public:
 
@@ -48,6 +52,7 @@ class figa_cedar{
         bool capital; // is first word capital
         string word; // word itself
         string word_delimiter; // word delimiter
+        string key; // folded word looked up in dictionary (if words are folded)
         vector<std::size_t > spell_from; // return nodes after spellcheck    
     }t_context;
 
@@ -65,6 +70,15 @@ class figa_cedar{
         vector<int> res_val;
     }t_search_res;
 
+    typedef struct match{
+        vector<int> values; // associated values (sorted, without duplicates)
+        std::size_t start; // offset of the first symbol (counted from 0)
+        std::size_t end; // offset after the last symbol
+        string fragment; // words of the entity
+        char flag; // 'F' - entity found, 'S' - entity found by spellcheck
+        int variant; // tag of the dictionary the entity was found in
+    }t_match;
+
     bool print = true;
     bool overlapping = false;
     bool autocomp = false;
@@ -72,6 +86,11 @@ class figa_cedar{
     bool bytes = false;
     bool spell = false;
     int many = 5;
+    int fold = 0; // FOLD_* flags, words are folded before looking them up (offsets stay in the original text)
+    // stream results are printed to (each lookup may use its own one)
+    ostream *out = &cout;
+    // if set, results are stored into this vector instead of printing them
+    vector<t_match> *matches = NULL;
     figa_cedar(){};
     figa_cedar(bool print_bool,bool over,bool autocom,int m,bool returnall,bool spellche,bool in_bytes):
     print(print_bool),
@@ -119,6 +138,10 @@ class figa_cedar{
     //
     void print_values(vector<int> &values);
 
+    // stores a result into matches (values are sorted and duplicates are omitted like in print_values)
+    // start is counted from 1 (as printed), the stored start is counted from 0
+    void save_match(vector<int> &values, std::size_t start, std::size_t end, char flag);
+
     // autocomplete function,it takes starting node, if node is 0, it takes string,
     // it traverse to the end iof string, and then try and traverse for every possible symbol
     // if it travels succesfuly, it recursively continue, if traverse return valid value, it stores the value and string
@@ -175,6 +198,16 @@ class figa_cedar{
     // it call get_results(), to extract longest possible entity from laoded words in t_status structure
     template <typename dict_T>
     void KBlookup(dict_T &dict, istream &ifs);
+
+    // function for folding a word (lowercase and/or without accents) according to FOLD_* flags
+    // every character is folded to one character (see fold_table.py)
+    static string fold_word(const string &word, int fold);
+
+    // function for parsing input into words (with their offsets and delimiters)
+    // words can be then looked up by KBlookup in several dictionaries
+    void tokenize(istream &ifs, vector<t_context> &words);
+    template <typename dict_T>
+    void KBlookup(dict_T &dict, const vector<t_context> &words);
 };
 
 #include "figa_cedar.tpp"
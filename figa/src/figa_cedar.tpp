@@ -431,11 +431,11 @@ void figa_cedar::get_autocomplete_results(t_status &current,dict_T &dict){
     // print out loaded entities
     for(it_sea = entities.begin();it_sea < entities.end();it_sea++){                   
         if(this->print){
-            cout << it_sea->res_str << "\t";
+            *this->out << it_sea->res_str << "\t";
         }
         print_values(it_sea->res_val);
         if(this->print){
-            cout << endl;
+            *this->out << endl;
         }
     }
 
@@ -476,6 +476,7 @@ void figa_cedar::get_spellcheck_results(t_status &current,dict_T &dict){
     std::size_t pos = 0;
     std::size_t end = 0;
     std::size_t count = 0;
+    bool saved = false; // the result was stored into matches
     
     for(list<t_context>::reverse_iterator it_con = current.value.rbegin(); it_con != current.value.rend();++it_con){
         end = it_con->end;
@@ -484,9 +485,14 @@ void figa_cedar::get_spellcheck_results(t_status &current,dict_T &dict){
             vector<int> ent_values;
             get_values<dict_T>(dict,ent_val.from,ent_values);
             ent_values.push_back(it_con->value);
-            print_values(ent_values);
-            if(this->print){
-                cout << "\t" << current.value.front().start << "\t" << end  << "\t" ;
+            if(this->matches){
+                save_match(ent_values,current.value.front().start,end,'F');
+                saved = true;
+            }else{
+                print_values(ent_values);
+                if(this->print){
+                    *this->out << "\t" << current.value.front().start << "\t" << end  << "\t" ;
+                }
             }
             break;
         }else{
@@ -497,9 +503,14 @@ void figa_cedar::get_spellcheck_results(t_status &current,dict_T &dict){
                     get_values<dict_T>(dict,*it_from,spell_values);
                     spell_values.push_back(dict.traverse("",*it_from,pos = 0));
                 }                
-                print_values(spell_values);
-                if(this->print){
-                    cout << "\t" << current.value.front().start << "\t" << end  << "\t" ;
+                if(this->matches){
+                    save_match(spell_values,current.value.front().start,end,'S');
+                    saved = true;
+                }else{
+                    print_values(spell_values);
+                    if(this->print){
+                        *this->out << "\t" << current.value.front().start << "\t" << end  << "\t" ;
+                    }
                 }
                 break;   
             }else{
@@ -515,13 +526,18 @@ void figa_cedar::get_spellcheck_results(t_status &current,dict_T &dict){
         }else{
             it->value = NO_ENTITY;
         }
-        if(this->print){
-            cout << it->word << " ";
+        if(saved){
+            if (count > 0)
+                this->matches->back().fragment += " ";
+            this->matches->back().fragment += it->word;
+            count++;
+        }else if(this->print){
+            *this->out << it->word << " ";
             count++;
         }
     }
-    if(this->print && count > 0){
-        cout << endl;
+    if(!saved && this->print && count > 0){
+        *this->out << endl;
     }
     if(!current.value.empty()){
         value = current.value.front().value;
@@ -559,6 +575,7 @@ void figa_cedar::get_results(t_status &current,dict_T &dict){
     std::size_t pos = 0;
     std::size_t end = 0;
     std::size_t count = 0;
+    bool saved = false; // the result was stored into matches
 
     // find longest sequence with assocaited value, rewrites non assocaited values to stop value
     for(list<t_context>::reverse_iterator it_con = current.value.rbegin(); it_con != current.value.rend();++it_con){
@@ -568,9 +585,14 @@ void figa_cedar::get_results(t_status &current,dict_T &dict){
             vector<int> ent_values;
             get_values<dict_T>(dict,ent_val.from,ent_values);
             ent_values.push_back(it_con->value);
-            print_values(ent_values);
-            if(this->print){
-                cout << "\t" << current.value.front().start << "\t" << end  << "\t" ;
+            if(this->matches){
+                save_match(ent_values,current.value.front().start,end,'F');
+                saved = true;
+            }else{
+                print_values(ent_values);
+                if(this->print){
+                    *this->out << "\t" << current.value.front().start << "\t" << end  << "\t" ;
+                }
             }
             break;
         }
@@ -587,16 +609,21 @@ void figa_cedar::get_results(t_status &current,dict_T &dict){
         }else{
             it->value = NO_ENTITY;
         }
-        if(this->print){
+        if(saved){
             if (count > 0)
-                cout << " ";
-            cout << it->word;
+                this->matches->back().fragment += " ";
+            this->matches->back().fragment += it->word;
+            count++;
+        }else if(this->print){
+            if (count > 0)
+                *this->out << " ";
+            *this->out << it->word;
             count++;
         }
     }
     // end of print out
-    if(this->print && count > 0){
-        cout << endl;
+    if(!saved && this->print && count > 0){
+        *this->out << endl;
     }
 
     // clearing the start of the queue
@@ -898,27 +925,38 @@ void figa_cedar::spell_KBlookup(dict_T &dict, istream &ifs){
  * Parameters:  dict        - dictionary 
  *              ifs         - input stream
  * Returns:     Nothing
- * Remarks:     it parses input stream into words, then it tries to aply them
- *              from current nod, if it fails it tries to find entity in the 
- *              loaded words, after retrieving it, it process again the rest 
- *              of loaded wordsto find entity 
+ * Remarks:     it parses input stream into words (see tokenize), then it
+ *              looks them up in the dictionary
  */
 template <typename dict_T>
 void figa_cedar::KBlookup(dict_T &dict, istream &ifs){
+    vector<t_context> words;
+
+    tokenize(ifs, words);
+    KBlookup<dict_T>(dict, words);
+}
+
+/* Name:        KBlookup
+ * Class:       figa_cedar
+ * Purpose:     identifies possible entities in already parsed words
+ * Parameters:  dict        - dictionary 
+ *              words       - words loaded by tokenize
+ * Returns:     Nothing
+ * Remarks:     it tries to aply words from current nod, if it fails it tries
+ *              to find entity in the loaded words, after retrieving it, it
+ *              process again the rest of loaded wordsto find entity,
+ *              the same words can be looked up in several dictionaries
+ */
+template <typename dict_T>
+void figa_cedar::KBlookup(dict_T &dict, const vector<t_context> &words){
     list<t_context>::iterator it;
     t_status current;
     // variables for work with dictionary
-    string word;
-    string punctiation, word_delimiter;
-    const string space = " ";
     int value = 0;
     std::size_t pos = 0;
     
     // flags
-    bool start = true;    
     bool cant_load_more = true;
-    bool word_is_uri = false;
-    bool word_is_punct = false;
     
     // initializing structure that holds temporary context and laoded words
     current.from = 0;
@@ -926,94 +964,30 @@ void figa_cedar::KBlookup(dict_T &dict, istream &ifs){
     current.found = false;
     current.value.clear();
 
-    // initialinzg structure tah hold context of the word
+    // index of the next word to load (there is something to read while it is in words)
+    std::size_t next = 0;
     t_context cont;
-    cont.start = 0;
-    cont.end = 0;
-    cont.from = 0;
-    cont.value = 0;
-    cont.word.clear(); 
-    
-    // counting bytes
-    std::size_t  count = 1;
-    std::size_t  end_offset = count;
                    
     while(true){ // while there is somthing to read
         //cout <<current.load << "  " << current.from << "  ";
         
         if(current.value.empty()){ // everything processed, load more
             current.load = true;
-            if(!ifs.good())
+            if(next >= words.size())
                 break;
         }
         
-        word.clear();
-        char c;
-        if(current.load && ifs.good()){ // need to load more
-            cont.start = count;
-            word_is_uri = false;
-            word_is_punct = false;
-            while(true){ // loading new word
-                c = ifs.peek(); // see what character is waiting at stream
-                
-                //cout << c << "  ";
-                
-                #define CONSUME_CHAR() \
-                { \
-                    bool is_ascii = (unsigned char) c < UTF_8_0; \
-                    bool is_utf8_begin = (unsigned char) c >= UTF_8_1; /* if c is 11xxxxxx or higher -> utf-8 symbol begin */ \
-                    if (this->bytes || is_ascii || is_utf8_begin) { \
-                        end_offset = count; \
-                        count++; /* always increase if counting in bytes, increase if ASCII symbol or begin of UTF-8 symbol */ \
-                    } \
-                    ifs.get(); /* consume a character from the stream */ \
-                }
-                
-                if ((word.size() == 4 && word == "http" || word.size() == 5 && word == "https") && c == ':') {
-                    word_is_uri = true;
-                }
-                
-                if (!ifs.good()) {
-                    break;
-                } else {
-                    if (ispunct(c)) {
-                        if (word.empty()) {
-                            word_is_punct = true;
-                        } else if (! word_is_uri) {
-                            break;
-                        }
-                    } else {
-                        if (isDelimiter(c)) {
-                            CONSUME_CHAR(); // consume a space delimiter from the stream and increase counter of characters/bytes
-                            break; // end at a delimiter if is not a punctuation
-                        } else if (word_is_punct) {
-                            break; // end at anything; when word is punctuation, it has just one character
-                        }
-                    }
-                }
-                word.push_back(c); // append a character from the stream to the string
-                CONSUME_CHAR(); // consume a character from the stream and increase counter of characters/bytes
-                cont.end = end_offset; // set end of word
-                #undef CONSUME_CHAR
-            }
-            //cout << word << " " << endl;
-            if(word.size() > 0){ // proccesing new word
+        if(current.load && next < words.size()){ // need to load more
+            cont = words[next++];
+            //cout << cont.word << " " << endl;
+            if(cont.word.size() > 0){ // proccesing new word
                 // save context
-                cont.word = word;
                 cont.from = current.from;
                 
-                if (!ifs.good()) {
-                    cont.word_delimiter = "\n"; // when a word ends with EOF set EOL as word delimiter
-                } else if (isStrongDelimiter(c)) {
-                    cont.word_delimiter = c;
-                } else if (isDelimiter(c) && ! ispunct(c)) {
-                    cont.word_delimiter = " ";
-                } else {
-                    cont.word_delimiter = "";
-                }
-                
                 // try to loaded word in dictionary
-                cont.value = dict.traverse(word.data(),current.from,pos = 0);
+                if(this->fold)
+                    cont.key = fold_word(cont.word, this->fold);
+                cont.value = dict.traverse((this->fold ? cont.key : cont.word).data(),current.from,pos = 0);
                 value = cont.value;
                 //save context
                 cont.from = current.from;
@@ -1036,11 +1010,11 @@ void figa_cedar::KBlookup(dict_T &dict, istream &ifs){
             current.load = true;
             cant_load_more = true;
             while(!current.value.empty() && cant_load_more){ // end of file, but words are loaded, we need to process them
-                cant_load_more = !ifs.good();
+                cant_load_more = next >= words.size();
                 for(it=current.value.begin();it!=current.value.end();it++){ // iterating through loaded words
                     //cout << it->word  << " ==="<<endl;
                     // is it in dictionary
-                    value = dict.traverse(it->word.data(),current.from,pos = 0);
+                    value = dict.traverse((this->fold ? it->key : it->word).data(),current.from,pos = 0);
             
                     // save context
                     it->value = value;
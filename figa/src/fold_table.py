@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Generates fold_table.h, the table of characters folded by figa_cedar::fold_word().
+
+Every character is folded to one character only, so words keep their length in characters:
+  - lowercase - str.lower() of the character, if it is a single character,
+  - nonaccent - remove_accent_unicode() of a letter (U+0080 - U+1FFF, i.e. Latin, Greek, Cyrillic etc.), if it is a single letter.
+
+Usage: ./fold_table.py > fold_table.h
+"""
+
+import os
+import sys
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from libs.utils import remove_accent_unicode  # noqa: E402
+
+# the highest character folded to a character without accent
+MAX_NONACCENT = 0x1FFF
+
+
+def is_letter(c):
+    return unicodedata.category(c).startswith("L")
+
+
+def fold_lowercase(c):
+    lower = c.lower()
+    return lower if len(lower) == 1 else c
+
+
+def fold_nonaccent(c):
+    if ord(c) > MAX_NONACCENT or not is_letter(c):
+        return c
+    nonaccent = remove_accent_unicode(c)
+    return nonaccent if len(nonaccent) == 1 and is_letter(nonaccent) else c
+
+
+def main():
+    rows = []
+    for code in range(0x80, sys.maxunicode + 1):
+        c = chr(code)
+        if unicodedata.category(c) == "Cs":
+            continue
+        lower = fold_lowercase(c)
+        nonaccent = fold_nonaccent(c)
+        both = fold_nonaccent(lower)
+        if lower != c or nonaccent != c or both != c:
+            rows.append((code, ord(lower), ord(nonaccent), ord(both)))
+
+    print("/* Generated by fold_table.py, do not edit. */")
+    print("#ifndef FOLD_TABLE_H")
+    print("#define FOLD_TABLE_H")
+    print()
+    print("#include <cstdint>")
+    print()
+    print("/* character, lowercase, without accent, lowercase without accent (sorted by character) */")
+    print("static const uint32_t FOLD_TABLE[][4] = {")
+    for row in rows:
+        print("    {{0x{:04X}, 0x{:04X}, 0x{:04X}, 0x{:04X}}},".format(*row))
+    print("};")
+    print()
+    print("static const std::size_t FOLD_TABLE_SIZE = sizeof(FOLD_TABLE) / sizeof(FOLD_TABLE[0]);")
+    print()
+    print("#endif //FOLD_TABLE_H")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,99 @@
 
 %include "std_string.i"
 
+%{
+/* matches of lookup_matches() as a list of tuples (values, start, end, fragment, flag),
+ * where start and end are offsets of the fragment in the input (input[start:end]) */
+static PyObject *matches_to_list(const std::vector<figa_cedar::t_match> &matches, bool with_variant = false)
+{
+	PyObject *result = PyList_New(matches.size());
+	for (size_t i = 0; i < matches.size(); i++) {
+		const figa_cedar::t_match &match = matches[i];
+		PyObject *values = PyTuple_New(match.values.size());
+		for (size_t j = 0; j < match.values.size(); j++)
+			PyTuple_SET_ITEM(values, j, PyLong_FromLong(match.values[j]));
+		PyObject *fragment = PyUnicode_DecodeUTF8(match.fragment.data(), match.fragment.size(), "surrogateescape");
+		if (with_variant)
+			PyList_SET_ITEM(result, i, Py_BuildValue("(NnnNCi)", values, (Py_ssize_t) match.start, (Py_ssize_t) match.end, fragment, (int) match.flag, match.variant));
+		else
+			PyList_SET_ITEM(result, i, Py_BuildValue("(NnnNC)", values, (Py_ssize_t) match.start, (Py_ssize_t) match.end, fragment, (int) match.flag));
+	}
+	return result;
+}
+%}
+
+%typemap(out) std::vector<figa_cedar::t_match> {
+	$result = matches_to_list($1);
+}
+
+/* matches of lookup_variants() as a list of tuples (values, start, end, fragment, flag, variant) */
+typedef std::vector<figa_cedar::t_match> variant_matches;
+%typemap(out) variant_matches {
+	$result = matches_to_list($1, true);
+}
+
+/* results of lookup_matches_batch() as a list of results of lookup_matches() */
+%typemap(out) std::vector<std::vector<figa_cedar::t_match> > {
+	std::vector<std::vector<figa_cedar::t_match> > &results = $1;
+	$result = PyList_New(results.size());
+	for (size_t i = 0; i < results.size(); i++)
+		PyList_SET_ITEM($result, i, matches_to_list(results[i]));
+}
+
+/* texts for lookup_matches_batch() as any sequence of strings */
+%typemap(in) std::vector<std::string> {
+	std::vector<std::string> input_strings;
+	PyObject *seq = PySequence_Fast($input, "expected a sequence of strings");
+	if (!seq)
+		SWIG_fail;
+	Py_ssize_t size = PySequence_Fast_GET_SIZE(seq);
+	input_strings.reserve(size);
+	for (Py_ssize_t i = 0; i < size; i++) {
+		Py_ssize_t length;
+		const char *data = PyUnicode_AsUTF8AndSize(PySequence_Fast_GET_ITEM(seq, i), &length);
+		if (!data) {
+			Py_DECREF(seq);
+			SWIG_fail;
+		}
+		input_strings.push_back(std::string(data, length));
+	}
+	Py_DECREF(seq);
+	$1 = input_strings;
+}
+
+%typemap(typecheck, precedence=SWIG_TYPECHECK_STRING_ARRAY) std::vector<std::string> {
+	$1 = PySequence_Check($input) && !PyUnicode_Check($input) ? 1 : 0;
+}
+
+/* the GIL is released while the automata is searched (arguments are already
+ * converted to C++ strings), so lookups can run in threads simultaneously */
+%define RELEASE_GIL(method)
+%exception method {
+	std::string error;
+	Py_BEGIN_ALLOW_THREADS
+	try {
+		$action
+	} catch (const std::exception &e) {
+		error = e.what();
+		if (error.empty())
+			error = "figa lookup failed";
+	} catch (...) {
+		error = "figa lookup failed";
+	}
+	Py_END_ALLOW_THREADS
+	if (!error.empty()) {
+		PyErr_SetString(PyExc_RuntimeError, error.c_str());
+		SWIG_fail;
+	}
+}
+%enddef
+
+RELEASE_GIL(marker::lookup_string)
+RELEASE_GIL(marker::lookup_matches)
+RELEASE_GIL(marker::lookup_matches_batch)
+RELEASE_GIL(marker::lookup_variants)
+RELEASE_GIL(marker::auto_lookup_string)
+
 class marker : public cedar_figa
 {
 	public:
@@ -13,11 +106,15 @@ class marker : public cedar_figa
 			bool autocom = false, int m = 5,
 			bool returnall = false, bool spellche = false,
 			bool in_bytes = false);
-                bool load_dict(std::string dict_file_name);
+                bool load_dict(std::string dict_file_name, bool mapped = false, int fold = 0);
+		bool add_dict(std::string dict_file_name, int variant, bool mapped = false, int fold = 0);
 
 //		std::string lookup();
 //		std::string lookup_file(std::string input_name);
 		std::string lookup_string(std::string input_string);
+		std::vector<figa_cedar::t_match> lookup_matches(std::string input_string);
+		std::vector<std::vector<figa_cedar::t_match> > lookup_matches_batch(std::vector<std::string> input_strings, unsigned int threads = 0);
+		variant_matches lookup_variants(std::string input_string);
 
 		// AUTOCOMPLETE:
 //		std::string auto_lookup(unsigned int many);
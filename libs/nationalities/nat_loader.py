@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
 import os
 import sys
 import importlib
@@ -8,7 +9,9 @@ import importlib.util
 
 class NatLoader():
 	@staticmethod
-	def load(lang):
+	@functools.lru_cache(maxsize=None)
+	def load_class(lang):
+		""" Returns a language dependent class of nationalities (resolved only once for a given language). """
 		module = "..lang_modules.{}.nationalities".format(lang)
 		package = __name__ if '.' in __name__ else '.' + __name__
 
@@ -18,7 +21,17 @@ class NatLoader():
 			module = "..nationalities"
 
 		lang_module = importlib.import_module(module, package)
-		LangClass = getattr(lang_module, "Nationalities")
+		return getattr(lang_module, "Nationalities")
+
+	@staticmethod
+	def load(lang):
+		LangClass = NatLoader.load_class(lang)
 		res = LangClass(lang)
 
 		return res
+
+	@staticmethod
+	@functools.lru_cache(maxsize=None)
+	def get(lang):
+		""" Returns nationalities of a given language shared by the whole process (loaded on first use). """
+		return NatLoader.load(lang)
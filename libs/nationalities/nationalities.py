@@ -14,6 +14,8 @@ class Nationalities():
 		except IOError:
 			print("Nationality input data file for language \"{}\" not found or is not accessible.".format(self.lang), file = sys.stderr, flush = True)
 			sys.exit(errno.EIO)
+		# a set of nationalities built on first query (see get_nationalities_set())
+		self._nationalities_set = None
 
 
 	def get_nationalities(self):
@@ -24,6 +26,18 @@ class Nationalities():
 			nationalities.append(nat.lower())
 
 		return nationalities
+
+
+	def get_nationalities_set(self):
+		""" Returns a frozen set of nationalities (as returned by get_nationalities()), which is built only once. """
+		if self._nationalities_set is None:
+			self._nationalities_set = frozenset(self.get_nationalities())
+		return self._nationalities_set
+
+
+	def is_nationality(self, form):
+		""" Returns True if a given form is a nationality. """
+		return form in self.get_nationalities_set()
  
 
 	def get_jurisdictions(self):
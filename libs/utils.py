@@ -17,10 +17,38 @@ def remove_accent(_string):
     return str("".join([c for c in nkfd_form if not unicodedata.combining(c)]))
 
 
+# characters without accent (or None, if removing accent would change the length of a string)
+_ACCENT_FOLDS = {}
+
+
+def _fold_accent(c):
+    """ Returns a given character without accent (cached) or None, if it is not a single character without combining marks. """
+    if c not in _ACCENT_FOLDS:
+        result = "".join([x for x in unicodedata.normalize('NFKD', c) if not ACCENT_REGEX.search(unicodedata_name(x))])
+        if len(result) != 1 or unicodedata.combining(result):
+            result = None
+        _ACCENT_FOLDS[c] = result
+    return _ACCENT_FOLDS[c]
+
+
 def remove_accent_unicode(_string):
     """ Removes accents from a string. For example, "Eduard Ovčáček" -> "Eduard Ovcacek". """
     assert isinstance(_string, str)
 
+    # translating characters one by one, if none of them changes the length of the string
+    table = {}
+    for c in set(_string):
+        if c >= '\x80':
+            fold = _fold_accent(c)
+            if fold is None:
+                return _remove_accent_unicode(_string)
+            if fold != c:
+                table[ord(c)] = fold
+    return _string.translate(table) if table else _string
+
+
+def _remove_accent_unicode(_string):
+    """ Removes accents from a string by normalizing the whole string. """
     nfkd_form = unicodedata.normalize('NFKD', _string)
     result = str("".join([c for c in nfkd_form if not ACCENT_REGEX.search(unicodedata_name(c))]))
     if len(_string) == len(result):
@@ -31,7 +31,12 @@ limitations under the License.
 import sys
 
 import argparse
+import asyncio
+import bisect
+import contextlib
+import heapq
 import json
+import multiprocessing
 import os
 import re
 import requests
@@ -40,23 +45,29 @@ import uuid
 
 from collections import namedtuple
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from urllib.request import urlopen
 
 from name_recognizer import name_recognizer as name_recognizer
 from figa import marker as figa
 from libs import dates
-from libs.lib_loader import LibLoader
+from libs.automata_variants import AutomataVariants
 from libs.utils import remove_accent, remove_accent_unicode, get_ner_logger
 from ner import configs
 from ner import ner_knowledge_base as base_ner_knowledge_base
 from ner.context import Context
+from ner.document import Document
 from ner.entity import Entity
 from ner.entity_register import EntityRegister
+from ner.language_pack import get_language_pack
+from ner.mention_index import MentionIndex
 from ner.ner_loader import NerLoader
+from ner.overlaps import IntervalSet, remove_overlapping, retain_overlapping_proper_nouns
+from ner.proper_nouns import ProperNounScanner
+from ner.stages import NO_TRACE, EntityChangesPrinter, NullStageTrace, StageTrace
 
 
 # Pro debugování:
-import difflib, linecache, inspect
 
 from libs import debug
 debug.DEBUG_EN = False
@@ -67,11 +78,17 @@ module_logger = get_ner_logger()
 
 lng = None
 word_types = None
-# a list of frequent titles, degrees etc. (Mayor, King, Sir, ...)
-list_titles = []
+# a scanner of proper nouns for the current language
+proper_noun_scanner = None
+# scanners of proper nouns by languages
+proper_noun_scanners = {}
 arguments = None
 
 DISTRIBUTION_BASE = 'http://knot.fit.vutbr.cz/NAKI_CPK/NER_ML_inputs/'
+DEFAULT_INDIR = os.path.join(os.getcwd(), 'ner/inputs')
+
+# non-printable characters and semicolon replaced by space characters before recognition
+RE_NONPRINTABLE = re.compile("[;\x01-\x08\x0e-\x1f\x0c\x7f]")
 
 
 def get_atm_basepath(lng: str) -> str:
@@ -158,75 +175,51 @@ def offsets_of_paragraphs(input_string):
 
 
 
-def find_proper_nouns(input_string):
-    """ Returns a list of proper nouns. """
-    assert isinstance(input_string, str)
-    
-    result = []
-    re_proper_noun_preps = "";
-    for prep in word_types.PROPER_NOUNS_PREPS:
-        re_proper_noun_preps += r'| {}'.format(re.escape(prep))
-    proper_noun_regex = re.compile(r"(?<!\. |\? |! |: |\s{2})[A-Z][A-Za-z\'\-]*( [A-Z][A-Za-z\'\-]*" + re_proper_noun_preps + r")* [A-Z][A-Za-z\'\-]*") # !!!
-    for pn in re.finditer(proper_noun_regex, input_string):
-        fields = pn.group(0).split()
-        if fields[0] not in list_titles and pn.start() != 0:
-            result.append((pn.start(), pn.end()))
-    return result
-
-
 def fix_poor_disambiguation(entities, context):
     """ Fixes the entity sense if poorly_disambiguated is set to True. """
     assert isinstance(entities, list) # list of Entity
     assert isinstance(context, Context)
 
-    strong_entities = {}
-    strong_entities_by_id = {}
+    # strong entities by their sources and senses ordered by their start offsets
+    strong_entities = MentionIndex()
+    strong_entities_by_id = MentionIndex()
     entities = [e for e in entities if isinstance(e, Entity) and not e.is_coreference]
 
     for e in entities:
         if not e.poorly_disambiguated:
-            if e.source not in strong_entities:
-                strong_entities[e.source] = []
-            strong_entities[e.source].append(e.get_preferred_entity())
-
-            if e.get_preferred_sense() not in strong_entities_by_id:
-                strong_entities_by_id[e.get_preferred_sense()] = []
-            strong_entities_by_id[e.get_preferred_sense()].append(e.get_preferred_entity())
+            strong_entities.add(e.source, e.get_preferred_entity())
+            strong_entities_by_id.add(e.get_preferred_sense(), e.get_preferred_entity())
 
     for e in entities:
         if e.poorly_disambiguated:
-            candidates = []
-            for s in e.senses:
-                if s in strong_entities_by_id:
-                    candidates += strong_entities_by_id[s]
+            senses = [s for s in e.senses if s in strong_entities_by_id]
 
-            if candidates != []:
-                e.set_preferred_sense(get_nearest_entity(e, candidates))
+            if senses:
+                e.set_preferred_sense(get_nearest_entity(e, strong_entities_by_id, senses))
                 e.poorly_disambiguated = False
             elif e.source in strong_entities:
-                e.set_preferred_sense(get_nearest_entity(e, strong_entities[e.source]))
+                e.set_preferred_sense(get_nearest_entity(e, strong_entities, [e.source]))
                 e.poorly_disambiguated = False
 
 
-def add_unknown_names(kb, entities_and_dates, input_string, register):
-    """ Finding unknown names. """
+def add_unknown_names(kb, entities_and_dates, document, figa_matches, register):
+    """ Finding unknown names (figa_matches are matches of figa in the document, see lookup_figa_matches()). """
     assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
     assert isinstance(entities_and_dates, list) # list of Entity and dates.Date
-    assert isinstance(input_string, str)
+    assert isinstance(document, Document)
+    assert isinstance(figa_matches, list) # list of FigaOutput
     assert isinstance(register, EntityRegister)
 
-    global output
-
     nr = name_recognizer.NameRecognizer()
     try:
-        data_rows = nr.recognize_names(input_string, figa_out=output)
+        data_rows = nr.recognize_names(document.text, figa_out=format_figa_output(figa_matches))
     except Exception:
         return
 
     name_entities = []
 
     for dr in data_rows:
-        name_entities.append(Entity.from_data_row(kb, dr, input_string, register))
+        name_entities.append(Entity.from_data_row(kb, dr, document, register))
 
     new_name_entities = []
 
@@ -243,46 +236,49 @@ def add_unknown_names(kb, entities_and_dates, input_string, register):
             name_entities[i].senses = set([-(i+1)])
 
     # resolving overlapping names
+    # entities do not overlap each other (see ner.overlaps.remove_overlapping()), so only the last entity starting before a name
+    # and entities starting inside the name may contain the name or be contained in it
+    entity_indices = [i for i, ed in enumerate(entities_and_dates) if isinstance(ed, Entity)]
+    entity_starts = [entities_and_dates[i].start_offset for i in entity_indices]
+    removed = set()
     for ne in name_entities:
         substring   = False
         overlapping = False
         overlaps    = []
-        for ed in entities_and_dates:
-            if not isinstance(ed, Entity):
+        first = bisect.bisect_left(entity_starts, ne.start_offset)
+        last = bisect.bisect_right(entity_starts, ne.end_offset)
+        for i in entity_indices[max(first - 1, 0):last]:
+            if i in removed:
                 continue
+            ed = entities_and_dates[i]
 
             if ne.is_equal(ed) or  ed.is_overlapping(ne):
                 substring = True
                 break
             elif ne.is_overlapping(ed):
                 overlapping = True
-                overlaps.append(ed)
+                overlaps.append(i)
         if not (substring or overlapping):
             new_name_entities.append(ne)
         elif overlapping:
             senses = set()
             for o in overlaps:
-                senses = senses | o.senses
-                entities_and_dates.remove(o)
+                senses = senses | entities_and_dates[o].senses
+                removed.add(o)
             ne.senses = senses.copy()
             new_name_entities.append(ne)
 
     # inserting names into entity list
-    for nne in new_name_entities:
-        for i in range(len(entities_and_dates)):
-            if i == len(entities_and_dates)-1:
-                entities_and_dates.append(nne)
-                break
-            elif nne.start_offset >= entities_and_dates[i].start_offset and \
-            nne.start_offset < entities_and_dates[i+1].start_offset:
-                entities_and_dates.insert(i+1, nne)
-                break
-            elif nne.start_offset < entities_and_dates[0].start_offset:
-                entities_and_dates.insert(0, nne)
-                break
+    entities_and_dates[:] = insert_names([ed for i, ed in enumerate(entities_and_dates) if i not in removed], new_name_entities)
 
     adjust_coreferences(entities_and_dates, new_name_entities)
 
+
+def insert_names(entities_and_dates, names):
+    """ Returns entities and dates (sorted by start offsets) with names inserted after entities, dates and names with the same start offset. """
+    return list(heapq.merge(entities_and_dates, sorted(names, key=lambda ent: ent.start_offset), key=lambda ent: ent.start_offset))
+
+
 def adjust_coreferences(entities_and_dates, new_name_entities):
     ed            = entities_and_dates
     names         = new_name_entities
@@ -293,25 +289,22 @@ def adjust_coreferences(entities_and_dates, new_name_entities):
     if not ed:
         return
 
+    # index of each entity in entities_and_dates and indices of persons
+    positions = {e: i for i, e in enumerate(ed)}
+    persons = [i for i, e in enumerate(ed) if isinstance(e, Entity) and e.is_person()]
+
     for n in names:
         i_prev = None
         i_next = None
-        index  = None
+        index  = positions[n]
 
-        for i in range(ed_size):
-            if ed[i] == n:
-                index = i
-                break
+        p = bisect.bisect_right(persons, index)
+        if p < len(persons):
+            i_next = persons[p]
 
-        for i in range(index+1, ed_size):
-            if isinstance(ed[i], Entity) and ed[i].is_person():
-                i_next = i
-                break
-
-        for i in range(index-1, -1, -1):
-            if isinstance(ed[i], Entity) and ed[i].is_person():
-                i_prev = i
-                break
+        p = bisect.bisect_left(persons, index)
+        if p > 0:
+            i_prev = persons[p - 1]
 
         # Nothing to do here
         if i_next == None: break
@@ -352,12 +345,13 @@ def resolve_coreferences(entities, context, print_all, register):
                 if e.partial_match_senses:
                     # choosing the candidate with the highest confidence score
                     sense = sorted(list(e.partial_match_senses), key=lambda candidate: context.kb.get_score(candidate), reverse=True)[0]
-                    candidates = list(register.id2entity[sense])
+                    accept = None
                     if not e.source.lower().startswith("the "):
                         # each candidate has to contain the text of a given entity
-                        candidates = (c for c in candidates if remove_accent_unicode(e.source).lower() in remove_accent_unicode(c.source).lower())
+                        source = remove_accent_unicode(e.source).lower()
+                        accept = lambda c: source in remove_accent_unicode(c.source).lower()
                     # choosing the nearest predecessor candidate for a coreference
-                    entity = get_nearest_predecessor(e, candidates)
+                    entity = register.get_nearest_predecessor(e, sense, accept)
                     if entity:
                         e.set_preferred_sense(entity)
                     elif e.senses:
@@ -375,35 +369,36 @@ def resolve_coreferences(entities, context, print_all, register):
             context.update(e)
 
 
-def get_nearest_predecessor(_entity, _candidates):
-    """ Returns the nearest predecessor for a given entity from a given list of candidates. """
+def get_nearest_entity(_entity, _index, _keys):
+    """ Returns the preferred sense of the nearest entity for a given entity from entities indexed under given keys. """
     assert isinstance(_entity, Entity)
-    assert isinstance(_candidates, Iterable) # iterable of Entity
+    assert isinstance(_index, MentionIndex)
+    assert isinstance(_keys, Iterable)
 
-    # sorting candidates according to the distance from a given entity # NOTE: Nešlo by to napsat lépe?
-    candidates = sorted(_candidates, key=lambda candidate: _entity.start_offset - candidate.start_offset)
-    for candidate in candidates:
-        if _entity.start_offset - candidate.start_offset > 0:
-            return candidate
+    # the first key wins if the distances are equal
+    nearest = None
+    for key in _keys:
+        candidate = _index.nearest(key, _entity.start_offset)
+        if candidate and (nearest is None or candidate[0] < nearest[0]):
+            nearest = candidate
 
+    return nearest[1].preferred_sense
 
-def get_nearest_entity(_entity, _candidates):
-    """ Returns the nearest entity for a given entity from a given list of candidates. """
-    assert isinstance(_entity, Entity)
-    assert isinstance(_candidates, Iterable) # iterable of Entity
-
-    # sorting candidates according to the distance from a given entity
-    candidates = sorted(_candidates, key=lambda candidate: abs(_entity.start_offset - candidate.start_offset))
 
-    return candidates[0].preferred_sense
+FigaOutput = namedtuple("FigaOutput", "kb_rows start_offset end_offset fragment flag")
 
 
-FigaOutput = namedtuple("FigaOutput", "kb_rows start_offset end_offset fragment flag")
+def lookup_figa_matches(seek_names, input_string, shift=0):
+    """
+    Returns a list of FigaOutput for matches of figa in input_string (without formatting and parsing of the figa output).
+    Offsets are shifted by shift (figa processed only a part of the input text starting at position shift).
+    """
+    return [FigaOutput(kb_rows, start_offset + shift, end_offset + shift, fragment, flag) for kb_rows, start_offset, end_offset, fragment, flag in seek_names.lookup_matches(input_string)]
 
 
-def parseFigaOutput(figa_output):
+def format_figa_output(figa_matches):
     """
-    Parsuje výstup z figy.
+    Returns a list of FigaOutput (see lookup_figa_matches()) in the format of the text output of figa, e.g. for the name recognizer.
 
     Syntax výstupního formátu v Backusově-Naurově formě (BNF):
         <výstup Figa> :== <řádek výstupu>
@@ -414,19 +409,12 @@ def parseFigaOutput(figa_output):
             | <číslo> ";" <čísla řádků do KB>
     kde:
         <čísla řádků do KB> odkazují na řádky ve znalostní bázi s entitami, jenž mají mezi atributy <fragment> (řádek 0 značí zájmeno – coreference)
-        <počáteční offset> a <koncový offset> jsou pozice prvního a posledního znaku řetězce <fragment> (na pozici 1 leží první znak vstupního textu) – to je třeba upravit, aby šlo využít přímo input[start_offset:end_offset]
+        <počáteční offset> a <koncový offset> jsou pozice prvního a posledního znaku řetězce <fragment> (na pozici 1 leží první znak vstupního textu)
         <příznak> může nabývat dvou hodnot: F – fragment plně odpovídá atributu odkazovaných entit; S – byl tolerován překlep ve fragmentu
     """
-
-    # Formát "číslo_řádku[;číslo_řádku]\tpočáteční_offset\tkoncový_offset\tnázev_entity\tF"
-    for line in figa_output.split("\n"):
-        if line != "":
-            kb_rows, start_offset, end_offset, name, flag = line.split("\t")
-            start_offset = start_offset.lstrip('*')
-            yield FigaOutput(map(int, kb_rows.split(";")), int(start_offset)-1, int(end_offset), name, flag) # Figa má start_offset+1 (end_offset má dobře).
+    return "".join("{}\t{}\t{}\t{}\t{}\n".format(";".join(map(str, m.kb_rows)), m.start_offset + 1, m.end_offset, m.fragment, m.flag) for m in figa_matches)
 
 seek_names = None
-output = None
 
 
 def get_atm_path(lowercase: bool) -> str:
@@ -434,7 +422,8 @@ def get_atm_path(lowercase: bool) -> str:
     if lowercase:
         lower = "-lower"
 
-    path_to_figa_atm = os.path.abspath(os.path.join(arguments.indir, f"automata{lower}"))
+    indir = arguments.indir if arguments else DEFAULT_INDIR
+    path_to_figa_atm = os.path.abspath(os.path.join(indir, f"automata{lower}"))
     if os.path.isfile(path_to_figa_atm + ".dct"):
         path_to_figa_atm += ".dct" # DARTS
     else:
@@ -443,57 +432,74 @@ def get_atm_path(lowercase: bool) -> str:
     return path_to_figa_atm
 
 
-def get_entities_from_figa(kb, input_string, lowercase, global_senses, register, print_score):
-    """ Returns the list of Entity objects from figa. """ # TODO: Možná by nebylo od věci toto zapouzdřit do třídy jako v "get_entities.py".
-    assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
-    assert isinstance(input_string, str)
-    assert isinstance(lowercase, bool)
-    assert isinstance(global_senses, set)
-    assert isinstance(register, EntityRegister)
-    assert isinstance(print_score, bool)
-
+def load_automata(lowercase):
+    """ Loads the figa automaton once and returns the marker shared by all following lookups. """
     global seek_names
-    global output
-    
-    input_string
 
     if not seek_names:
         seek_names = figa.marker()
         path_to_figa_atm = get_atm_path(lowercase)
-        if not seek_names.load_dict(path_to_figa_atm):
+        # mapped read-only, so that all processes share one copy of the automaton in the page cache
+        # (figa lowercases the words itself for the lowercase automaton, offsets and fragments are from the original text)
+        if not seek_names.load_dict(path_to_figa_atm, True, AutomataVariants.LOWERCASE.value if lowercase else AutomataVariants.DEFAULT.value):
             raise RuntimeError('Could not load automata (file "{}" does not exist or permission denied).'.format(path_to_figa_atm))
 
+    return seek_names
+
+
+def init_lang(lang):
+    """ Loads language dependent globals (word types, titles), if they have not been loaded yet. """
+    global lng
+    global proper_noun_scanner
+    global word_types
+
+    if word_types is None or lng != lang:
+        lng = lang
+        word_types = get_language_pack(lng).word_types
+
+        if lng not in proper_noun_scanners:
+            # a list of frequent titles, degrees etc. (Mayor, King, Sir, ...)
+            indir = arguments.indir if arguments else DEFAULT_INDIR
+            f_titles = os.path.abspath(os.path.join(indir, "freq_terms_filtred.all"))
+            proper_noun_scanners[lng] = ProperNounScanner.from_file(word_types.PROPER_NOUNS_PREPS, f_titles)
+        proper_noun_scanner = proper_noun_scanners[lng]
+
+
+def get_entities_from_figa(kb, document, lowercase, global_senses, register, print_score, start=0, end=None):
+    """
+    Returns a tuple (list of Entity objects from figa, list of FigaOutput) of matches found in the text of document between start and end.
+    Shorter matches overlapping longer ones are omitted (see ner.overlaps.remove_overlapping()), but their senses are added into global_senses.
+    """ # TODO: Možná by nebylo od věci toto zapouzdřit do třídy jako v "get_entities.py".
+    assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
+    assert isinstance(document, Document)
+    assert isinstance(lowercase, bool)
+    assert isinstance(global_senses, set)
+    assert isinstance(register, EntityRegister)
+    assert isinstance(print_score, bool)
+
+    seek_names = load_automata(lowercase)
+
     # getting data from figa
-    if lowercase:
-        output = seek_names.lookup_string(input_string.lower())
-    else:
-        output = seek_names.lookup_string(input_string)
+    figa_matches = lookup_figa_matches(seek_names, document.text[start:end], start)
     entities = []
+    entity_class = get_language_pack(lng).entity_class
+
+    # omitting shorter overlapping matches before creating Entity objects (figa should always return the longest match first)
+    lines = figa_matches
+    retained = set(remove_overlapping([(line.start_offset, line.end_offset + 1) for line in lines]))
 
     # processing figa output and creating Entity objects
-    for line in parseFigaOutput(output):
-        global lng
-        e = NerLoader.load(module = "entity", lang = lng, initiate = "Entity")
-        e.create(line, kb, input_string, register)
+    for i, line in enumerate(lines):
+        if i not in retained:
+            global_senses.update(s for s in line.kb_rows if s != 0)
+            continue
+        e = entity_class(lng)
+        e.create(line, kb, document, register)
         global_senses.update(e.senses)
         e.display_score = print_score
         entities.append(e)
 
-    return entities
-
-def remove_shorter_entities(entities):
-    """ Removing shorter entity from overlapping entities. """
-    assert isinstance(entities, list) # list of Entity
-
-    # figa should always return the longest match first
-    entity_offsets = set()
-    new_entities = []
-    for e in entities:
-        current_offset = set(range(e.start_offset, e.end_offset + 1))
-        if current_offset & entity_offsets == set():
-            entity_offsets.update(current_offset)
-            new_entities.append(e)
-    return new_entities
+    return entities, figa_matches
 
 
 def resolve_overlapping_proper_nouns(entities, input_string):
@@ -501,50 +507,12 @@ def resolve_overlapping_proper_nouns(entities, input_string):
     assert isinstance(entities, list) # list of Entity
     assert isinstance(input_string, str)
     
-    # input with removed accent
-    input_without_accent = remove_accent_unicode(input_string)
-
-    # finding proper nouns
-    proper_nouns = find_proper_nouns(input_without_accent)
-    proper_nouns_offsets = set()
-    entities_offsets = set()
-    # index gives for each offset a particular proper noun
-    proper_nouns_index = {}
-    for pn in proper_nouns:
-        # computing proper nouns offsets # NOTE: Nešlo by to napsat lépe?
-        proper_noun_offsets = range(pn[0], pn[1])
-        proper_nouns_offsets.update(proper_noun_offsets)
-        for pno in proper_noun_offsets:
-            proper_nouns_index[pno] = pn
-    new_entities = []
-    # computing entities offsets
-    for e in entities:
-        entity_offsets = range(e.start_offset, e.end_offset)
-        entities_offsets.update(entity_offsets)
-    # searching for solitary spaces (e.g. Canadian Paul Verlaine)
-    diff_pn_e = proper_nouns_offsets - entities_offsets
-    spaces_in_diff_pn_e = set([o for o in diff_pn_e if input_without_accent[o] == ' '])
-    solitary_spaces = set([o for o in spaces_in_diff_pn_e if (o - 1 not in spaces_in_diff_pn_e) and (o + 1 not in spaces_in_diff_pn_e)])
-    # going through entities and checking whether they overlap with proper nouns
-    for e in entities:
-        entity_offsets = set(range(e.start_offset, e.end_offset))
-        overlap = proper_nouns_offsets & entity_offsets
-        # if there is an overlap
-        if overlap:
-            # there could be more than one overlapping proper noun
-            overlapping_proper_nouns = set([proper_nouns_index[o] for o in overlap])
-            for opn in overlapping_proper_nouns:
-                opn_offsets = set(range(opn[0], opn[1]))
-                diff_opn_e = opn_offsets - entities_offsets
-                # how many spaces and apostrophes are there in the difference string
-                spaces = [o for o in diff_opn_e if (input_without_accent[o] == ' ') and (o not in solitary_spaces)]
-                apostrophes = [o for o in diff_opn_e if input_without_accent[o] == "'"]
-                if not spaces or apostrophes:
-                    new_entities.append(e)
-                    break
-        else:
-            new_entities.append(e)
-    return new_entities
+    # finding proper nouns in the input with removed accent
+    input_without_accent, proper_nouns = proper_noun_scanner.scan(input_string)
+
+    # checking whether entities overlap with proper nouns (e.g. Canadian Paul Verlaine)
+    retained = retain_overlapping_proper_nouns([(e.start_offset, e.end_offset) for e in entities], proper_nouns, input_without_accent)
+    return [entities[i] for i in retained]
 
 def remove_nearby_entities(kb, entities, input_string):
     """ Filtering out entities that are next to another entity (excluding dates). """
@@ -573,7 +541,110 @@ def remove_nearby_entities(kb, entities, input_string):
     return new_entities
 
 
-def recognize(kb, input_string, print_all=False, print_result=True, print_score=False, lowercase=False, remove=False, split_interval=True, find_names=False):
+# minimal length of a paragraph shard (shorter documents are not split)
+PARAGRAPH_SHARD_MIN_LENGTH = 20000
+
+# a document recognized by paragraph shards - (kb, document, lowercase, print_score, split_interval), inherited by forked workers
+paragraph_shard_document = None
+
+
+def shard_paragraphs(input_string, count):
+    """
+    Splits input_string at paragraph boundaries into at most count ranges (start, end) of a similar length.
+    No range is shorter than PARAGRAPH_SHARD_MIN_LENGTH (except the last one).
+    """
+    assert isinstance(input_string, str)
+    assert isinstance(count, int)
+
+    length = len(input_string)
+    shard_length = max(length / count, PARAGRAPH_SHARD_MIN_LENGTH)
+    bounds = [0]
+    for par_offset in offsets_of_paragraphs(input_string)[1:]:
+        if par_offset - bounds[-1] >= shard_length and length - par_offset >= PARAGRAPH_SHARD_MIN_LENGTH:
+            bounds.append(par_offset)
+    bounds.append(length)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+@contextlib.contextmanager
+def paragraph_shard_pool(kb, document, shards, lowercase, print_score, split_interval):
+    """ Forks a pool of workers sharing the document for its paragraph shards; yields None if there is less than two shards. """
+    global paragraph_shard_document
+
+    if len(shards) < 2:
+        yield None
+        return
+
+    # loading the automaton before forking, so that all workers share it
+    load_automata(lowercase)
+    paragraph_shard_document = (kb, document, lowercase, print_score, split_interval)
+    try:
+        with multiprocessing.get_context("fork").Pool(len(shards)) as pool:
+            yield pool
+    finally:
+        paragraph_shard_document = None
+
+
+def recognize_paragraph_shard(shard):
+    """
+    Finds entities from figa (without shorter overlapping ones) and dates in a paragraph shard (start, end).
+    Runs in a forked worker, returns a tuple (entities, their senses, dates, figa matches).
+    """
+    kb, document, lowercase, print_score, split_interval = paragraph_shard_document
+    start, end = shard
+
+    senses = set()
+    entities, figa_matches = get_entities_from_figa(kb, document, lowercase, senses, EntityRegister(), print_score, start, end)
+
+    dates_and_intervals = dates.find_dates(document.text[start:end], split_interval=split_interval)
+    for d in dates_and_intervals:
+        d.start_offset += start
+        d.end_offset += start
+
+    return entities, senses, dates_and_intervals, figa_matches
+
+
+def get_entities_from_paragraph_shards(pool, shards, kb, document, global_senses, register):
+    """ Returns a tuple (entities from figa, dates and intervals, matches of figa) found in paragraph shards by a pool of workers. """
+    entities = []
+    dates_and_intervals = []
+    figa_matches = []
+    for shard_entities, shard_senses, shard_dates, shard_matches in pool.map(recognize_paragraph_shard, shards):
+        for e in shard_entities:
+            e.attach(kb, document, register)
+        entities.extend(shard_entities)
+        global_senses.update(shard_senses)
+        dates_and_intervals.extend(shard_dates)
+        figa_matches.extend(shard_matches)
+
+    return entities, dates_and_intervals, figa_matches
+
+
+def disambiguate_paragraph_shard(entities):
+    """ Disambiguates entities without context (runs in a forked worker). """
+    kb, document = paragraph_shard_document[:2]
+
+    register = EntityRegister()
+    for e in entities:
+        e.attach(kb, document, register)
+        e.disambiguate_without_context()
+    return entities
+
+
+def disambiguate_in_paragraph_shards(pool, chunk_count, entities, kb, document, register):
+    """ Disambiguates entities without context by a pool of workers (in chunk_count chunks); returns the disambiguated entities. """
+    chunk_size = max(1, -(-len(entities) // chunk_count))
+    chunks = [entities[i:i + chunk_size] for i in range(0, len(entities), chunk_size)]
+
+    result = []
+    for chunk in pool.map(disambiguate_paragraph_shard, chunks):
+        for e in chunk:
+            e.attach(kb, document, register)
+        result.extend(chunk)
+    return result
+
+
+def recognize(kb, input_string, print_all=False, print_result=True, print_score=False, lowercase=False, remove=False, split_interval=True, find_names=False, paragraph_workers=1, trace=None):
     """
     Prints a list of entities found in input_string.
 
@@ -584,9 +655,27 @@ def recognize(kb, input_string, print_all=False, print_result=True, print_score=
     lowercase - the input string is lowercased
     remove - removes accent from the input string
     split_interval - split dates intervals in function dates.find_dates()
+    find_names - finds also unknown names
+    paragraph_workers - if greater than 1, a large input string is split into shards of paragraphs and figa lookup, date detection
+                        and disambiguation without context run in that many forked processes
+    trace - a StageTrace collecting durations and entity counts of stages (see ner/stages.py); by default, stages are
+            traced only for debugging
     """
-    assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
     assert isinstance(input_string, str)
+    check_recognize_options(kb, print_all, print_result, print_score, lowercase, remove, split_interval, find_names, paragraph_workers, trace)
+
+    if trace is None:
+        trace = StageTrace(EntityChangesPrinter()) if debug.DEBUG_EN else NO_TRACE
+
+    # features of rows cached by the knowledge base are kept across documents of the same version of the KB
+    kb.check_row_cache()
+
+    return recognize_document(kb, input_string, print_all, print_result, print_score, lowercase, remove, split_interval, find_names, paragraph_workers, trace)
+
+
+def check_recognize_options(kb, print_all, print_result, print_score, lowercase, remove, split_interval, find_names, paragraph_workers, trace):
+    """ Checks types of arguments of recognize() and recognize_many(). """
+    assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
     assert isinstance(print_all, bool)
     assert isinstance(print_result, bool)
     assert isinstance(print_score, bool)
@@ -594,61 +683,76 @@ def recognize(kb, input_string, print_all=False, print_result=True, print_score=
     assert isinstance(remove, bool)
     assert isinstance(split_interval, bool)
     assert isinstance(find_names, bool)
+    assert isinstance(paragraph_workers, int)
+    assert trace is None or isinstance(trace, (StageTrace, NullStageTrace))
 
-    def debugChangesInEntities(entities, responsible_line):
-        if debug.DEBUG_EN:
-            global debug_last_status_of_entities
-            if "debug_last_status_of_entities" in globals():
-                new_status_of_entities = [e+"\n" for e in map(str, sorted(entities, key=lambda ent: ent.start_offset))]
-                diff = "".join(difflib.unified_diff(debug_last_status_of_entities, new_status_of_entities, fromfile='before', tofile='after', n=0))[:-1]
-                if diff:
-                    print_dbg_en(responsible_line, diff, delim="\n", stack_num=2)
-                debug_last_status_of_entities = new_status_of_entities
-            else:
-                debug_last_status_of_entities = [e+"\n" for e in map(str, sorted(entities, key=lambda ent: ent.start_offset))]
+
+def recognize_document(kb, input_string, print_all, print_result, print_score, lowercase, remove, split_interval, find_names, paragraph_workers, trace):
+    """ Recognizes input_string as recognize() does, once its arguments have been checked and the row cache of kb has been checked against the version of the KB. """
+    trace.start()
 
     # replacing non-printable characters and semicolon with space characters
-    input_string = re.sub("[;\x01-\x08\x0e-\x1f\x0c\x7f]", " ", input_string)
+    input_string = RE_NONPRINTABLE.sub(" ", input_string)
 
     # running with parametr --remove_accent
     if remove:
         input_string = remove_accent(input_string)
+    # the document shared by all entities
+    document = Document(input_string)
+    trace.stage("preprocessing")
 
     # creating entity register
     register = EntityRegister()
     # a set of all possible senses
     global_senses = set()
 
-    # getting entities from figa
-    figa_entities = get_entities_from_figa(kb, input_string, lowercase, global_senses, register, print_score)
-    debugChangesInEntities(figa_entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
-
-    # retaining only possible coreferences for each entity
-    for e in figa_entities:
-        e.partial_match_senses = e.partial_match_senses & global_senses
-
-    # removing shorter entity from overlapping entities
-    figa_entities = remove_shorter_entities(figa_entities)
-    debugChangesInEntities(figa_entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
-
-    # removing entities without any sense
-    nationalities = []
-    entities = []
-    for e in figa_entities:
-        if e.is_nationality:
-            nationalities.append(e)
-        elif e.senses or e.partial_match_senses or e.source.lower() in word_types.PRONOUNS:
-            entities.append(e)
-    debugChangesInEntities(entities, "removing entities without any sense")
-
-    # searches for dates and intervals in the input
-    dates_and_intervals = dates.find_dates(input_string, split_interval=split_interval)
-
-    # resolving overlapping dates and entities
-    entity_offsets = set()
-    for e in entities:
-        entity_offsets.update(set(range(e.start_offset, e.end_offset + 1)))
-    dates_and_intervals = [d for d in dates_and_intervals if set(range(d.start_offset, d.end_offset + 1)) & entity_offsets == set()]
+    # splitting a large document into shards of paragraphs processed by forked workers
+    shards = shard_paragraphs(input_string, paragraph_workers) if paragraph_workers > 1 else []
+    with paragraph_shard_pool(kb, document, shards, lowercase, print_score, split_interval) as pool:
+        # getting entities from figa (and dates in the shards)
+        if pool:
+            figa_entities, dates_and_intervals, figa_matches = get_entities_from_paragraph_shards(pool, shards, kb, document, global_senses, register)
+        else:
+            figa_entities, figa_matches = get_entities_from_figa(kb, document, lowercase, global_senses, register, print_score)
+        trace.stage("figa", figa_entities)
+
+        # retaining only possible coreferences for each entity (shorter overlapping entities have already been removed)
+        for e in figa_entities:
+            e.partial_match_senses = e.partial_match_senses & global_senses
+
+        # fetching features of all candidates at once, the disambiguation of the document then reads them from its own table
+        kb = kb.prefetch_rows(global_senses)
+        for e in figa_entities:
+            e.kb = kb
+        trace.stage("prefetch_rows", figa_entities)
+
+        # removing entities without any sense
+        nationalities = []
+        entities = []
+        for e in figa_entities:
+            if e.is_nationality:
+                nationalities.append(e)
+            elif e.senses or e.partial_match_senses or e.source.lower() in word_types.PRONOUNS:
+                entities.append(e)
+        trace.stage("remove_entities_without_sense", entities)
+
+        # searches for dates and intervals in the input
+        if not pool:
+            dates_and_intervals = dates.find_dates(input_string, split_interval=split_interval)
+        trace.stage("find_dates", entities)
+
+        # resolving overlapping dates and entities
+        entity_offsets = IntervalSet((e.start_offset, e.end_offset + 1) for e in entities)
+        dates_and_intervals = [d for d in dates_and_intervals if not entity_offsets.overlaps(d.start_offset, d.end_offset + 1)]
+        trace.stage("resolve_overlapping_dates", entities)
+
+        # NOTE: Odtut se dějí zajímavé věci {
+        # disambiguates without context
+        if pool:
+            entities = disambiguate_in_paragraph_shards(pool, len(shards), entities, kb, document, register)
+        else:
+            [e.disambiguate_without_context() for e in entities] # NOTE: Teoreticky se po této disabiguaci mohou v entities vyzkytovat entity bez významu.
+        trace.stage("disambiguate_without_context", entities)
 
     # merges entities with dates
     entities_and_dates = []
@@ -658,43 +762,39 @@ def recognize(kb, input_string, print_all=False, print_result=True, print_score=
     # sorts entities and dates according to their start offsets
     entities_and_dates.sort(key=lambda ent : ent.start_offset)
 
-    # NOTE: Odtut se dějí zajímavé věci {
-    # disambiguates without context
-    [e.disambiguate_without_context() for e in entities] # NOTE: Teoreticky se po této disabiguaci mohou v entities vyzkytovat entity bez významu.
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
-
     paragraphs = offsets_of_paragraphs(input_string)
     context = Context(entities_and_dates, kb, paragraphs, nationalities)
 
     # disambiguates with context
     [e.disambiguate_with_context(context) for e in entities]
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
+    trace.stage("disambiguate_with_context", entities)
     fix_poor_disambiguation(entities, context)
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
+    trace.stage("fix_poor_disambiguation", entities)
     context = Context(entities_and_dates, kb, paragraphs, nationalities) # Znovu se vytváří kontext, aby došlo k novému vypočítání statistik pro každý odstavec. Disabiguací s kontextem totiž došlo ke změnám preferovaných významů některých entit.
 
     # resolving coreferences
     name_coreferences = [e for e in entities if e.source.lower() not in word_types.PRONOUNS and not e.source.lower().startswith("the ")]
     resolve_coreferences(name_coreferences, context, print_all, register) # Zde se ověřuje, zda-li části jmen jsou odkazy nebo samostatné entity.
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
+    trace.stage("resolve_name_coreferences", entities)
     resolve_coreferences(entities, context, print_all, register) # Dle předchozích kroků se dosadí správné odkazy.
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
+    trace.stage("resolve_coreferences", entities)
 
     # resolving overlapping entities and proper nouns
     entities = resolve_overlapping_proper_nouns(entities, input_string)
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
+    trace.stage("resolve_overlapping_proper_nouns", entities)
 
     # determining whether two entities lie next to each other
     entities = set(remove_nearby_entities(kb, entities, input_string))
-    debugChangesInEntities(entities, linecache.getline(__file__, inspect.getlineno(inspect.currentframe())-1))
+    trace.stage("remove_nearby_entities", entities)
 
     # updating entities_and_dates
     entities_and_dates = [e for e in entities_and_dates if isinstance(e, dates.Date) or e in entities]
-    debugChangesInEntities(entities_and_dates, "updating entities_and_dates")
+    trace.stage("update_entities_and_dates", entities_and_dates)
 
     # finding unknown names
     if find_names:
-        add_unknown_names(kb, entities_and_dates, input_string, register)
+        add_unknown_names(kb, entities_and_dates, document, figa_matches, register)
+        trace.stage("add_unknown_names", entities_and_dates)
 
     # omitting entities without a sense
     if entities_and_dates:
@@ -706,19 +806,319 @@ def recognize(kb, input_string, print_all=False, print_result=True, print_score=
                     if isinstance(e, Entity):
                         e.set_preferred_sense(None)
             entities_and_dates = [e for e in entities_and_dates if isinstance(e, dates.Date) or (e.is_coreference and e.partial_match_senses) or (not e.is_coreference and e.senses) or e.is_name]
-    debugChangesInEntities(entities_and_dates, "omitting entities without a sense")
+    trace.stage("omit_entities_without_sense", entities_and_dates)
 
     if print_result:
-        print("\n".join(map(str, entities_and_dates)))
+        print(format_entities(entities_and_dates))
+        trace.stage("print_result")
 
     return entities_and_dates
 
 
+def recognize_many(kb, documents, print_all=False, print_result=False, print_score=False, lowercase=False, remove=False, split_interval=True, find_names=False, paragraph_workers=1, trace=None):
+    """
+    Yields a list of entities found in each document of documents (in the same order), as recognize() does.
+
+    kb - a knowledge base (started, with initialized name dictionary)
+    documents - an iterable of input strings
+    other arguments - the same as of recognize(), but print_result is False by default
+
+    The setup shared by the batch is done only once, before the first document: the arguments are checked, the language
+    dependent data and the automaton are loaded, the trace is created and the row cache of kb is checked against
+    the version of the KB (the batch is recognized with one version, a change of the KB is noticed by the next batch).
+    """
+    assert isinstance(documents, Iterable)
+    check_recognize_options(kb, print_all, print_result, print_score, lowercase, remove, split_interval, find_names, paragraph_workers, trace)
+
+    init_lang(kb.lang)
+    load_automata(lowercase)
+    if trace is None:
+        trace = StageTrace(EntityChangesPrinter()) if debug.DEBUG_EN else NO_TRACE
+    kb.check_row_cache()
+
+    for input_string in documents:
+        assert isinstance(input_string, str)
+        yield recognize_document(kb, input_string, print_all, print_result, print_score, lowercase, remove, split_interval, find_names, paragraph_workers, trace)
+
+
+def format_entities(entities_and_dates):
+    """ Converts a list of entities and dates into the output format. """
+    return "\n".join(map(str, entities_and_dates))
+
+
+# daemon mode header announcing the length (in bytes) of the following document body
+DAEMON_LENGTH_HEADER = "NER_LENGTH"
+
+
+def read_daemon_documents(stream, tokens):
+    """
+    Yields a tuple (token, input_string) for each document read from stream in daemon mode.
+    The document is terminated by one of tokens; reading stops after a token containing "END" or at the end of stream.
+
+    stream - a binary stream with UTF-8 encoded input (e.g. sys.stdin.buffer)
+
+    Lines of a document are collected in a list and joined once the document is complete. Instead of lines,
+    a client may send a header "NER_LENGTH <number of bytes>" followed by the body of the document, which is then
+    read by one read() call as it is (the header may be repeated). A header with anything else than a non-negative
+    decimal number is an ordinary line of the document, a body shorter than its header is the end of stream.
+    The document is decoded when it is complete, so a body may end inside of a UTF-8 character.
+    """
+    tokens = {token.encode(): token for token in tokens}
+    header = DAEMON_LENGTH_HEADER.encode() + b" "
+    chunks = []
+    while True:
+        line = stream.readline()
+        if not line:
+            break
+        line = line.rstrip()
+        if line in tokens:
+            token = tokens[line]
+            yield token, b"".join(chunks).decode()
+            chunks = []
+            if "END" in token:
+                break
+        elif line.startswith(header) and line[len(header):].isdigit():
+            length = int(line[len(header):])
+            body = stream.read(length)
+            if len(body) < length:
+                break
+            chunks.append(body)
+        else:
+            chunks.append(line + b"\n")
+
+
+def daemon_recognize_options(token):
+    """ Returns keyword arguments of recognize() for a given daemon mode token. """
+    if "ALL" in token:
+        return {"print_all": True}
+    elif "SCORE" in token:
+        return {"print_score": True}
+    elif "NAMES" in token:
+        return {"find_names": True}
+    else:
+        return {"print_all": False}
+
+
+# knowledge base used by daemon workers (attached in the parent process before forking)
+daemon_kb = None
+
+
+def document_timings(kb, trace):
+    """ Returns timings of stages of recognition of one document (see StageTrace.as_dict()) with counters of the cache of KB rows. """
+    timings = trace.as_dict()
+    timings["kb_row_cache"] = kb.row_cache.stats()
+    return timings
+
+
+def print_timings(timings):
+    """ Prints timings of stages of recognition of one document (see document_timings()) to stderr as a JSON line. """
+    print(json.dumps(timings), file=sys.stderr)
+    sys.stderr.flush()
+
+
+def recognize_daemon_document(request):
+    """
+    Recognizes one document read in daemon mode and returns a tuple (token, formatted result, timings).
+    Timings of stages (see document_timings()) are collected only with argument --timings; otherwise, they are None.
+    """
+    token, input_string = request
+    trace = StageTrace() if arguments.timings else None
+    entities_and_dates = recognize(daemon_kb, input_string, print_result=False, lowercase=arguments.lowercase, remove=arguments.remove_accent, paragraph_workers=arguments.paragraph_workers, trace=trace, **daemon_recognize_options(token))
+    return token, format_entities(entities_and_dates), document_timings(daemon_kb, trace) if trace else None
+
+
+def run_daemon(kb, tokens, workers):
+    """
+    Runs the daemon mode: reads documents from stdin and prints results to stdout in the order of requests.
+    If workers > 1, documents are recognized by a pool of forked processes sharing the knowledge base and the automaton (copy-on-write).
+    """
+    global daemon_kb
+
+    daemon_kb = kb
+    documents = read_daemon_documents(sys.stdin.buffer, tokens)
+
+    if workers > 1:
+        # loading the automaton before forking, so that all workers share it
+        load_automata(arguments.lowercase)
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            for token, result, timings in pool.imap(recognize_daemon_document, documents):
+                print(result)
+                print(token)
+                sys.stdout.flush()
+                if timings:
+                    print_timings(timings)
+    else:
+        for token, result, timings in map(recognize_daemon_document, documents):
+            print(result)
+            print(token)
+            sys.stdout.flush()
+            if timings:
+                print_timings(timings)
+
+
+class RecognitionServer(object):
+    """
+    Asyncio server recognizing documents received over a Unix or TCP socket.
+
+    Every request and response is a single line containing a JSON object (JSON Lines):
+        request:  {"id": <any>, "text": <document>, "mode": "default" | "all" | "score" | "names"}
+        response: {"id": <id of request>, "entities": [<entity in output format>, ...]}
+                  (with "timings": <durations of stages and counters of the KB row cache> if the server runs with argument --timings)
+              or  {"id": <id of request>, "error": <message>}
+    Many clients may be connected at once and each of them may pipeline requests; responses
+    are sent in the order of requests of a given connection. Requests of all connections go
+    through one bounded queue, so a client is not read from while the queue is full.
+    """
+
+    MODES = ("default", "all", "score", "names")
+    # maximal length of one request line (in bytes)
+    LINE_LIMIT = 256 * 1024 * 1024
+
+    def __init__(self, recognize_request, workers, queue_size):
+        """
+        recognize_request - a blocking function recognizing one request (see recognize_daemon_document())
+        workers - number of requests recognized concurrently
+        queue_size - maximal number of waiting requests (of all connections)
+        """
+        self.recognize_request = recognize_request
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.queue = None
+
+    async def serve(self, address):
+        """ Listens on address ("unix:<path>" or "[<host>]:<port>") until cancelled. """
+        self.queue = asyncio.Queue(self.queue_size)
+        dispatchers = [asyncio.ensure_future(self.dispatch()) for _ in range(self.workers)]
+
+        if address.startswith("unix:"):
+            server = await asyncio.start_unix_server(self.handle_connection, path=address[len("unix:"):], limit=self.LINE_LIMIT)
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self.handle_connection, host or None, int(port), limit=self.LINE_LIMIT)
+        print(f"Listening on \"{address}\" ...", file=sys.stderr)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for dispatcher in dispatchers:
+                dispatcher.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def dispatch(self):
+        """ Takes requests from the queue and recognizes them one by one. """
+        loop = asyncio.get_running_loop()
+        while True:
+            future, request = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self.executor, self.recognize_request, request)
+            except Exception as err:
+                if not future.cancelled():
+                    future.set_exception(err)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    async def submit(self, line):
+        """ Parses a request line and enqueues it; returns a tuple (request id, future of the result). """
+        future = asyncio.get_running_loop().create_future()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            text = request["text"]
+            mode = request.get("mode", "default")
+            if not isinstance(text, str):
+                raise ValueError('"text" has to be a string.')
+            if mode not in self.MODES:
+                raise ValueError(f'Unknown mode "{mode}" (allowed: {", ".join(self.MODES)}).')
+        except (ValueError, KeyError, AttributeError) as err:
+            future.set_exception(ValueError(f"Invalid request: {err}"))
+            return request_id, future
+
+        # waits while the queue is full (backpressure)
+        await self.queue.put((future, (mode.upper(), text)))
+        return request_id, future
+
+    async def handle_connection(self, reader, writer):
+        """ Reads pipelined requests of one connection. """
+        responses = asyncio.Queue(self.queue_size)
+        sender = asyncio.ensure_future(self.send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as err: # the line is longer than LINE_LIMIT
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_exception(ValueError(f"Invalid request: {err}"))
+                    await responses.put((None, future))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await responses.put(await self.submit(line))
+        except ConnectionError:
+            pass
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+
+    async def send_responses(self, responses, writer):
+        """ Sends responses of one connection in the order of requests. """
+        connected = True
+        while True:
+            item = await responses.get()
+            if item is None:
+                break
+            request_id, future = item
+            try:
+                _, result, timings = await future
+                response = {"id": request_id, "entities": result.split("\n") if result else []}
+                if timings:
+                    response["timings"] = timings
+            except Exception as err:
+                response = {"id": request_id, "error": str(err)}
+            if connected:
+                try:
+                    writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                    await writer.drain()
+                except ConnectionError:
+                    # the client has gone, remaining responses are only consumed
+                    connected = False
+
+
+def run_server(kb, address, workers, queue_size):
+    """
+    Runs the server mode (see RecognitionServer).
+    If workers > 1, documents are recognized by a pool of forked processes sharing the knowledge base and the automaton (copy-on-write).
+    """
+    global daemon_kb
+
+    daemon_kb = kb
+    load_automata(arguments.lowercase)
+
+    pool = None
+    recognize_request = recognize_daemon_document
+    if workers > 1:
+        # forking before the event loop is started
+        pool = multiprocessing.get_context("fork").Pool(workers)
+        def recognize_request(request):
+            return pool.apply(recognize_daemon_document, (request,))
+
+    try:
+        asyncio.run(RecognitionServer(recognize_request, workers, queue_size).serve(address))
+    finally:
+        if pool:
+            pool.terminate()
+        if address.startswith("unix:") and os.path.exists(address[len("unix:"):]):
+            os.unlink(address[len("unix:"):])
+
+
 def main():
     global arguments
     global lng
-    global list_titles
-    global word_types
     
     # argument parsing
     parser = argparse.ArgumentParser()
@@ -727,6 +1127,10 @@ def main():
     group.add_argument('-s', '--score', action='store_true', default=False, dest='score', help='Prints all possible senses with respective score values.')
     parser.add_argument('-q', '--lang', default = 'cs', help='Language of recognition / disambiguation (default: %(default)s).')
     parser.add_argument('-d', '--daemon-mode', action='store_true', default=False, help='Runs ner.py in daemon mode.')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of worker processes recognizing documents in daemon or server mode (default: %(default)s).')
+    parser.add_argument('-p', '--paragraph-workers', type=int, default=1, help='Number of worker processes recognizing shards of paragraphs of a large document (default: %(default)s).')
+    parser.add_argument('--server', metavar='ADDRESS', help='Runs ner.py as a server accepting JSON lines requests on a Unix socket ("unix:PATH") or TCP socket ("[HOST]:PORT").')
+    parser.add_argument('--queue-size', type=int, default=64, help='Maximal number of requests waiting for recognition in server mode (default: %(default)s).')
     parser.add_argument('-f', '--file',  help='Uses a given file as as an input.')
     parser.add_argument('-r', '--remove-accent', action='store_true', default=False, help="Removes accent in input.")
     parser.add_argument('-l', '--lowercase', action='store_true', default=False, help="Changes all characters in input to the lowercase characters.")
@@ -734,7 +1138,11 @@ def main():
 #    parser.add_argument('-I', '--indir', type = str, default=os.path.join(os.getcwd(), 'ner/inputs'), help="Input directory, where automata and other input files are stored (default: %(default)s).")
     parser.add_argument('--update', action="store_true", help="Check for new version of input files and update to a new one, if any.")
     parser.add_argument("--own_kb_daemon", action="store_true", dest="own_kb_daemon", help=("Run own KB daemon although another already running."))
+    parser.add_argument("--embedded-kb", action="store_true", help="Reads the knowledge base directly from its file instead of the shared memory of the KB daemon.")
+    parser.add_argument("--namedict-workers", type=int, default=1, help="Number of worker processes rebuilding the dictionary of names of people after a change of the knowledge base (default: %(default)s).")
+    parser.add_argument("--namedict-incremental", action="store_true", help="Rebuilds the dictionary of names of people only from entities whose names have changed since its previous build.")
     parser.add_argument("--debug", action="store_true", help="Enable debugging reports.")
+    parser.add_argument("--timings", action="store_true", help="Reports durations of stages of recognition of each document (as JSON lines to stderr, in server mode as a part of responses).")
 
     arguments = parser.parse_args()
 
@@ -750,11 +1158,22 @@ def main():
         else:
             raise Exception(f'Please select one of supported language ({", ".join(configs.LANGS_ALLOWED)}) by parameter "--lang".')
 
+    if arguments.workers < 1:
+        parser.error("argument -w/--workers: must be a positive number.")
+    if arguments.paragraph_workers < 1:
+        parser.error("argument -p/--paragraph-workers: must be a positive number.")
+    if arguments.workers > 1 and arguments.paragraph_workers > 1:
+        parser.error("argument -p/--paragraph-workers: not allowed with argument -w/--workers greater than 1.")
+    if arguments.queue_size < 1:
+        parser.error("argument --queue-size: must be a positive number.")
+    if arguments.server and arguments.daemon_mode:
+        parser.error("argument --server: not allowed with argument -d/--daemon-mode.")
+
     if not debug.DEBUG_EN and arguments.debug:
         debug.DEBUG_EN = True
 
     need_update = False
-    arguments.indir = os.path.join(os.getcwd(), 'ner/inputs')
+    arguments.indir = DEFAULT_INDIR
 
     fpath_version = os.path.join(arguments.indir, "VERSIONS.json")
 
@@ -809,18 +1228,16 @@ def main():
 
     #    download_with_check(kb_remote_path, kb_etag_path, kb_local_path)
 
-    # a list of frequent titles, degrees etc. (Mayor, King, Sir, ...)
-    f_titles = os.path.abspath(os.path.join(arguments.indir, "freq_terms_filtred.all"))
-    list_titles = [line.strip() for line in open(f_titles)] if os.path.exists(f_titles) else []
-
-    word_types = LibLoader.load('word_types', lng, 'WordTypes')
+    init_lang(lng)
 
     # allowed tokens for daemon mode
     tokens = set(["NER_NEW_FILE", "NER_END", "NER_NEW_FILE_ALL", "NER_END_ALL", "NER_NEW_FILE_SCORE", "NER_END_SCORE", "NER_NEW_FILE_NAMES", "NER_END_NAMES"])
 
     # loading knowledge base
     kb = NerLoader.load(module = "ner_knowledge_base", lang = lng, initiate = "KnowledgeBase")
-    if arguments.own_kb_daemon:
+    if arguments.embedded_kb:
+        kb.init_embedded()
+    elif arguments.own_kb_daemon:
         kb_daemon_run = True
         while kb_daemon_run:
             kb_shm_name = "/decipherKB-%s-daemon_shm-%s" % (lng, uuid.uuid4())
@@ -832,28 +1249,13 @@ def main():
 
     try:
         kb.start()
-        kb.initName_dict()
+        kb.load_snapshot()
+        kb.initName_dict(workers=arguments.namedict_workers, incremental=arguments.namedict_incremental)
 
         if arguments.daemon_mode:
-            input_string = ""
-            while True:
-                line = sys.stdin.readline().rstrip()
-                if line in tokens:
-                    if "ALL" in line:
-                        recognize(kb, input_string, print_all=True, lowercase=arguments.lowercase, remove=arguments.remove_accent)
-                    elif "SCORE" in line:
-                        recognize(kb, input_string, print_score=True, lowercase=arguments.lowercase, remove=arguments.remove_accent)
-                    elif "NAMES" in line:
-                        recognize(kb, input_string, find_names=True, lowercase=arguments.lowercase, remove=arguments.remove_accent)
-                    else:
-                        recognize(kb, input_string, print_all=False, lowercase=arguments.lowercase, remove=arguments.remove_accent)
-                    print(line)
-                    sys.stdout.flush()
-                    input_string = ""
-                    if "END" in line:
-                        break
-                else:
-                    input_string += line + "\n"
+            run_daemon(kb, tokens, arguments.workers)
+        elif arguments.server:
+            run_server(kb, arguments.server, arguments.workers, arguments.queue_size)
         else:
             # reading input data from file
             if arguments.file:
@@ -863,7 +1265,10 @@ def main():
             else:
                 input_string = sys.stdin.read()
             input_string = input_string.strip()
-            recognize(kb, input_string, print_all=arguments.all, print_score=arguments.score, lowercase=arguments.lowercase, remove=arguments.remove_accent, find_names=arguments.names)
+            trace = StageTrace() if arguments.timings else None
+            recognize(kb, input_string, print_all=arguments.all, print_score=arguments.score, lowercase=arguments.lowercase, remove=arguments.remove_accent, find_names=arguments.names, paragraph_workers=arguments.paragraph_workers, trace=trace)
+            if trace:
+                print_timings(document_timings(kb, trace))
     finally:
         kb.end()
 
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+class Document(object):
+    """
+    A document being recognized shared by all its entities.
+
+    Offsets of entities are character offsets into the text (figa reports character offsets, see ner.lookup_figa_matches()).
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        assert isinstance(text, str)
+
+        self.text = text
+
+    def __len__(self):
+        return len(self.text)
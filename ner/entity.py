@@ -7,9 +7,9 @@ from . import context as modContext
 from . import entity_register
 from abc import ABC, abstractmethod
 from .configs import KB_MULTIVALUE_DELIM # !!! jen CZ addons
+from .document import Document
+from .language_pack import get_language_pack
 from .ner_loader import NerLoader
-from libs.lib_loader import LibLoader
-from libs.nationalities.nat_loader import NatLoader
 from libs.utils import ncr2unicode, remove_accent_unicode, get_ner_logger
 
 from libs import debug
@@ -21,6 +21,17 @@ module_logger = get_ner_logger()
 class Entity(ABC):
     """ A text entity referring to a knowledge base item. """
 
+    # subclasses (language modules) declare empty __slots__, so that entities do not have __dict__
+    __slots__ = (
+        "lang", "kb", "register", "document", "word_types",
+        "senses", "partial_match_senses", "preferred_sense", "candidates", "score", "static_score", "context_score", "coreferences",
+        "start_offset", "end_offset", "begin_of_paragraph", "source",
+        "next_to_same_type", "display_score", "poorly_disambiguated", "is_coreference", "is_name", "is_nationality",
+        "next_word_begin", "next_word_end", "previous_word", "before_previous",
+    )
+    # references omitted when pickling (see attach())
+    DETACHED = ("kb", "register", "document", "word_types")
+
     def __init__(self, lang):
         self.lang = lang
         
@@ -41,27 +52,26 @@ class Entity(ABC):
         self.static_score = []
         self.context_score = []
         self.coreferences = set()
-        self.word_types = LibLoader.load(module = "word_types", lang = self.lang, initiate = "WordTypes")
+        self.word_types = get_language_pack(self.lang).word_types
 
 
-    def create(self, entity_attributes, kb, input_string, register):
+    def create(self, entity_attributes, kb, document, register):
         """
         Creates an entity by parsing a line of figa output from entity_str.
         Entity will be referring to an item of the knowledge base kb.
 
         entity_attributes - entity data from figa
         kb - Knowledge Base
-        input_string - input string in Unicode
+        document - the input document (see ner/document.py)
         register - entity register
         """
         #assert isinstance(entity_attributes, FigaOutput)
         assert type(entity_attributes).__name__ == "FigaOutput"
         assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
-        assert isinstance(input_string, str)
+        assert isinstance(document, Document)
         assert isinstance(register, entity_register.EntityRegister)
 
-        self.input_string = input_string
-        self.input_string_bytes = input_string.encode()
+        self.document = document
 
         self.kb = kb
         self.register = register
@@ -78,23 +88,50 @@ class Entity(ABC):
         self.source = ncr2unicode(entity_attributes.fragment)
 
         if len(self.senses) == 0:
-            nationalities_forms = NatLoader.load(self.lang).get_nationalities() # !!!
-            if self.source in nationalities_forms:
+            if get_language_pack(self.lang).nationalities.is_nationality(self.source):
                 self.is_nationality = True
 
         # possible coreferences - people whose names are supersets of an entity
         self.partial_match_senses = self.kb.people_named(remove_accent_unicode(self.source).lower())
 
+    @property
+    def input_string(self):
+        """ The text of the input document. """
+        return self.document.text
+
+    def __getstate__(self):
+        """ Omits references to the knowledge base, the input document and the entity register when pickling (see attach()). """
+        return {attr: getattr(self, attr) for attr in Entity.__slots__ if attr not in Entity.DETACHED and hasattr(self, attr)}
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
+    def attach(self, kb, document, register):
+        """
+        Restores references omitted when pickling, e.g. for an entity recognized in another process.
+        The preferred sense of the entity is inserted into the register.
+        """
+        assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
+        assert isinstance(document, Document)
+        assert isinstance(register, entity_register.EntityRegister)
+
+        self.kb = kb
+        self.document = document
+        self.register = register
+        self.word_types = get_language_pack(self.lang).word_types
+
+        if self.preferred_sense is not None and not isinstance(self.preferred_sense, Entity):
+            self.register.insert_entity(self, self.preferred_sense)
+
     @classmethod
-    def from_data_row(cls, kb, dr, input_string, register):
+    def from_data_row(cls, kb, dr, document, register):
         assert isinstance(kb, base_ner_knowledge_base.KnowledgeBase)
         assert isinstance(dr, module_data_row.DataRow)
-        assert isinstance(input_string, str)
+        assert isinstance(document, Document)
         assert isinstance(register, entity_register.EntityRegister)
-        
-        input_string_bytes = input_string.encode()
 
-        entity = cls(str(dr).split('\t'), kb, input_string, input_string_bytes, register)
+        entity = cls(str(dr).split('\t'), kb, document, register)
         entity.is_name = True
         return entity
 
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from . import entity
+from .mention_index import MentionIndex
 
 class EntityRegister(object):
     """ A class containing the index of all disambiguated entities. """
@@ -9,6 +10,8 @@ class EntityRegister(object):
     def __init__(self):
         self.id2entity = {}
         self.entity2id = {}
+        # entities of each id ordered by their start offsets
+        self.id2mentions = MentionIndex()
 
     def insert_entity(self, _entity, _id):
         """ Insterts a preferred sense for a given entity into to the entity register. """
@@ -18,10 +21,16 @@ class EntityRegister(object):
         if _entity in self.entity2id:
             sense = self.entity2id[_entity]
             self.id2entity[sense].discard(_entity)
+            self.id2mentions.remove(sense, _entity)
         self.entity2id[_entity] = _id
         if _id not in self.id2entity:
             self.id2entity[_id] = set()
         self.id2entity[_id].add(_entity)
+        self.id2mentions.add(_id, _entity)
+
+    def get_nearest_predecessor(self, _entity, _id, accept=None):
+        """ Returns the nearest entity with a given preferred sense preceding a given entity (and accepted by a given function). """
+        return self.id2mentions.nearest_predecessor(_id, _entity.start_offset, accept)
 
     def __str__(self):
         return str(self.id2entity)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A columnar snapshot of hot fields of the knowledge base, memory-mapped by KnowledgeBase.load_snapshot().
+
+The snapshot is a directory built from the KB TSV (read by TsvKB, see build_snapshot()) with numpy arrays indexed by the line of the KB:
+  - CONFIDENCE as float64 (NaN, if it is not a number),
+  - TYPE and GENDER as codes of their values listed in meta.json (-1, if a row has no such column),
+  - other columns read by the disambiguation (see STRING_COLUMNS) as UTF-8 data and offsets of their values.
+
+Features not served by the snapshot (None) are read from the shared memory of the KB daemon.
+
+Usage: ./kb_snapshot.py [KB] [SNAPSHOT]
+"""
+
+import argparse
+import json
+import os
+import shutil
+
+import numpy
+
+try:
+    from configs import PATH_KB
+    from kb_tsv import TsvKB
+except ImportError:
+    from .configs import PATH_KB
+    from .kb_tsv import TsvKB
+
+# the suffix of the snapshot of the KB at PATH_KB
+SNAPSHOT_SUFFIX = ".snapshot"
+SNAPSHOT_FORMAT = 1
+
+CATEGORICAL_COLUMNS = ("TYPE", "GENDER")
+STRING_COLUMNS = (
+    "NAME", "ROLES", "JOBS", "COUNTRY", "LOCATION", "START", "END", "FOUNDED", "CANCELLED",
+    "DATE OF BIRTH", "DATE OF DEATH", "NATIONALITIES",
+)
+
+
+def _codes_dtype(values):
+    return numpy.int16 if len(values) < numpy.iinfo(numpy.int16).max else numpy.int32
+
+
+def build_snapshot(path_kb, path_snapshot):
+    """ Builds a snapshot of the KB at path_kb into the directory path_snapshot (replaced only when it is complete); returns the number of rows. """
+    kb_stat = os.stat(path_kb)
+    kb = TsvKB(path_kb)
+    kb.start()
+    try:
+        version = kb.version()
+        confidence = []
+        categorical = {col_name: ([], {}) for col_name in CATEGORICAL_COLUMNS}
+        strings = {col_name: (bytearray(), [0], []) for col_name in STRING_COLUMNS}
+        for line in range(1, kb.rows() + 1):
+            try:
+                confidence.append(float(kb.dataFor(line, "CONFIDENCE")))
+            except (TypeError, ValueError):
+                confidence.append(float("nan"))
+            for col_name, (codes, values) in categorical.items():
+                value = kb.dataType(line) if col_name == "TYPE" else kb.dataFor(line, col_name)
+                codes.append(-1 if value is None else values.setdefault(value, len(values)))
+            for col_name, (data, offsets, defined) in strings.items():
+                value = kb.dataFor(line, col_name)
+                if value is not None:
+                    data += value.encode("utf-8")
+                offsets.append(len(data))
+                defined.append(value is not None)
+    finally:
+        kb.end()
+
+    tmp_snapshot = path_snapshot + ".tmp"
+    shutil.rmtree(tmp_snapshot, ignore_errors=True)
+    os.makedirs(tmp_snapshot)
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "kb_size": kb_stat.st_size,
+        "kb_mtime_ns": kb_stat.st_mtime_ns,
+        "rows": len(confidence),
+        "categorical": {},
+        "strings": list(STRING_COLUMNS),
+    }
+    numpy.save(os.path.join(tmp_snapshot, "confidence.npy"), numpy.array(confidence, dtype=numpy.float64))
+    for index, (col_name, (codes, values)) in enumerate(categorical.items()):
+        meta["categorical"][col_name] = [index, sorted(values, key=values.get)]
+        numpy.save(os.path.join(tmp_snapshot, "categorical-%d.npy" % index), numpy.array(codes, dtype=_codes_dtype(values)))
+    for index, (data, offsets, defined) in enumerate(strings.values()):
+        numpy.save(os.path.join(tmp_snapshot, "string-%d.data.npy" % index), numpy.frombuffer(bytes(data), dtype=numpy.uint8))
+        numpy.save(os.path.join(tmp_snapshot, "string-%d.offsets.npy" % index), numpy.array(offsets, dtype=numpy.int64))
+        numpy.save(os.path.join(tmp_snapshot, "string-%d.defined.npy" % index), numpy.array(defined, dtype=numpy.bool_))
+    with open(os.path.join(tmp_snapshot, "meta.json"), "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file, ensure_ascii=False)
+
+    shutil.rmtree(path_snapshot, ignore_errors=True)
+    os.rename(tmp_snapshot, path_snapshot)
+    return meta["rows"]
+
+
+class KBSnapshot(object):
+    """ A read-only memory-mapped snapshot of the KB built by build_snapshot(); lines are numbered from 1 as in the KB. """
+
+    def __init__(self, path_snapshot):
+        with open(os.path.join(path_snapshot, "meta.json"), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("Unsupported format of KB snapshot %r." % path_snapshot)
+
+        def load(name):
+            return numpy.load(os.path.join(path_snapshot, name), mmap_mode="r")
+
+        self.path = path_snapshot
+        self.version = meta["version"]
+        self.kb_size = meta["kb_size"]
+        self.kb_mtime_ns = meta["kb_mtime_ns"]
+        self.rows = meta["rows"]
+        self.confidence = load("confidence.npy")
+        self.categorical = {
+            col_name: (load("categorical-%d.npy" % index), values)
+            for col_name, (index, values) in meta["categorical"].items()
+        }
+        self.strings = {
+            col_name: (load("string-%d.data.npy" % index), load("string-%d.offsets.npy" % index), load("string-%d.defined.npy" % index))
+            for index, col_name in enumerate(meta["strings"])
+        }
+
+    def is_built_from(self, path_kb):
+        """ Checks, whether the snapshot was built from the current content of the KB at path_kb. """
+        try:
+            kb_stat = os.stat(path_kb)
+        except OSError:
+            return False
+        return kb_stat.st_size == self.kb_size and kb_stat.st_mtime_ns == self.kb_mtime_ns
+
+    def ent_type(self, line):
+        """ Returns the TYPE of the row at the line, or None. """
+        return self.data_for(line, "TYPE")
+
+    def score(self, line):
+        """ Returns the CONFIDENCE of the row at the line as a float, or None if it is not a number. """
+        if not 0 < line <= self.rows:
+            return None
+        score = float(self.confidence[line - 1])
+        return None if score != score else score
+
+    def data_for(self, line, col_name):
+        """ Returns the value of the column of the row at the line, or None if it is not in the snapshot. """
+        if not 0 < line <= self.rows:
+            return None
+        if col_name in self.categorical:
+            codes, values = self.categorical[col_name]
+            code = int(codes[line - 1])
+            return values[code] if code >= 0 else None
+        if col_name in self.strings:
+            data, offsets, defined = self.strings[col_name]
+            if not defined[line - 1]:
+                return None
+            return data[offsets[line - 1]:offsets[line]].tobytes().decode("utf-8")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds a columnar snapshot of the knowledge base for ner.py.")
+    parser.add_argument("kb", nargs="?", default=PATH_KB, help="The knowledge base (default: %(default)s).")
+    parser.add_argument("snapshot", nargs="?", help="The directory of the snapshot (default: the knowledge base with suffix \"%s\")." % SNAPSHOT_SUFFIX)
+    arguments = parser.parse_args()
+
+    rows = build_snapshot(arguments.kb, arguments.snapshot or arguments.kb + SNAPSHOT_SUFFIX)
+    print("%d rows" % rows)
+
+
+if __name__ == "__main__":
+    main()
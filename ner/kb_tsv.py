@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A knowledge base read directly from its TSV file, an embedded replacement of the SharedKB daemon (see KnowledgeBase.init_embedded()).
+
+The file is memory-mapped and indexed by offsets of its lines, so rows are split into columns only when they are read.
+The KB consists of a line with its version, the head (a line with columns of each type of entity), an empty line and rows
+of entities; columns of a row are the columns of all its types (TYPE separated by "+", between __generic__ and __stats__).
+"""
+
+import mmap
+import re
+
+from collections import namedtuple
+
+import numpy
+
+TYPE_DELIM = "+"
+# the number of bytes of the KB searched for line feeds at once when its lines are indexed
+LINE_INDEX_CHUNK = 16 * 1024 * 1024
+
+# a column of the head of the KB, e.g. "{m[http://]}NATIONALITIES" is HeadColumn("NATIONALITIES", "m", "http://")
+HeadColumn = namedtuple("HeadColumn", ["name", "flags", "prefix_of_value"])
+
+RE_HEAD_COLUMN = re.compile(r"""(?ux)
+    ^
+    (?:<(?P<TYPE>[^>]+)>)?
+    (?:\{(?P<FLAGS>(?:\w|[ ])*)(?:\[(?P<PREFIX_OF_VALUE>[^\]]+)\])?\})?
+    (?P<NAME>(?:\w|[ ])+)?
+    $
+""")
+
+
+def parse_head(head_lines):
+    """ Returns a dictionary {type: [HeadColumn, ...]} of the lines of the head of the KB split into columns. """
+    head = {}
+    for fields in head_lines:
+        ent_type = None
+        columns = []
+        for col, field in enumerate(fields):
+            parsed = RE_HEAD_COLUMN.match(field)
+            if col == 0:
+                if parsed is None or parsed.group("TYPE") is None:
+                    raise ValueError("Invalid head of KB: %r" % field)
+                ent_type = parsed.group("TYPE")
+            if parsed is None:
+                columns.append(HeadColumn(None, None, None))
+            else:
+                columns.append(HeadColumn(parsed.group("NAME"), parsed.group("FLAGS"), parsed.group("PREFIX_OF_VALUE")))
+        head[ent_type] = columns
+    return head
+
+
+class TsvKB(object):
+    """
+    A knowledge base in a memory-mapped TSV file with the interface of KB_shm of the SharedKB daemon.
+
+    Lines (rows) and columns are numbered from 1 like in KB_shm; missing rows, columns and heads are None.
+    """
+
+    def __init__(self, path_kb):
+        self.path_kb = path_kb
+        self.kb_file = None
+        self.kb_map = None
+        self.kb_version = None
+        self.head = None
+        self.type_col = None
+        self.starts = None
+        self.ends = None
+        # resolved columns of rows of each TYPE
+        self._row_heads = {}
+        # the last split row (line, fields) shared by successive reads of its columns
+        self._last_row = (None, None)
+
+    def start(self):
+        """ Maps the KB and indexes its lines. """
+        self.kb_file = open(self.path_kb, "rb")
+        self.kb_map = mmap.mmap(self.kb_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        head_start = self.kb_map.find(b"\n") + 1
+        data_start = self.kb_map.find(b"\n\n", head_start - 1)
+        if head_start == 0 or data_start == -1:
+            self.end()
+            raise ValueError("KB file \"%s\" does not have a head separated by an empty line." % self.path_kb)
+        data_start += 2
+        self.kb_version = self.kb_map[:head_start - 1].decode("utf-8")
+        self.head = parse_head(line.split("\t") for line in self.kb_map[head_start:data_start - 2].decode("utf-8").split("\n"))
+        type_cols = set(col for columns in self.head.values() for col, column in enumerate(columns) if column.name == "TYPE")
+        if len(type_cols) != 1:
+            self.end()
+            raise ValueError("TYPE column must be at same column for each type of entity in head of KB.")
+        self.type_col = type_cols.pop()
+
+        ends = self._line_ends(data_start)
+        if len(self.kb_map) > data_start and self.kb_map[-1:] != b"\n":
+            ends = numpy.append(ends, len(self.kb_map))
+        self.ends = ends
+        self.starts = numpy.concatenate(([data_start], ends[:-1] + 1)).astype(numpy.int64) if len(ends) else ends
+        self._row_heads = {}
+        self._last_row = (None, None)
+
+    def _line_ends(self, data_start):
+        """ Returns offsets of line feeds after data_start, searched for in chunks of LINE_INDEX_CHUNK bytes of the mapped KB. """
+        chunks = [numpy.zeros(0, dtype=numpy.int64)]
+        for chunk_start in range(data_start, len(self.kb_map), LINE_INDEX_CHUNK):
+            # only a boolean array of one chunk is created, the view of the map is released before the map can be closed
+            chunk = numpy.frombuffer(self.kb_map, dtype=numpy.uint8, count=min(LINE_INDEX_CHUNK, len(self.kb_map) - chunk_start), offset=chunk_start)
+            chunks.append(numpy.flatnonzero(chunk == ord("\n")) + chunk_start)
+            del chunk
+        return numpy.concatenate(chunks)
+
+    def end(self):
+        """ Unmaps the KB. """
+        if self.kb_map is not None:
+            self.kb_map.close()
+            self.kb_map = None
+        if self.kb_file is not None:
+            self.kb_file.close()
+            self.kb_file = None
+
+    def check(self):
+        """ Checks, whether the KB is mapped. """
+        return self.kb_map is not None
+
+    def version(self):
+        return self.kb_version
+
+    def getVersionFromSrc(self, path_kb):
+        """ Returns the version of the KB in the file path_kb. """
+        with open(path_kb, encoding="utf-8") as kb_file:
+            return kb_file.readline().rstrip("\n")
+
+    def rows(self):
+        """ Returns the number of rows of the KB. """
+        return len(self.starts)
+
+    def fields(self, line):
+        """ Returns a list of columns of the row at the line, or None. """
+        last_line, fields = self._last_row
+        if line == last_line:
+            return fields
+        if not 0 < line <= len(self.starts):
+            return None
+        fields = self.kb_map[self.starts[line - 1]:self.ends[line - 1]].decode("utf-8").split("\t")
+        self._last_row = (line, fields)
+        return fields
+
+    def row_head(self, ent_type):
+        """ Returns a list of tuples (type, HeadColumn) of columns of a row of the TYPE, or None if a type is not in the head. """
+        if ent_type in self._row_heads:
+            return self._row_heads[ent_type]
+
+        ent_type_list = ent_type.split(TYPE_DELIM)
+        if "__generic__" in self.head and "__generic__" not in ent_type_list:
+            ent_type_list.insert(0, "__generic__")
+        if "__stats__" in self.head and "__stats__" not in ent_type_list:
+            ent_type_list.append("__stats__")
+
+        result = []
+        for ent_supertype in ent_type_list:
+            if ent_supertype not in self.head:
+                result = None
+                break
+            result.extend((ent_supertype, column) for column in self.head[ent_supertype])
+        self._row_heads[ent_type] = result
+        return result
+
+    def col_for(self, ent_type, col_name, col_name_type=None):
+        """ Returns the column (from 0) of col_name (of the type col_name_type) in a row of the TYPE, or None. """
+        row_head = self.row_head(ent_type)
+        if row_head is None:
+            return None
+        for col, (ent_supertype, column) in enumerate(row_head):
+            if column.name == col_name and (col_name_type is None or ent_supertype == col_name_type):
+                return col
+        return None
+
+    def dataAt(self, line, col):
+        fields = self.fields(line)
+        if fields is None or not 0 < col <= len(fields):
+            return None
+        return fields[col - 1]
+
+    def dataType(self, line):
+        return self.dataAt(line, self.type_col + 1)
+
+    def dataFor(self, line, col_name, col_name_type=None):
+        fields = self.fields(line)
+        if fields is None or self.type_col >= len(fields):
+            return None
+        col = self.col_for(fields[self.type_col], col_name, col_name_type)
+        if col is None or col >= len(fields):
+            return None
+        return fields[col]
+
+    def headAt(self, line, col):
+        ent_type = self.dataType(line)
+        return None if ent_type is None else self.headFor(ent_type, col)
+
+    def headFor(self, ent_type_set, col):
+        row_head = self.row_head(ent_type_set)
+        if row_head is None or not 0 < col <= len(row_head):
+            return None
+        return row_head[col - 1][1]
+
+    def headCol(self, ent_type_set, col_name, col_name_type=None):
+        col = self.col_for(ent_type_set, col_name, col_name_type)
+        return None if col is None else col + 1
@@ -9,6 +9,8 @@ from ...entity import Entity as BaseEntity
 
 
 class Entity(BaseEntity):
+    __slots__ = ()
+
     def apply_lang_depended_sense_rules(self):
         # only event can start with word během
         if(self.left_context(" během ")):
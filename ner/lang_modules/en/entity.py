@@ -9,6 +9,8 @@ from ...entity import Entity as BaseEntity
 
 
 class Entity(BaseEntity):
+    __slots__ = ()
+
     def apply_lang_depended_sense_rules(self):
         # locations cannot end with 's
         self.senses = [s for s in self.senses if not (("location" in self.kb.get_ent_type(s) or "locations" in self.kb.get_ent_type(s)) and self.right_context("'s"))]
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+from .ner_loader import NerLoader
+from libs.entities.entity_loader import EntityLoader
+from libs.lib_loader import LibLoader
+from libs.nationalities.nat_loader import NatLoader
+
+
+class LanguagePack(object):
+    """ Language dependent modules of one language shared by all entities, contexts and knowledge bases. """
+
+    def __init__(self, lang):
+        self.lang = lang
+        self.word_types = LibLoader.load(module = "word_types", lang = lang, initiate = "WordTypes")
+        self.entity_class = NerLoader.load_class(module = "entity", lang = lang, initiate = "Entity")
+        self.persons = EntityLoader.load(module = "persons", lang = lang, initiate = "Persons")
+        self.nationalities = NatLoader.get(lang)
+
+
+_language_packs = {}
+_language_packs_lock = threading.Lock()
+
+
+def get_language_pack(lang):
+    """ Returns the language pack of a given language (loaded only once per process). """
+    try:
+        return _language_packs[lang]
+    except KeyError:
+        with _language_packs_lock:
+            if lang not in _language_packs:
+                _language_packs[lang] = LanguagePack(lang)
+            return _language_packs[lang]
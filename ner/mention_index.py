@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left, bisect_right
+
+
+class MentionIndex(object):
+    """ Mentions (entities) grouped by a key (e.g. a sense) and ordered by their start offsets. """
+
+    def __init__(self):
+        self.starts = {}
+        self.mentions = {}
+
+    def __contains__(self, key):
+        return bool(self.starts.get(key))
+
+    def add(self, key, mention):
+        """ Adds a mention under a key (after mentions with the same start offset). """
+        if key not in self.starts:
+            self.starts[key] = []
+            self.mentions[key] = []
+        starts = self.starts[key]
+        i = bisect_right(starts, mention.start_offset)
+        starts.insert(i, mention.start_offset)
+        self.mentions[key].insert(i, mention)
+
+    def remove(self, key, mention):
+        """ Removes a mention from a key (if present). """
+        starts = self.starts.get(key)
+        if not starts:
+            return
+        mentions = self.mentions[key]
+        i = bisect_left(starts, mention.start_offset)
+        while i < len(starts) and starts[i] == mention.start_offset:
+            if mentions[i] is mention:
+                del starts[i]
+                del mentions[i]
+                return
+            i += 1
+
+    def nearest(self, key, offset):
+        """
+        Returns a tuple (distance, mention) for the mention of a key nearest to offset or None.
+        If the nearest preceding and following mentions have the same distance, the preceding one is returned.
+        """
+        starts = self.starts.get(key)
+        if not starts:
+            return None
+        mentions = self.mentions[key]
+
+        result = None
+        i = bisect_left(starts, offset)
+        if i > 0:
+            j = bisect_left(starts, starts[i - 1])
+            result = (offset - starts[j], mentions[j])
+        if i < len(starts) and (result is None or starts[i] - offset < result[0]):
+            result = (starts[i] - offset, mentions[i])
+        return result
+
+    def nearest_predecessor(self, key, offset, accept=None):
+        """ Returns the nearest mention of a key starting before offset (and accepted by a given function) or None. """
+        starts = self.starts.get(key)
+        if not starts:
+            return None
+        mentions = self.mentions[key]
+
+        for i in range(bisect_left(starts, offset) - 1, -1, -1):
+            if accept is None or accept(mentions[i]):
+                return mentions[i]
+        return None
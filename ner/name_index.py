@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A memory-mapped index of names to lines of the knowledge base, which replaces the pickled name dictionary of KnowledgeBase.
+
+The index is a directory of numpy arrays shared by all processes mapping it:
+  - names sorted as UTF-8 bytes (their data and offsets) and their first 8 bytes as big-endian integers for a binary search,
+  - lines of each name in CSR layout (offsets of the lines of each name into one array of lines),
+  - optionally, digests of columns of each line, from which the names were derived (for an incremental rebuild).
+"""
+
+import json
+import os
+import shutil
+
+import numpy
+
+INDEX_FORMAT = 1
+PREFIX_SIZE = 8
+
+
+def _prefixes(names):
+    """ Returns the first PREFIX_SIZE bytes of the names (padded by zeros) as big-endian integers. """
+    padded = numpy.array([name[:PREFIX_SIZE] for name in names], dtype="S%d" % PREFIX_SIZE)
+    return padded.view(">u8").astype(numpy.uint64)
+
+
+def build_name_index(name_dict, path_index, version, fragments=(), digests=None):
+    """
+    Writes a dictionary {name: set of lines} into the directory path_index (replaced only when it is complete).
+    digests - a sequence of 64-bit digests of lines of the KB (from 1), which can be compared by the next build
+    """
+    names = sorted((name.encode("utf-8"), name) for name in name_dict)
+
+    name_offsets = numpy.zeros(len(names) + 1, dtype=numpy.int64)
+    name_offsets[1:] = numpy.cumsum([len(name) for name, _ in names])
+    line_offsets = numpy.zeros(len(names) + 1, dtype=numpy.int64)
+    line_offsets[1:] = numpy.cumsum([len(name_dict[name]) for _, name in names])
+    lines = numpy.fromiter((line for _, name in names for line in sorted(name_dict[name])), dtype=numpy.uint32, count=int(line_offsets[-1]))
+
+    tmp_index = path_index + ".tmp"
+    shutil.rmtree(tmp_index, ignore_errors=True)
+    os.makedirs(tmp_index)
+    numpy.save(os.path.join(tmp_index, "names.data.npy"), numpy.frombuffer(b"".join(name for name, _ in names), dtype=numpy.uint8))
+    numpy.save(os.path.join(tmp_index, "names.offsets.npy"), name_offsets)
+    numpy.save(os.path.join(tmp_index, "names.prefixes.npy"), _prefixes([name for name, _ in names]))
+    numpy.save(os.path.join(tmp_index, "lines.offsets.npy"), line_offsets)
+    numpy.save(os.path.join(tmp_index, "lines.npy"), lines)
+    if digests is not None:
+        numpy.save(os.path.join(tmp_index, "digests.npy"), numpy.array(digests, dtype=numpy.uint64))
+    with open(os.path.join(tmp_index, "meta.json"), "w", encoding="utf-8") as meta_file:
+        json.dump({"format": INDEX_FORMAT, "version": str(version), "names": len(names), "fragments": sorted(fragments)}, meta_file, ensure_ascii=False)
+
+    shutil.rmtree(path_index, ignore_errors=True)
+    os.rename(tmp_index, path_index)
+
+
+class NameIndex(object):
+    """ A read-only memory-mapped index built by build_name_index(), used like a dictionary {name: set of lines}. """
+
+    def __init__(self, path_index):
+        with open(os.path.join(path_index, "meta.json"), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("format") != INDEX_FORMAT:
+            raise ValueError("Unsupported format of name index %r." % path_index)
+
+        def load(name):
+            return numpy.load(os.path.join(path_index, name), mmap_mode="r")
+
+        self.path = path_index
+        self.version = meta["version"]
+        self.fragments = set(meta["fragments"])
+        self.names = meta["names"]
+        self.name_data = load("names.data.npy")
+        self.name_offsets = load("names.offsets.npy")
+        self.name_prefixes = load("names.prefixes.npy")
+        self.line_offsets = load("lines.offsets.npy")
+        self.lines = load("lines.npy")
+        self.digests = load("digests.npy") if os.access(os.path.join(path_index, "digests.npy"), os.R_OK) else None
+
+    def __len__(self):
+        return self.names
+
+    def _name_at(self, index):
+        return self.name_data[self.name_offsets[index]:self.name_offsets[index + 1]].tobytes()
+
+    def find(self, name):
+        """ Returns the index of the name, or -1. """
+        key = name.encode("utf-8")
+        prefix = _prefixes([key])[0]
+        # names with the same prefix, then a binary search among them
+        lo = int(numpy.searchsorted(self.name_prefixes, prefix, side="left"))
+        hi = int(numpy.searchsorted(self.name_prefixes, prefix, side="right"))
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_name = self._name_at(mid)
+            if mid_name < key:
+                lo = mid + 1
+            elif mid_name > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def __contains__(self, name):
+        return self.find(name) >= 0
+
+    def to_dict(self):
+        """ Returns the whole index as a dictionary {name: set of lines}. """
+        names = self.name_data.tobytes()
+        name_offsets = self.name_offsets.tolist()
+        line_offsets = self.line_offsets.tolist()
+        lines = self.lines.tolist()
+        return {
+            names[name_offsets[i]:name_offsets[i + 1]].decode("utf-8"): set(lines[line_offsets[i]:line_offsets[i + 1]])
+            for i in range(self.names)
+        }
+
+    def get(self, name, default=None):
+        """ Returns a new set of lines of entities with the name, or default. """
+        index = self.find(name)
+        if index < 0:
+            return default
+        return set(self.lines[self.line_offsets[index]:self.line_offsets[index + 1]].tolist())
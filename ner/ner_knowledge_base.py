@@ -28,9 +28,11 @@ limitations under the License.
 import sys
 sys.path.append("..")
 
+import copy
+import hashlib
 import itertools
+import multiprocessing
 import os
-import pickle
 import re
 import unicodedata
 
@@ -39,15 +41,46 @@ from .kb_daemon import KbDaemon
 from .configs import *
 from importlib.machinery import SourceFileLoader
 from libs.utils import remove_accent
-from libs.entities.entity_loader import EntityLoader
+from .language_pack import get_language_pack
+from .row_cache import RowFeatureCache
+from .kb_snapshot import KBSnapshot, SNAPSHOT_SUFFIX
+from .kb_tsv import TsvKB
+from .name_index import NameIndex, build_name_index
 # Pro debugování:
 from libs.debug import print_dbg, print_dbg_en, cur_inspect
 
 
+# the KB and digests of its previous name dictionary shared with forked workers of KnowledgeBase.build_name_dict()
+name_dict_build = None
+
+
+def build_name_dict_shard(shard):
+	kb, old_digests = name_dict_build
+	return kb.name_dict_of_lines(*shard, old_digests)
+
+
 class KnowledgeBase(ABC):
+	# columns fetched by prefetch_rows() for rows of each type (read by Context and Entity, dates and nationalities are derived from them)
+	PREFETCHED_COLUMNS = (
+		("person", ("NAME", "GENDER", "ROLES", "JOBS", "DATE OF BIRTH", "DATE OF DEATH", "NATIONALITIES")),
+		("nationality", ("NAME", "ALIASES", "COUNTRY")),
+		("geo", ("NAME", "COUNTRY")),
+		("organization", ("NAME", "LOCATION", "FOUNDED", "CANCELLED")),
+		("event", ("NAME", "LOCATION", "START", "END")),
+	)
+
 	def __init__(self, lang):
 		self.lang = lang
-		self.personUtils = EntityLoader.load(module = 'persons', lang = self.lang, initiate = 'Persons')
+		self.personUtils = get_language_pack(self.lang).persons
+		# decoded features of rows shared by all documents
+		self.row_cache = RowFeatureCache()
+		# features of candidate rows of one document (only in a copy returned by prefetch_rows())
+		self.document_rows = None
+		# a memory-mapped snapshot of hot columns of the KB (see load_snapshot())
+		self.snapshot = None
+		self.snapshot_version = None
+		# the KB is read from its file instead of the shared memory (see init_embedded())
+		self.embedded = False
     
 	'''
 	Třída zapouzdřující KB.
@@ -64,11 +97,26 @@ class KnowledgeBase(ABC):
 		self.kb_daemon = None
 
 
+	def init_embedded(self, path_kb=None):
+		'''
+		Inicializace bez démona SharedKB: KB se čte přímo ze souboru TSV (see ner/kb_tsv.py), ve výchozím stavu z PATH_KB.
+		'''
+
+		self.kb_shm_name = None
+		self.kb_shm = TsvKB(path_kb if path_kb is not None else PATH_KB)
+		self.kb_daemon = None
+		self.embedded = True
+
+
 	def start(self):
 		'''
-		Připojí sdílenou paměť.
+		Připojí sdílenou paměť (nebo namapuje soubor KB, viz init_embedded()).
 		'''
 
+		if self.embedded:
+			self.kb_shm.start()
+			return
+
 		kb_daemon_run = self.check()
 
 		try:
@@ -129,52 +177,239 @@ class KnowledgeBase(ABC):
 		return self.kb_shm.version()
 
 
-	def initName_dict(self):
+	def load_snapshot(self, path_snapshot=None):
+		"""
+		Maps a columnar snapshot of the KB (built by ner/kb_snapshot.py, by default next to the file of the KB), so that hot
+		columns are read from it instead of the shared memory. The snapshot is used only if it was built from the file of
+		the KB and the KB in the shared memory has the same version. Returns True if the snapshot is used.
+		"""
+
+		path_kb = self.kb_shm.path_kb if self.embedded else PATH_KB
+		if path_snapshot is None:
+			path_snapshot = path_kb + SNAPSHOT_SUFFIX
+		self.snapshot = None
+		if not os.access(os.path.join(path_snapshot, "meta.json"), os.R_OK):
+			return False
+
+		snapshot = KBSnapshot(path_snapshot)
+		if not snapshot.is_built_from(path_kb) or self.version() != self.kb_shm.getVersionFromSrc(path_kb):
+			print_dbg_en("Snapshot \"", path_snapshot, "\" does not match the KB in the shared memory, it is not used.", delim="")
+			return False
+
+		self.snapshot = snapshot
+		self.snapshot_version = self.version()
+		return True
+
+
+	def check_row_cache(self):
+		"""
+		Drops cached features of rows and the snapshot, if the version of the KB in the shared memory has changed (called for each document or batch of documents).
+		"""
+		version = self.version()
+		if self.snapshot is not None and version != self.snapshot_version:
+			self.snapshot = None
+		self.row_cache.check_version(version)
+
+
+	def prefetch_rows(self, lines):
+		"""
+		Fetches features of the candidate rows of a document in one pass, before they are disambiguated.
+
+		Each row is read once: its type, score and only the columns read by Context and Entity for its types
+		(see PREFETCHED_COLUMNS), from which its dates and nationalities are derived. Returns a copy of the knowledge
+		base for the document, which reads features of these rows from its own table (so they can not be evicted
+		from the row cache before the disambiguation uses them) and other features as the knowledge base does.
+		"""
+
+		rows = {}
+		for line in sorted(lines):
+			# features cached by previous documents are reused, new ones are shared with following documents
+			features = self.row_cache.row(line)
+			if "ent_type" not in features:
+				features["ent_type"] = self._decode_ent_type(line)
+			if "score" not in features:
+				features["score"] = self._decode_score(line)
+
+			ent_type_set = features["ent_type"]
+			columns = []
+			for ent_type, type_columns in self.PREFETCHED_COLUMNS:
+				if ent_type in ent_type_set:
+					columns.extend(col_name for col_name in type_columns if col_name not in columns)
+			for col_name in columns or ["NAME"]:
+				if (col_name, None) not in features:
+					features[(col_name, None)] = self._decode_data_for(line, col_name, None)
+
+			data_for = lambda col_name: features[(col_name, None)]
+			if "person" in ent_type_set and "dates" not in features:
+				features["dates"] = self._dates_of_row(ent_type_set, data_for)
+			if ("person" in ent_type_set or "nationality" in ent_type_set) and "nationalities" not in features:
+				features["nationalities"] = self._nationalities_of_row(ent_type_set, data_for)
+			rows[line] = features
+
+		document_kb = copy.copy(self)
+		document_kb.document_rows = rows
+		return document_kb
+
+
+	def _get_row_feature(self, line, feature, decode):
+		"""
+		Returns a feature of the row at the line from the table of the document (see prefetch_rows()) or from the row cache.
+		"""
+
+		if self.document_rows is not None:
+			features = self.document_rows.get(line)
+			if features is not None and feature in features:
+				return features[feature]
+		return self.row_cache.get(line, feature, decode)
+
+
+	def initName_dict(self, workers=1, incremental=False):
 		'''
 		Dictionary asociates parts of person names with corresponding items of knowledge base.
+
+		workers - the number of forked processes building shards of lines of the dictionary
+		incremental - names are derived only from lines, whose columns with names have changed since the previous build
 		'''
 
-		PATH_NAMEDICT = os.path.join(SCRIPT_DIR, "ner_namedict.pkl")
+		PATH_NAMEDICT = os.path.join(SCRIPT_DIR, "ner_namedict.idx")
 		PATH_FRAGMENTS = os.path.join(SCRIPT_DIR, "ner_fragments.pkl")
 
-		self.name_dict = {}
-		self.fragments = set()
+		# Proto aby se nemusela znova procházet KB, vytvoří se index PATH_NAMEDICT (see ner/name_index.py).
+		# Index se bude mapovat z něj pokud soubor KB (PATH_KB, v embedded režimu otevřený soubor) bude starší než PATH_NAMEDICT - tím dojde k urychlení.
+		# Namapovaný index sdílí všechny procesy, jména se v něm hledají bez jeho načtení.
+		path_meta = os.path.join(PATH_NAMEDICT, "meta.json")
+		try:
+			name_index = NameIndex(PATH_NAMEDICT)
+		except (OSError, ValueError):
+			name_index = None
+
+		path_kb = self.kb_shm.path_kb if self.embedded else PATH_KB
+		if name_index is None or os.stat(path_kb).st_mtime >= os.stat(path_meta).st_mtime or name_index.version != str(self.version()):
+			self.build_name_dict(PATH_NAMEDICT, workers, name_index if incremental else None)
+			name_index = NameIndex(PATH_NAMEDICT)
+
+		self.name_dict = name_index
+		self.fragments = name_index.fragments
+
+
+	def build_name_dict(self, path_namedict, workers=1, previous=None):
+		'''
+		Vytvoří index jmen osob PATH_NAMEDICT ze všech řádků KB, rozdělených mezi workers procesů.
+		Je-li zadán předchozí index (previous), jména se odvodí jen z řádků, jejichž sloupce se jmény se změnily.
+		'''
+
+		global name_dict_build
 
-		# Proto aby se nemusela znova procházet KB, vytvoří se soubor PATH_NAMEDICT.
-		# Namedict se bude načítat z něj pokud PATH_KB bude starší než PATH_NAMEDICT - tím dojde k urychlení.
-		if (os.access(PATH_NAMEDICT, os.F_OK)) and (os.stat(PATH_KB).st_mtime < os.stat(PATH_NAMEDICT).st_mtime and os.path.getsize(PATH_NAMEDICT)):
-			with open(PATH_NAMEDICT, 'rb') as namedict_file:
-				version, self.name_dict, self.fragments = pickle.load(namedict_file)
+		lines = self.count_lines()
+		old_digests = previous.digests if previous is not None else None
+		shard_size = max(1, -(-lines // max(1, workers)))
+		shards = [(start, min(start + shard_size, lines + 1)) for start in range(1, lines + 1, shard_size)]
+
+		if workers > 1 and len(shards) > 1:
+			name_dict_build = (self, old_digests)
+			try:
+				with multiprocessing.get_context("fork").Pool(len(shards)) as pool:
+					results = pool.map(build_name_dict_shard, shards)
+			finally:
+				name_dict_build = None
+		else:
+			results = [self.name_dict_of_lines(start, end, old_digests) for start, end in shards]
+
+		if old_digests is not None:
+			name_dict = previous.to_dict()
+			# lines changed since the previous build or removed from the KB
+			changed = set(range(lines + 1, len(old_digests) + 1))
+			for _, _, shard_changed in results:
+				changed.update(shard_changed)
+			if changed:
+				for name in list(name_dict):
+					name_dict[name] -= changed
+					if not name_dict[name]:
+						del name_dict[name]
 		else:
-			version = -1
+			name_dict = {}
 
-		if version != self.version():
-			self.fragments = set()
-			namedict_file = open(PATH_NAMEDICT, 'wb')
-			line = 1
-			text = self.get_data_at(line, 1)
+		digests = []
+		for shard_name_dict, shard_digests, _ in results:
+			for name, name_lines in shard_name_dict.items():
+				if name not in name_dict:
+					name_dict[name] = name_lines
+				else:
+					name_dict[name] |= name_lines
+			digests.extend(shard_digests)
+		build_name_index(name_dict, path_namedict, self.version(), digests=digests)
+
+
+	def count_lines(self):
+		'''
+		Vrátí počet řádků KB (poslední řádek se hledá půlením intervalu).
+		'''
+
+		hi = 1
+		while self.get_data_at(hi, 1) != None:
+			hi *= 2
+		lo = hi // 2
+		while lo + 1 < hi:
+			mid = (lo + hi) // 2
+			if self.get_data_at(mid, 1) != None:
+				lo = mid
+			else:
+				hi = mid
+		return lo
+
+
+	def name_dict_of_lines(self, start, end, old_digests=None):
+		'''
+		Returns a tuple (dictionary {name: set of lines}, digests of lines, changed lines) of lines from start to end - 1.
+		Names are derived only from lines, whose digest differs from old_digests (if given).
+		Lines are read directly from the KB, not through the row cache, so the scan does not evict rows of documents.
+		'''
+
+		name_dict = {}
+		digests = []
+		changed = []
+		for line in range(start, end):
+			digest = self.get_name_columns_digest(line)
+			digests.append(digest)
+			if old_digests is not None and line <= len(old_digests) and int(old_digests[line - 1]) == digest:
+				continue
+			changed.append(line)
+			for name in self.get_person_names(line):
+				if name not in name_dict:
+					name_dict[name] = set([line])
+				else:
+					name_dict[name].add(line)
+		return name_dict, digests, changed
 
-			while text != None:
-				ent_type_set = self.get_ent_type(line)
 
-				if "person" in ent_type_set:
-					whole_names = self.get_data_for(line, "ALIASES", separator = KB_MULTIVALUE_DELIM)
-					whole_names.append(self.get_data_for(line, "NAME"))
+	def get_name_columns_digest(self, line):
+		'''
+		Returns a 64-bit digest of the type and the columns, from which names of a person at the line are derived.
+		'''
 
-					# creates subnames
-					names = self.personUtils.get_normalized_subnames(whole_names, roles = self.get_data_for(line, "ROLE", separator = KB_MULTIVALUE_DELIM), separate_to_names = True)
+		columns = [self._decode_ent_type(line)]
+		if "person" in columns[0]:
+			columns.extend(self._decode_data_for(line, col_name, None) or "" for col_name in ("NAME", "ALIASES", "ROLE"))
+		return int.from_bytes(hashlib.blake2b("\t".join(columns).encode("utf-8"), digest_size=8).digest(), "little")
 
-					for name in names:
-						name = remove_accent(name).lower()
-						if name not in self.name_dict:
-							self.name_dict[name] = set([line])
-						else:
-							self.name_dict[name].add(line)
-				line += 1
-				text = self.get_data_at(line, 1)
-			pickle.dump((self.version(), self.name_dict, self.fragments), namedict_file, pickle.HIGHEST_PROTOCOL)
 
-			namedict_file.close()
+	def get_person_names(self, line):
+		'''
+		Returns a set of normalized parts of names of a person at the line (an empty set for other entities).
+		The line is read directly from the KB, not through the row cache (see name_dict_of_lines()).
+		'''
+
+		ent_type_set = self._decode_ent_type(line)
+		if "person" not in ent_type_set:
+			return set()
+
+		split = lambda data: data.split(KB_MULTIVALUE_DELIM) if data else []
+		whole_names = split(self._decode_data_for(line, "ALIASES", None))
+		whole_names.append(self._decode_data_for(line, "NAME", None))
+
+		# creates subnames
+		names = self.personUtils.get_normalized_subnames(whole_names, roles = split(self._decode_data_for(line, "ROLE", None)), separate_to_names = True)
+		return set(remove_accent(name).lower() for name in names)
 
 
 	def print_subnames(self):
@@ -208,12 +443,20 @@ class KnowledgeBase(ABC):
 		Číslování řádků od 1.
 		'''
 
-		data = self.kb_shm.dataFor(line, col_name, col_name_type)
+		data = self._get_row_feature(line, (col_name, col_name_type), lambda line: self._decode_data_for(line, col_name, col_name_type))
 		if separator:
 			data = data.split(separator) if data else []
 		return data
 
 
+	def _decode_data_for(self, line, col_name, col_name_type):
+		if self.snapshot is not None and col_name_type is None:
+			data = self.snapshot.data_for(line, col_name)
+			if data is not None:
+				return data
+		return self.kb_shm.dataFor(line, col_name, col_name_type)
+
+
 	def get_head_at(self, line, col):
 		'''
 		Číslování řádků i sloupců od 1.
@@ -291,16 +534,36 @@ class KnowledgeBase(ABC):
 		Returns an type of an entity at the line of the knowledge base represent as an ordered set of type
 		"""
 
+		return self._get_row_feature(line, "ent_type", self._decode_ent_type)
+
+
+	def _decode_ent_type(self, line):
+		if self.snapshot is not None:
+			ent_type = self.snapshot.ent_type(line)
+			if ent_type is not None:
+				return ent_type
 		return str(self.kb_shm.dataType(line))
 
 
 	def get_dates(self, line):
-		ent_type_set = self.get_ent_type(line)
+		"""
+		Returns a frozen set of dates of birth and death of a person at the line.
+		"""
+
+		return self._get_row_feature(line, "dates", self._decode_dates)
+
+
+	def _decode_dates(self, line):
+		return self._dates_of_row(self.get_ent_type(line), lambda col_name: self.get_data_for(line, col_name))
+
+
+	@staticmethod
+	def _dates_of_row(ent_type_set, data_for):
 		if 'person' in ent_type_set:
-			dates = set([self.get_data_for(line, "DATE OF BIRTH"), self.get_data_for(line, "DATE OF DEATH")])
+			dates = set([data_for("DATE OF BIRTH"), data_for("DATE OF DEATH")])
 			dates.discard("")
-			return dates
-		return set()
+			return frozenset(dates)
+		return frozenset()
 
 
 	def get_location_code(self, line):
@@ -308,15 +571,28 @@ class KnowledgeBase(ABC):
 
 
 	def get_nationalities(self, line):
-		ent_type_set = self.get_ent_type(line)
+		"""
+		Returns a frozen set of lowercase nationalities of a person or a nationality at the line.
+		"""
+
+		return self._get_row_feature(line, "nationalities", self._decode_nationalities)
+
+
+	def _decode_nationalities(self, line):
+		return self._nationalities_of_row(self.get_ent_type(line), lambda col_name: self.get_data_for(line, col_name))
+
+
+	@staticmethod
+	def _nationalities_of_row(ent_type_set, data_for):
+		split = lambda data: data.split(KB_MULTIVALUE_DELIM) if data else []
 		if "nationality" in ent_type_set:
-			nation = self.get_data_for(line, "ALIASES", separator = KB_MULTIVALUE_DELIM)
-			# nation.extend(self.get_data_for(line, "ADJECTIVAL FORM").split(KB_MULTIVALUE_DELIM)) # NOT present in GKB
-			nation.append(self.get_data_for(line, "NAME"))
-			nation.append(self.get_data_for(line, "COUNTRY"))
+			nation = split(data_for("ALIASES"))
+			# nation.extend(data_for("ADJECTIVAL FORM").split(KB_MULTIVALUE_DELIM)) # NOT present in GKB
+			nation.append(data_for("NAME"))
+			nation.append(data_for("COUNTRY"))
 		elif "person" in ent_type_set:
-			nation = self.get_data_for(line, "NATIONALITIES", separator = KB_MULTIVALUE_DELIM)
-		nation = set([nat.lower() for nat in nation if nat != ""])
+			nation = split(data_for("NATIONALITIES"))
+		nation = frozenset([nat.lower() for nat in nation if nat != ""])
 		return nation
 
 
@@ -325,6 +601,15 @@ class KnowledgeBase(ABC):
 		Returns disambiguation score based on Wikipedia statistics and score based on other metrics.
 		'''
 
+		return self._get_row_feature(line, "score", self._decode_score)
+
+
+	def _decode_score(self, line):
+		if self.snapshot is not None:
+			score = self.snapshot.score(line)
+			if score is not None:
+				return score
+
 		result = self.get_data_for(line, "CONFIDENCE")
 
 		try:
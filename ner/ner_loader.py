@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
 import os
 import sys
 import importlib
@@ -8,7 +9,9 @@ import importlib.util
 
 class NerLoader():
 	@staticmethod
-	def load(module, lang, initiate):
+	@functools.lru_cache(maxsize=None)
+	def load_class(module, lang, initiate):
+		""" Returns a language dependent class (resolved only once for given arguments). """
 		module2import = "..lang_modules.{}.{}".format(lang, module)
 		package = __name__ if '.' in __name__ else '.' + __name__
 
@@ -18,6 +21,10 @@ class NerLoader():
 			module2import = module
 
 		lang_module = importlib.import_module(module2import, package)
-		LangClass = getattr(lang_module, initiate)
+		return getattr(lang_module, initiate)
+
+	@staticmethod
+	def load(module, lang, initiate):
+		LangClass = NerLoader.load_class(module, lang, initiate)
 
 		return LangClass(lang)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Resolving of overlapping mentions (entities, dates, proper nouns) by sorted intervals.
+
+All intervals are half-open (start, end) offset ranges, i.e. they cover offsets start, ..., end - 1.
+Callers treating end offsets as inclusive pass (start, end + 1).
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class IntervalSet(object):
+    """ A set of offsets kept as sorted disjoint intervals (touching intervals are merged). """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+
+        # building from sorted intervals in one pass
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end):
+        """ Adds offsets of the interval [start, end). """
+        if start >= end:
+            return
+
+        # intervals touching or overlapping [start, end) are merged with it
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def overlaps(self, start, end):
+        """ Returns True if any offset of the interval [start, end) is in the set. """
+        if start >= end:
+            return False
+
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and self.ends[i] > start:
+            return True
+        return i + 1 < len(self.starts) and self.starts[i + 1] < end
+
+    def containing(self, offset):
+        """ Returns the interval (start, end) of the set containing a given offset or None. """
+        i = bisect_right(self.starts, offset) - 1
+        if i >= 0 and self.ends[i] > offset:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def uncovered(self, start, end):
+        """ Returns a list of intervals covering offsets of [start, end), which are not in the set. """
+        result = []
+        i = max(bisect_right(self.starts, start) - 1, 0)
+        while start < end and i < len(self.starts) and self.starts[i] < end:
+            if self.ends[i] > start:
+                if self.starts[i] > start:
+                    result.append((start, self.starts[i]))
+                start = self.ends[i]
+            i += 1
+        if start < end:
+            result.append((start, end))
+        return result
+
+
+def find_overlapping(intervals, starts, start, end):
+    """
+    Returns indices of intervals overlapping [start, end).
+
+    intervals - a list of sorted disjoint intervals
+    starts - a list of their start offsets
+    """
+    result = []
+    if start >= end:
+        return result
+
+    i = max(bisect_right(starts, start) - 1, 0)
+    while i < len(intervals) and intervals[i][0] < end:
+        if intervals[i][1] > start and intervals[i][0] < intervals[i][1]:
+            result.append(i)
+        i += 1
+    return result
+
+
+def remove_overlapping(intervals):
+    """ Returns indices of intervals not overlapping any preceding retained interval (the first one wins). """
+    occupied = IntervalSet()
+    result = []
+    for i, (start, end) in enumerate(intervals):
+        if not occupied.overlaps(start, end):
+            occupied.add(start, end)
+            result.append(i)
+    return result
+
+
+def retain_overlapping_proper_nouns(intervals, proper_nouns, text):
+    """
+    Returns indices of intervals (entities) to be retained with respect to proper nouns found in text.
+
+    An entity not overlapping any proper noun is retained. Otherwise, it is retained if an overlapping proper noun
+    has no part uncovered by entities containing a space (except solitary spaces, e.g. Canadian Paul Verlaine),
+    or its uncovered part contains an apostrophe.
+
+    intervals - intervals of entities
+    proper_nouns - sorted disjoint intervals of proper nouns
+    text - the text where proper nouns were found
+    """
+    entities_offsets = IntervalSet(intervals)
+    # offsets of proper nouns not covered by entities as maximal runs (solitary spaces are determined inside them)
+    uncovered = IntervalSet(part for pn_start, pn_end in proper_nouns for part in entities_offsets.uncovered(pn_start, pn_end))
+
+    # whether entities overlapping a given proper noun are retained
+    retaining = []
+    for pn_start, pn_end in proper_nouns:
+        spaces = False
+        apostrophes = False
+        for part_start, part_end in entities_offsets.uncovered(pn_start, pn_end):
+            run_start, run_end = uncovered.containing(part_start)
+            # a space is not solitary if a neighbouring offset in the same run is also a space
+            if text.find("  ", max(run_start, part_start - 1), min(run_end, part_end + 1)) != -1:
+                spaces = True
+            if text.find("'", part_start, part_end) != -1:
+                apostrophes = True
+        retaining.append(not spaces or apostrophes)
+
+    pn_starts = [pn_start for pn_start, _ in proper_nouns]
+    result = []
+    for i, (start, end) in enumerate(intervals):
+        overlapping = find_overlapping(proper_nouns, pn_starts, start, end)
+        if not overlapping or any(retaining[pn] for pn in overlapping):
+            result.append(i)
+    return result
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import regex
+
+from libs.utils import remove_accent_unicode
+
+
+class ProperNounScanner(object):
+    """
+    A scanner of proper nouns (sequences of capitalized words) compiled once per language.
+
+    Proper nouns are searched in the input with removed accent, so that offsets of proper nouns match offsets of entities.
+    """
+
+    def __init__(self, preps, titles):
+        # a set of frequent titles, degrees etc. (Mayor, King, Sir, ...), which do not start a proper noun
+        self.titles = frozenset(titles)
+
+        word = r"\p{Lu}[\p{L}'\-]*"
+        # longer prepositions first (e.g. "upon" before "up")
+        re_preps = "".join(r"| {}".format(regex.escape(prep)) for prep in sorted(preps, key=lambda prep: (-len(prep), prep)))
+        self.regex = regex.compile(r"(?<!\. |\? |! |: |\s{2})" + word + r"(?: " + word + re_preps + r")* " + word)
+
+    @classmethod
+    def from_file(cls, preps, f_titles):
+        """ Creates a scanner with titles from a given file (one per line), if it exists. """
+        titles = []
+        if os.path.exists(f_titles):
+            with open(f_titles) as f:
+                titles = [line.strip() for line in f]
+        return cls(preps, titles)
+
+    def find(self, text):
+        """ Returns a list of (start, end) offsets of proper nouns in a given text (with removed accent). """
+        result = []
+        for pn in self.regex.finditer(text):
+            if pn.start() != 0 and pn.group(0).split(" ", 1)[0] not in self.titles:
+                result.append((pn.start(), pn.end()))
+        return result
+
+    def scan(self, input_string):
+        """ Returns the input with removed accent along with a list of offsets of proper nouns found in it. """
+        input_without_accent = remove_accent_unicode(input_string)
+        return input_without_accent, self.find(input_without_accent)
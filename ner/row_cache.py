@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+from collections import OrderedDict
+
+
+class RowFeatureCache(object):
+    """
+    A bounded LRU cache of decoded features of rows of the knowledge base (entity types, scores, columns, ...).
+
+    It is kept by the knowledge base across documents, so features of popular entities are decoded only once.
+    Features of a row are kept together, the least recently used rows are evicted when the cache is full.
+    All rows are dropped when the version of the knowledge base changes (see check_version()).
+    """
+
+    def __init__(self, capacity=100000):
+        assert capacity > 0
+
+        self.capacity = capacity
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, line, feature, decode):
+        """ Returns a feature of the row at line, decoded by decode(line) only if it is not cached. """
+        with self._lock:
+            features = self._rows.get(line)
+            if features is None:
+                features = self._rows[line] = {}
+                if len(self._rows) > self.capacity:
+                    self._rows.popitem(last=False)
+            else:
+                self._rows.move_to_end(line)
+            if feature in features:
+                self.hits += 1
+                return features[feature]
+            self.misses += 1
+
+        # decoding without the lock, a feature decoded by two threads at once is the same
+        value = decode(line)
+        features[feature] = value
+        return value
+
+    def row(self, line):
+        """ Returns a dictionary of cached features of the row at line, in which missing features may be stored (a hit, if the row is cached). """
+        with self._lock:
+            features = self._rows.get(line)
+            if features is None:
+                self.misses += 1
+                features = self._rows[line] = {}
+                if len(self._rows) > self.capacity:
+                    self._rows.popitem(last=False)
+            else:
+                self.hits += 1
+                self._rows.move_to_end(line)
+            return features
+
+    def check_version(self, version):
+        """ Drops all rows, if they were decoded from another version of the knowledge base. """
+        with self._lock:
+            if version != self.version:
+                self._rows.clear()
+                self.version = version
+
+    def clear(self):
+        """ Drops all rows and resets the counters. """
+        with self._lock:
+            self._rows.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ Returns the counters as a JSON serializable dictionary. """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rows": len(self._rows),
+            "capacity": self.capacity,
+            "version": self.version,
+        }
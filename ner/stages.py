@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentation of stages of recognition of a document.
+
+A stage ends by calling StageTrace.stage() with its name and resulting entities; it starts where the previous one ended.
+Recognition without a trace uses NO_TRACE, which neither measures time nor counts entities.
+"""
+
+import difflib
+import time
+
+from collections import namedtuple
+
+from libs.debug import print_dbg_en
+
+
+# a stage of recognition, entity counts are None for stages without entities
+StageTiming = namedtuple("StageTiming", "name duration entities_in entities_out")
+
+
+class StageTrace(object):
+    """ Durations (by a monotonic clock) and entity counts of stages of recognition of one document. """
+
+    def __init__(self, callback=None):
+        """ callback - a function called with a StageTiming and resulting entities after each stage (its time is not measured) """
+        self.callback = callback
+        self.timings = []
+        self.started = time.monotonic()
+        self.last = self.started
+        self.count = None
+
+    def start(self):
+        """ Starts measuring the first stage. """
+        self.timings = []
+        self.started = time.monotonic()
+        self.last = self.started
+        self.count = None
+
+    def stage(self, name, entities=None):
+        """ Ends a stage with given resulting entities (an iterable with length). """
+        now = time.monotonic()
+        count = len(entities) if entities is not None else None
+        timing = StageTiming(name, now - self.last, self.count, count)
+        self.timings.append(timing)
+        if count is not None:
+            self.count = count
+        if self.callback:
+            self.callback(timing, entities)
+            now = time.monotonic()
+        self.last = now
+
+    def duration(self):
+        """ Returns the total duration of all stages. """
+        return sum(timing.duration for timing in self.timings)
+
+    def as_dict(self):
+        """ Returns the timings as a JSON serializable dictionary. """
+        return {
+            "duration": self.duration(),
+            "stages": [timing._asdict() for timing in self.timings],
+        }
+
+
+class NullStageTrace(object):
+    """ A trace that does not record anything. """
+
+    def start(self):
+        pass
+
+    def stage(self, name, entities=None):
+        pass
+
+
+NO_TRACE = NullStageTrace()
+
+
+class EntityChangesPrinter(object):
+    """ A stage callback printing changes of entities after each stage to stderr (for debugging). """
+
+    def __init__(self):
+        self.last_status = None
+
+    def __call__(self, timing, entities):
+        if entities is None:
+            return
+
+        status = [e + "\n" for e in map(str, sorted(entities, key=lambda ent: ent.start_offset))]
+        if self.last_status is not None:
+            diff = "".join(difflib.unified_diff(self.last_status, status, fromfile='before', tofile='after', n=0))[:-1]
+            if diff:
+                # reporting the frame of recognition calling StageTrace.stage()
+                print_dbg_en(timing.name, diff, delim="\n", stack_num=4)
+        self.last_status = status
@@ -0,0 +1,11 @@
+from unittest import TestCase
+
+from ner.document import Document
+from ner.language_pack import get_language_pack
+
+
+class TestDocument(TestCase):
+    def test_entity_slots(self) -> None:
+        self.assertFalse(hasattr(Document("Praha"), "__dict__"))
+        entity = get_language_pack("cs").entity_class("cs")
+        self.assertFalse(hasattr(entity, "__dict__"))
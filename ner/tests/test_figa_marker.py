@@ -0,0 +1,152 @@
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from unittest import TestCase, skipUnless
+
+from libs.automata_variants import AutomataVariants
+from libs.utils import remove_accent_unicode
+
+FIGA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "figa")
+FIGA_BINARY = os.path.join(FIGA_DIR, "figav1.0")
+
+try:
+    from figa import marker as figa_marker
+except ImportError:
+    figa_marker = None
+
+NAMELIST = "Praha\t1;3\nKarel Čapek\t2\nKarel\tN\nPraha 4\t4\nBrno\t5\nbrno\t5\n"
+
+TEXT = "Karel Čapek navštívil Prahu, Praha 4 a Brno. Karel bydlel v Praze, ne v Brně.\nPraha"
+
+
+def _parse_figa_output(output: str) -> List[Tuple[Tuple[int, ...], int, int, str, str]]:
+    """Parses the text output of figa into tuples like ner.FigaOutput (see ner.lookup_figa_matches())."""
+    result = []
+    for line in output.split("\n"):
+        if line:
+            kb_rows, start_offset, end_offset, fragment, flag = line.split("\t")
+            result.append((tuple(map(int, kb_rows.split(";"))), int(start_offset.lstrip("*")) - 1, int(end_offset), fragment, flag))
+    return result
+
+
+@skipUnless(figa_marker is not None and os.access(FIGA_BINARY, os.X_OK), "figa is not built")
+class TestFigaMarker(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        namelist = os.path.join(self.tmpdir.name, "namelist.txt")
+        with open(namelist, "w", encoding="utf-8") as f:
+            f.write(NAMELIST)
+        with open(os.path.join(self.tmpdir.name, "namelist-lower.txt"), "w", encoding="utf-8") as f:
+            f.write(NAMELIST.lower())
+        # the type of the automata (darts or cedar) is given by the extension
+        for automata in ("automata.dct", "automata.ct"):
+            subprocess.run(
+                [FIGA_BINARY, "-n", "-d", namelist, "-w", automata],
+                cwd=self.tmpdir.name, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True,
+            )
+        with open(os.path.join(self.tmpdir.name, "namelist-nonaccent.txt"), "w", encoding="utf-8") as f:
+            f.write(remove_accent_unicode(NAMELIST.lower()))
+        for namelist, automata in (("namelist-lower.txt", "automata-lower.ct"), ("namelist-nonaccent.txt", "automata-nonaccent.dct")):
+            subprocess.run(
+                [FIGA_BINARY, "-n", "-d", namelist, "-w", automata],
+                cwd=self.tmpdir.name, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True,
+            )
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_lookup_matches(self) -> None:
+        for automata in ("automata.dct", "automata.ct"):
+            for text in (TEXT, TEXT.lower()):
+                seek_names = figa_marker.marker()
+                self.assertTrue(seek_names.load_dict(os.path.join(self.tmpdir.name, automata)))
+                matches = seek_names.lookup_matches(text)
+                self.assertTrue(matches)
+                self.assertEqual(_parse_figa_output(seek_names.lookup_string(text)), matches)
+                for _, start_offset, end_offset, fragment, _ in matches:
+                    self.assertEqual(fragment, text[start_offset:end_offset])
+
+    def test_lookup_matches_batch(self) -> None:
+        seek_names = figa_marker.marker()
+        self.assertTrue(seek_names.load_dict(os.path.join(self.tmpdir.name, "automata.dct")))
+        texts = [TEXT * i for i in range(20)] + [TEXT.lower()]
+        expected = [seek_names.lookup_matches(text) for text in texts]
+        self.assertEqual(expected, seek_names.lookup_matches_batch(texts))
+        self.assertEqual(expected, seek_names.lookup_matches_batch(tuple(texts), 1))
+        self.assertEqual(expected, seek_names.lookup_matches_batch(texts, 64))
+        self.assertEqual([], seek_names.lookup_matches_batch([]))
+        with self.assertRaises(TypeError):
+            seek_names.lookup_matches_batch([TEXT, 1])
+
+    def test_concurrent_lookups(self) -> None:
+        seek_names = figa_marker.marker()
+        self.assertTrue(seek_names.load_dict(os.path.join(self.tmpdir.name, "automata.ct")))
+        texts = [TEXT * i for i in range(40)]
+        with ThreadPoolExecutor(8) as executor:
+            strings = list(executor.map(seek_names.lookup_string, texts))
+            matches = list(executor.map(seek_names.lookup_matches, texts))
+        self.assertEqual([seek_names.lookup_string(text) for text in texts], strings)
+        self.assertEqual([seek_names.lookup_matches(text) for text in texts], matches)
+
+    def test_mapped_load(self) -> None:
+        texts = [TEXT, TEXT.lower(), "", "Praha"]
+        for automata in ("automata.dct", "automata.ct"):
+            path = os.path.join(self.tmpdir.name, automata)
+            heap = figa_marker.marker()
+            self.assertTrue(heap.load_dict(path))
+            mapped = figa_marker.marker()
+            self.assertTrue(mapped.load_dict(path, True))
+            for text in texts:
+                self.assertEqual(heap.lookup_string(text), mapped.lookup_string(text))
+                self.assertEqual(heap.lookup_matches(text), mapped.lookup_matches(text))
+
+            # loading another automata releases the mapped one
+            self.assertTrue(mapped.load_dict(path))
+            self.assertEqual(heap.lookup_matches(TEXT), mapped.lookup_matches(TEXT))
+            self.assertFalse(mapped.load_dict(os.path.join(self.tmpdir.name, "missing" + os.path.splitext(automata)[1]), True))
+
+    def test_lookup_variants(self) -> None:
+        paths = [os.path.join(self.tmpdir.name, automata) for automata in ("automata.dct", "automata-lower.ct")]
+        seek_names = figa_marker.marker()
+        self.assertTrue(seek_names.load_dict(paths[0]))
+        self.assertTrue(seek_names.add_dict(paths[1], 1, True))
+        self.assertFalse(seek_names.add_dict(os.path.join(self.tmpdir.name, "missing.ct"), 2))
+
+        text = TEXT + " praha 4, karel čapek a Brno"
+        expected = []
+        for variant, path in enumerate(paths):
+            single = figa_marker.marker()
+            self.assertTrue(single.load_dict(path))
+            expected.extend(match + (variant,) for match in single.lookup_matches(text))
+        expected.sort(key=lambda match: match[1])
+
+        matches = seek_names.lookup_variants(text)
+        self.assertEqual(expected, matches)
+        self.assertEqual({0, 1}, {match[5] for match in matches})
+        # other lookups use only the automata loaded by load_dict()
+        self.assertEqual([match[:5] for match in expected if match[5] == 0], seek_names.lookup_matches(text))
+        self.assertEqual([], figa_marker.marker().lookup_variants(text))
+
+    def test_folding(self) -> None:
+        lowercase = AutomataVariants.LOWERCASE.value
+        nonaccent = AutomataVariants.LOWERCASE | AutomataVariants.NONACCENT
+        texts = [TEXT, TEXT.upper(), "KAREL ČAPEK, karel capek a Karel Capek v Brne.", "BRNO, brno, Brnó, \xff\u0130"]
+        for automata, fold, fold_text in (
+            ("automata-lower.ct", lowercase, str.lower),
+            ("automata-nonaccent.dct", nonaccent, lambda text: remove_accent_unicode(text.lower())),
+        ):
+            folding = figa_marker.marker()
+            self.assertTrue(folding.load_dict(os.path.join(self.tmpdir.name, automata), True, fold))
+            seek_names = figa_marker.marker()
+            self.assertTrue(seek_names.load_dict(os.path.join(self.tmpdir.name, automata)))
+            for text in texts:
+                folded = fold_text(text)
+                if len(folded) != len(text):
+                    # Python changes the length of the text, figa does not change offsets
+                    folded = fold_text(text[:-1]) + text[-1]
+                # offsets are the same as in the folded text, fragments are from the original text
+                expected = [(values, start, end, text[start:end], flag) for values, start, end, _, flag in seek_names.lookup_matches(folded)]
+                self.assertTrue(expected)
+                self.assertEqual(expected, folding.lookup_matches(text))
@@ -0,0 +1,95 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from ner import ner_knowledge_base
+from ner.kb_snapshot import KBSnapshot, SNAPSHOT_SUFFIX, build_snapshot
+from ner.lang_modules.cs.ner_knowledge_base import KnowledgeBase
+from ner.tests.test_row_cache import FakeSharedKB
+
+KB = (
+    "VERSION=1\n"
+    "<__generic__>ID\tTYPE\tNAME\tALIASES\t{m}CONFIDENCE\n"
+    "<person>GENDER\tDATE OF BIRTH\tDATE OF DEATH\t{m[http://]}NATIONALITIES\tROLES\n"
+    "<geo:country>COUNTRY\n"
+    "<__stats__>{e}SCORE\n"
+    "\n"
+    "p1\tperson\tKarel Čapek\t\t12.5\tM\t1890\t1938\tčeská|rakouská\tspisovatel\t1\n"
+    "c1\tgeo:country\tČesko\tČeská republika\t80\tCZ\t2\n"
+    "x1\tunknown\tNěco\t\tn/a\n"
+    "p2\tperson+geo:country\tŽena\t\t\tF\t\t\t\t\tSK\t3\n"
+)
+
+
+class TestKBSnapshot(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path_kb = os.path.join(self.tmpdir.name, "KB.tsv")
+        with open(self.path_kb, "w", encoding="utf-8") as f:
+            f.write(KB)
+        self.path_snapshot = self.path_kb + SNAPSHOT_SUFFIX
+        self.assertEqual(4, build_snapshot(self.path_kb, self.path_snapshot))
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_snapshot(self) -> None:
+        snapshot = KBSnapshot(self.path_snapshot)
+        self.assertEqual("VERSION=1", snapshot.version)
+        self.assertTrue(snapshot.is_built_from(self.path_kb))
+
+        self.assertEqual(["person", "geo:country", "unknown", "person+geo:country"], [snapshot.ent_type(line) for line in range(1, 5)])
+        self.assertEqual([12.5, 80.0, None, None], [snapshot.score(line) for line in range(1, 5)])
+        self.assertEqual("Karel Čapek", snapshot.data_for(1, "NAME"))
+        self.assertEqual("M", snapshot.data_for(1, "GENDER"))
+        self.assertEqual("1890", snapshot.data_for(1, "DATE OF BIRTH"))
+        self.assertEqual("česká|rakouská", snapshot.data_for(1, "NATIONALITIES"))
+        self.assertEqual("CZ", snapshot.data_for(2, "COUNTRY"))
+        self.assertEqual("", snapshot.data_for(4, "DATE OF BIRTH"))
+        self.assertEqual("SK", snapshot.data_for(4, "COUNTRY"))
+
+        # columns not defined for the type of the row, unknown types, other columns and lines are not served
+        self.assertIsNone(snapshot.data_for(1, "COUNTRY"))
+        self.assertIsNone(snapshot.data_for(2, "GENDER"))
+        self.assertIsNone(snapshot.data_for(3, "NAME"))
+        self.assertIsNone(snapshot.data_for(1, "ALIASES"))
+        self.assertIsNone(snapshot.data_for(5, "NAME"))
+        self.assertIsNone(snapshot.ent_type(0))
+
+        # the snapshot is rebuilt when the KB changes
+        with open(self.path_kb, "a", encoding="utf-8") as f:
+            f.write("c2\tgeo:country\tSlovensko\t\t70\tSK\t4\n")
+        self.assertFalse(snapshot.is_built_from(self.path_kb))
+        self.assertEqual(5, build_snapshot(self.path_kb, self.path_snapshot))
+        self.assertEqual("Slovensko", KBSnapshot(self.path_snapshot).data_for(5, "NAME"))
+
+    def test_knowledge_base(self) -> None:
+        kb = KnowledgeBase("cs")
+        kb.kb_shm = FakeSharedKB({
+            1: {"TYPE": "person", "CONFIDENCE": "12.5", "GENDER": "M", "ALIASES": "Čapek"},
+            3: {"TYPE": "unknown", "CONFIDENCE": "1"},
+        })
+        kb.kb_shm.getVersionFromSrc = lambda path_kb: kb.kb_shm.kb_version
+        with mock.patch.object(ner_knowledge_base, "PATH_KB", self.path_kb):
+            self.assertFalse(kb.load_snapshot(self.path_snapshot + ".missing"))
+            self.assertTrue(kb.load_snapshot())
+        kb.check_row_cache()
+
+        self.assertEqual("person", kb.get_ent_type(1))
+        self.assertEqual(12.5, kb.get_score(1))
+        self.assertEqual("M", kb.get_data_for(1, "GENDER"))
+        self.assertEqual(frozenset({"1890", "1938"}), kb.get_dates(1))
+        self.assertEqual({"česká", "rakouská"}, kb.get_nationalities(1))
+        self.assertEqual({}, dict(kb.kb_shm.calls))
+
+        # other columns and features missing in the snapshot are read from the shared memory
+        self.assertEqual("Čapek", kb.get_data_for(1, "ALIASES"))
+        self.assertEqual(1.0, kb.get_score(3))
+        self.assertEqual({"dataFor": 2}, dict(kb.kb_shm.calls))
+
+        # the snapshot is dropped with another version of the KB in the shared memory
+        kb.kb_shm.kb_version = "2"
+        kb.check_row_cache()
+        self.assertIsNone(kb.snapshot)
+        self.assertEqual("person", kb.get_ent_type(1))
+        self.assertEqual({"dataFor": 2, "dataType": 1}, dict(kb.kb_shm.calls))
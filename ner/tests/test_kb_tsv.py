@@ -0,0 +1,112 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from ner import kb_tsv
+from ner.kb_snapshot import build_snapshot, SNAPSHOT_SUFFIX
+from ner.kb_tsv import HeadColumn, TsvKB
+from ner.lang_modules.cs.ner_knowledge_base import KnowledgeBase
+from ner.tests.test_kb_snapshot import KB
+
+
+class TestTsvKB(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path_kb = os.path.join(self.tmpdir.name, "KB.tsv")
+        with open(self.path_kb, "w", encoding="utf-8") as f:
+            f.write(KB)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_accessors(self) -> None:
+        kb = TsvKB(self.path_kb)
+        self.assertFalse(kb.check())
+        kb.start()
+        self.assertTrue(kb.check())
+        self.assertEqual("VERSION=1", kb.version())
+        self.assertEqual(kb.version(), kb.getVersionFromSrc(self.path_kb))
+        self.assertEqual(4, kb.rows())
+
+        self.assertEqual("p1", kb.dataAt(1, 1))
+        self.assertEqual("Česko", kb.dataAt(2, 3))
+        self.assertIsNone(kb.dataAt(3, 6))
+        self.assertIsNone(kb.dataAt(5, 1))
+        self.assertEqual(["person", "geo:country", "unknown", "person+geo:country"], [kb.dataType(line) for line in range(1, 5)])
+
+        self.assertEqual("Karel Čapek", kb.dataFor(1, "NAME"))
+        self.assertEqual("česká|rakouská", kb.dataFor(1, "NATIONALITIES"))
+        self.assertEqual("1", kb.dataFor(1, "SCORE"))
+        self.assertEqual("CZ", kb.dataFor(2, "COUNTRY"))
+        self.assertEqual("SK", kb.dataFor(4, "COUNTRY", "geo:country"))
+        self.assertEqual("3", kb.dataFor(4, "SCORE", "__stats__"))
+        self.assertIsNone(kb.dataFor(4, "COUNTRY", "person"))
+        self.assertIsNone(kb.dataFor(1, "COUNTRY"))
+        self.assertIsNone(kb.dataFor(3, "NAME"))
+
+        self.assertEqual(HeadColumn("NATIONALITIES", "m", "http://"), kb.headAt(1, 9))
+        self.assertEqual(HeadColumn("CONFIDENCE", "m", None), kb.headFor("geo:country", 5))
+        self.assertEqual(HeadColumn("ID", None, None), kb.headFor("person", 1))
+        self.assertIsNone(kb.headFor("person", 12))
+        self.assertIsNone(kb.headFor("unknown", 1))
+        self.assertEqual(11, kb.headCol("person+geo:country", "COUNTRY"))
+        self.assertEqual(12, kb.headCol("person+geo:country", "SCORE"))
+        self.assertIsNone(kb.headCol("person", "COUNTRY"))
+
+        kb.end()
+        self.assertFalse(kb.check())
+
+    def test_last_line_without_newline(self) -> None:
+        with open(self.path_kb, "w", encoding="utf-8") as f:
+            f.write(KB.rstrip("\n"))
+        kb = TsvKB(self.path_kb)
+        kb.start()
+        self.assertEqual(4, kb.rows())
+        self.assertEqual("3", kb.dataFor(4, "SCORE"))
+        kb.end()
+
+    def test_chunked_line_index(self) -> None:
+        for content in (KB, KB.rstrip("\n"), KB[:KB.index("\n\n") + 2]):
+            with open(self.path_kb, "w", encoding="utf-8") as f:
+                f.write(content)
+            kb = TsvKB(self.path_kb)
+            kb.start()
+            for chunk in (1, 2, 7, 1000):
+                with mock.patch.object(kb_tsv, "LINE_INDEX_CHUNK", chunk):
+                    chunked = TsvKB(self.path_kb)
+                    chunked.start()
+                self.assertEqual(kb.starts.tolist(), chunked.starts.tolist())
+                self.assertEqual(kb.ends.tolist(), chunked.ends.tolist())
+                chunked.end()
+            self.assertEqual(content.count("\n", content.index("\n\n") + 2) + (content[-1] != "\n"), kb.rows())
+            self.assertIsNone(kb.dataAt(kb.rows() + 1, 1))
+            kb.end()
+
+    def test_invalid_kb(self) -> None:
+        with open(self.path_kb, "w", encoding="utf-8") as f:
+            f.write(KB.replace("\n\n", "\n"))
+        with self.assertRaises(ValueError):
+            TsvKB(self.path_kb).start()
+
+    def test_embedded_knowledge_base(self) -> None:
+        kb = KnowledgeBase("cs")
+        kb.init_embedded(self.path_kb)
+        kb.start()
+        try:
+            self.assertTrue(kb.check())
+            kb.check_row_cache()
+            self.assertEqual("person", kb.get_ent_type(1))
+            self.assertEqual(12.5, kb.get_score(1))
+            self.assertEqual(80.0, kb.get_score(2))
+            self.assertEqual(frozenset({"1890", "1938"}), kb.get_dates(1))
+            self.assertEqual({"česká", "rakouská"}, kb.get_nationalities(1))
+            self.assertEqual(["spisovatel"], kb.get_data_for(1, "ROLES", separator="|"))
+            self.assertEqual("Česká republika", kb.get_data_for(2, "ALIASES"))
+
+            # a snapshot built from the same file is used by the embedded KB
+            self.assertFalse(kb.load_snapshot())
+            build_snapshot(self.path_kb, self.path_kb + SNAPSHOT_SUFFIX)
+            self.assertTrue(kb.load_snapshot())
+            self.assertEqual("CZ", kb.snapshot.data_for(2, "COUNTRY"))
+        finally:
+            kb.end()
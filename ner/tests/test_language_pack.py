@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from ner.entity import Entity
+from ner.language_pack import get_language_pack
+
+
+class TestLanguagePack(TestCase):
+    def test_shared(self) -> None:
+        pack = get_language_pack("cs")
+        self.assertIs(pack, get_language_pack("cs"))
+        self.assertTrue(issubclass(pack.entity_class, Entity))
+
+        # entities share word types of their language
+        self.assertIs(pack.word_types, pack.entity_class("cs").word_types)
+        self.assertIs(pack.word_types, pack.entity_class("cs").word_types)
+
+    def test_nationalities(self) -> None:
+        nationalities = get_language_pack("cs").nationalities
+        self.assertIs(nationalities, get_language_pack("cs").nationalities)
+        self.assertEqual(set(nationalities.get_nationalities()), nationalities.get_nationalities_set())
+        self.assertIs(nationalities.get_nationalities_set(), nationalities.get_nationalities_set())
+        for form in nationalities.get_nationalities()[:10]:
+            self.assertTrue(nationalities.is_nationality(form))
+        self.assertFalse(nationalities.is_nationality("Praha"))
@@ -0,0 +1,76 @@
+from random import Random
+from typing import List, Optional
+from unittest import TestCase
+
+from ner.mention_index import MentionIndex
+
+
+class _Mention:
+    def __init__(self, start_offset: int, source: str) -> None:
+        self.start_offset = start_offset
+        self.source = source
+
+
+def _reference_nearest_predecessor(candidates: List[_Mention], offset: int) -> Optional[_Mention]:
+    """Former sorting implementation of choosing the nearest predecessor."""
+    for candidate in sorted(candidates, key=lambda c: offset - c.start_offset):
+        if offset - candidate.start_offset > 0:
+            return candidate
+    return None
+
+
+def _reference_nearest(candidates: List[_Mention], offset: int) -> _Mention:
+    """Former sorting implementation of choosing the nearest entity."""
+    return sorted(candidates, key=lambda c: abs(offset - c.start_offset))[0]
+
+
+class TestMentionIndex(TestCase):
+    _rounds: int = 500
+
+    def test_nearest(self) -> None:
+        rnd = Random(1)
+        for _ in range(self._rounds):
+            keys = [rnd.randrange(4) for _ in range(rnd.randrange(1, 4))]
+            index = MentionIndex()
+            # strong entities come in the order of the document
+            candidates = {}
+            for start in sorted(rnd.sample(range(100), rnd.randrange(1, 20))):
+                mention = _Mention(start, "")
+                key = rnd.randrange(4)
+                index.add(key, mention)
+                candidates.setdefault(key, []).append(mention)
+            offset = rnd.randrange(100)
+
+            concatenated = [c for key in keys for c in candidates.get(key, [])]
+            nearest = None
+            for key in keys:
+                candidate = index.nearest(key, offset)
+                if candidate and (nearest is None or candidate[0] < nearest[0]):
+                    nearest = candidate
+            if concatenated:
+                self.assertIs(_reference_nearest(concatenated, offset), nearest[1])
+            else:
+                self.assertIsNone(nearest)
+
+    def test_nearest_predecessor(self) -> None:
+        rnd = Random(2)
+        for _ in range(self._rounds):
+            index = MentionIndex()
+            candidates = []
+            for start in rnd.sample(range(100), rnd.randrange(20)):
+                mention = _Mention(start, rnd.choice(["a", "b", "ab"]))
+                index.add(0, mention)
+                candidates.append(mention)
+            # moving some mentions to another key
+            for mention in rnd.sample(candidates, len(candidates) // 3):
+                index.remove(0, mention)
+                index.add(1, mention)
+                candidates.remove(mention)
+            offset = rnd.randrange(100)
+
+            self.assertIs(_reference_nearest_predecessor(candidates, offset), index.nearest_predecessor(0, offset))
+            accepted = [c for c in candidates if "b" in c.source]
+            self.assertIs(
+                _reference_nearest_predecessor(accepted, offset),
+                index.nearest_predecessor(0, offset, lambda c: "b" in c.source),
+            )
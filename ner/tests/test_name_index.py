@@ -0,0 +1,144 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from ner import ner_knowledge_base
+from ner.lang_modules.cs.ner_knowledge_base import KnowledgeBase
+from ner.name_index import NameIndex, build_name_index
+from ner.tests.test_kb_snapshot import KB
+
+NAME_DICT = {
+    "karel": {1, 7},
+    "capek": {1},
+    "karel capek": {1},
+    "karel havlicek": {7, 3},
+    "karel havlicek borovsky": {7},
+    "žena": {4},
+    "a": {2},
+}
+
+
+class TestNameIndex(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path_index = os.path.join(self.tmpdir.name, "namedict.idx")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_lookup(self) -> None:
+        build_name_index(NAME_DICT, self.path_index, 5)
+        index = NameIndex(self.path_index)
+        self.assertEqual("5", index.version)
+        self.assertEqual(len(NAME_DICT), len(index))
+        self.assertEqual(set(), index.fragments)
+
+        for name, lines in NAME_DICT.items():
+            self.assertIn(name, index)
+            self.assertEqual(lines, index.get(name))
+        for name in ("", "b", "kare", "karel capek ", "karel havlicek b", "zena", "žen"):
+            self.assertNotIn(name, index)
+            self.assertEqual(set(), index.get(name, set()))
+        self.assertIsNone(index.get("novak"))
+
+        # lines are copied, the index can not be changed
+        lines = index.get("karel")
+        lines.add(100)
+        self.assertEqual({1, 7}, index.get("karel"))
+
+    def test_empty_and_rebuilt_index(self) -> None:
+        build_name_index({}, self.path_index, "1")
+        self.assertIsNone(NameIndex(self.path_index).get("karel"))
+        build_name_index(NAME_DICT, self.path_index, "2", fragments={"the king"})
+        index = NameIndex(self.path_index)
+        self.assertEqual({1, 7}, index.get("karel"))
+        self.assertEqual({"the king"}, index.fragments)
+
+    def _start_kb(self, content: str) -> KnowledgeBase:
+        path_kb = os.path.join(self.tmpdir.name, "KB.tsv")
+        with open(path_kb, "w", encoding="utf-8") as f:
+            f.write(content)
+        kb = KnowledgeBase("cs")
+        kb.init_embedded(path_kb)
+        kb.start()
+        return kb
+
+    def test_knowledge_base(self) -> None:
+        kb = self._start_kb(KB)
+        path_kb = kb.kb_shm.path_kb
+        try:
+            with mock.patch.object(ner_knowledge_base, "PATH_KB", path_kb), mock.patch.object(ner_knowledge_base, "SCRIPT_DIR", self.tmpdir.name):
+                kb.initName_dict()
+                self.assertIsInstance(kb.name_dict, NameIndex)
+                self.assertEqual({1}, kb.people_named("capek"))
+                self.assertEqual({4}, kb.people_named("zena"))
+                self.assertEqual(set(), kb.people_named("cesko"))
+
+                # the index is mapped again without reading the KB
+                with mock.patch.object(kb, "get_data_at") as get_data_at:
+                    kb.initName_dict()
+                    get_data_at.assert_not_called()
+                self.assertEqual({1}, kb.people_named("karel"))
+        finally:
+            kb.end()
+
+    def test_knowledge_base_at_path(self) -> None:
+        kb = self._start_kb(KB)
+        path_kb = kb.kb_shm.path_kb
+        try:
+            # the index is checked against the opened file, not the default one (which does not exist)
+            with mock.patch.object(ner_knowledge_base, "PATH_KB", os.path.join(self.tmpdir.name, "missing.tsv")), mock.patch.object(ner_knowledge_base, "SCRIPT_DIR", self.tmpdir.name):
+                kb.initName_dict()
+                self.assertEqual({1}, kb.people_named("capek"))
+                with mock.patch.object(kb, "build_name_dict") as build_name_dict:
+                    kb.initName_dict()
+                    build_name_dict.assert_not_called()
+
+                    # a changed file of the KB is newer than the index
+                    mtime = os.stat(os.path.join(self.tmpdir.name, "ner_namedict.idx", "meta.json")).st_mtime
+                    os.utime(path_kb, (mtime + 1, mtime + 1))
+                    kb.initName_dict()
+                    build_name_dict.assert_called_once()
+        finally:
+            kb.end()
+
+    def test_parallel_and_incremental_build(self) -> None:
+        people = "".join("p%d\tperson\tOsoba%d Novák\tNovák%d\t1\tM\t\t\t\t\t1\n" % (i, i, i % 3) for i in range(20))
+        kb = self._start_kb(KB + people)
+        try:
+            self.assertEqual(24, kb.count_lines())
+            serial = os.path.join(self.tmpdir.name, "serial.idx")
+            kb.build_name_dict(serial)
+            # the scan of the KB does not go through the row cache
+            self.assertEqual(0, len(kb.row_cache))
+            expected = NameIndex(serial).to_dict()
+            self.assertEqual(set(range(5, 25)), expected["novak"])
+            self.assertEqual({1}, expected["capek"])
+
+            for workers in (2, 3, 30):
+                parallel = os.path.join(self.tmpdir.name, "parallel-%d.idx" % workers)
+                kb.build_name_dict(parallel, workers)
+                self.assertEqual(expected, NameIndex(parallel).to_dict())
+                self.assertEqual(NameIndex(serial).digests.tolist(), NameIndex(parallel).digests.tolist())
+        finally:
+            kb.end()
+
+        # a changed name, a person changed to a country and a removed last line
+        changed_kb = KB.replace("Karel Čapek", "Josef Čapek") + people.replace("\tperson\tOsoba3 ", "\tgeo:country\tOsoba3 ")
+        changed_kb = changed_kb[:changed_kb.rstrip("\n").rfind("\n") + 1]
+        kb = self._start_kb(changed_kb)
+        try:
+            rebuilt = os.path.join(self.tmpdir.name, "rebuilt.idx")
+            kb.build_name_dict(rebuilt)
+            kb.build_name_dict(parallel, 2, NameIndex(parallel))
+            # names are derived only from the changed lines
+            with mock.patch.object(kb, "get_person_names", wraps=kb.get_person_names) as get_person_names:
+                kb.build_name_dict(serial, 1, NameIndex(serial))
+            self.assertEqual([1, 8], sorted(call.args[0] for call in get_person_names.call_args_list))
+            for path_index in (serial, parallel):
+                self.assertEqual(NameIndex(rebuilt).to_dict(), NameIndex(path_index).to_dict())
+                self.assertEqual(NameIndex(rebuilt).digests.tolist(), NameIndex(path_index).digests.tolist())
+                self.assertNotIn("karel", NameIndex(path_index))
+                self.assertNotIn(8, NameIndex(path_index).get("novak"))
+        finally:
+            kb.end()
@@ -0,0 +1,111 @@
+from random import Random
+from typing import List, Set, Tuple
+from unittest import TestCase
+
+from ner.overlaps import (
+    IntervalSet,
+    remove_overlapping,
+    retain_overlapping_proper_nouns,
+)
+
+
+def _reference_remove_overlapping(intervals: List[Tuple[int, int]]) -> List[int]:
+    """Former offset-set implementation of removing shorter entities."""
+    offsets: Set[int] = set()
+    result = []
+    for i, (start, end) in enumerate(intervals):
+        current = set(range(start, end))
+        if current & offsets == set():
+            offsets.update(current)
+            result.append(i)
+    return result
+
+
+def _reference_retain_overlapping_proper_nouns(
+    intervals: List[Tuple[int, int]], proper_nouns: List[Tuple[int, int]], text: str
+) -> List[int]:
+    """Former offset-set implementation of resolving overlapping entities and proper nouns."""
+    proper_nouns_offsets: Set[int] = set()
+    entities_offsets: Set[int] = set()
+    proper_nouns_index = {}
+    for pn in proper_nouns:
+        proper_noun_offsets = range(pn[0], pn[1])
+        proper_nouns_offsets.update(proper_noun_offsets)
+        for pno in proper_noun_offsets:
+            proper_nouns_index[pno] = pn
+    for start, end in intervals:
+        entities_offsets.update(range(start, end))
+    diff_pn_e = proper_nouns_offsets - entities_offsets
+    spaces_in_diff_pn_e = set([o for o in diff_pn_e if text[o] == " "])
+    solitary_spaces = set(
+        [o for o in spaces_in_diff_pn_e if (o - 1 not in spaces_in_diff_pn_e) and (o + 1 not in spaces_in_diff_pn_e)]
+    )
+    result = []
+    for i, (start, end) in enumerate(intervals):
+        overlap = proper_nouns_offsets & set(range(start, end))
+        if overlap:
+            for opn in set([proper_nouns_index[o] for o in overlap]):
+                diff_opn_e = set(range(opn[0], opn[1])) - entities_offsets
+                spaces = [o for o in diff_opn_e if (text[o] == " ") and (o not in solitary_spaces)]
+                apostrophes = [o for o in diff_opn_e if text[o] == "'"]
+                if not spaces or apostrophes:
+                    result.append(i)
+                    break
+        else:
+            result.append(i)
+    return result
+
+
+class TestOverlaps(TestCase):
+    _rounds: int = 500
+
+    def _random_intervals(self, rnd: Random, length: int, count: int, max_len: int) -> List[Tuple[int, int]]:
+        result = []
+        for _ in range(count):
+            start = rnd.randrange(length)
+            result.append((start, min(length, start + rnd.randrange(max_len + 1))))
+        return result
+
+    def _random_proper_nouns(self, rnd: Random, length: int) -> List[Tuple[int, int]]:
+        result = []
+        offset = rnd.randrange(3)
+        while offset < length:
+            end = min(length, offset + 1 + rnd.randrange(12))
+            result.append((offset, end))
+            offset = end + rnd.randrange(6)
+        return result
+
+    def test_interval_set(self) -> None:
+        rnd = Random(1)
+        for _ in range(self._rounds):
+            intervals = self._random_intervals(rnd, 60, rnd.randrange(10), 10)
+            interval_set = IntervalSet(intervals[: len(intervals) // 2])
+            for start, end in intervals[len(intervals) // 2 :]:
+                interval_set.add(start, end)
+            offsets = set(o for start, end in intervals for o in range(start, end))
+
+            self.assertEqual(offsets, set(o for start, end in interval_set for o in range(start, end)))
+            for start, end in self._random_intervals(rnd, 60, 20, 10):
+                self.assertEqual(bool(offsets & set(range(start, end))), interval_set.overlaps(start, end))
+                self.assertEqual(
+                    set(range(start, end)) - offsets,
+                    set(o for s, e in interval_set.uncovered(start, end) for o in range(s, e)),
+                )
+
+    def test_remove_overlapping(self) -> None:
+        rnd = Random(2)
+        for _ in range(self._rounds):
+            intervals = self._random_intervals(rnd, 80, rnd.randrange(30), 12)
+            self.assertEqual(_reference_remove_overlapping(intervals), remove_overlapping(intervals))
+
+    def test_retain_overlapping_proper_nouns(self) -> None:
+        rnd = Random(3)
+        for _ in range(self._rounds):
+            text = "".join(rnd.choice("Ab  '.") for _ in range(80))
+            proper_nouns = self._random_proper_nouns(rnd, len(text))
+            intervals = self._random_intervals(rnd, len(text), rnd.randrange(15), 10)
+            self.assertEqual(
+                _reference_retain_overlapping_proper_nouns(intervals, proper_nouns, text),
+                retain_overlapping_proper_nouns(intervals, proper_nouns, text),
+                (text, proper_nouns, intervals),
+            )
@@ -0,0 +1,50 @@
+import re
+from random import Random
+from typing import Iterable, List, Tuple
+from unittest import TestCase
+
+from libs.utils import _remove_accent_unicode, remove_accent_unicode
+from ner.proper_nouns import ProperNounScanner
+
+
+def _reference_find_proper_nouns(text: str, preps: Iterable[str], titles: List[str]) -> List[Tuple[int, int]]:
+    """Former implementation of finding proper nouns (ASCII letters only)."""
+    re_proper_noun_preps = ""
+    for prep in preps:
+        re_proper_noun_preps += r"| {}".format(re.escape(prep))
+    proper_noun_regex = re.compile(
+        r"(?<!\. |\? |! |: |\s{2})[A-Z][A-Za-z\'\-]*( [A-Z][A-Za-z\'\-]*" + re_proper_noun_preps + r")* [A-Z][A-Za-z\'\-]*"
+    )
+    result = []
+    for pn in re.finditer(proper_noun_regex, text):
+        fields = pn.group(0).split()
+        if fields[0] not in titles and pn.start() != 0:
+            result.append((pn.start(), pn.end()))
+    return result
+
+
+class TestProperNouns(TestCase):
+    _rounds: int = 500
+
+    def test_remove_accent_unicode(self) -> None:
+        rnd = Random(1)
+        alphabet = "Ab .čáČÁŁßﬁְ́가① \x00"
+        for _ in range(self._rounds):
+            text = "".join(rnd.choice(alphabet) for _ in range(rnd.randrange(12)))
+            self.assertEqual(_remove_accent_unicode(text), remove_accent_unicode(text), repr(text))
+
+    def test_find(self) -> None:
+        rnd = Random(2)
+        preps = {"the", "upon"}
+        titles = ["Sir", "King"]
+        scanner = ProperNounScanner(preps, titles)
+        words = ["Sir", "King", "John", "Smith", "A", "the", "upon", "and", "O'Neil", "x-Ray", ".", "?", ":", ""]
+        for _ in range(self._rounds):
+            text = " ".join(rnd.choice(words) for _ in range(rnd.randrange(15)))
+            self.assertEqual(_reference_find_proper_nouns(text, preps, titles), scanner.find(text), text)
+
+    def test_scan(self) -> None:
+        scanner = ProperNounScanner(set(), [])
+        text, proper_nouns = scanner.scan("Řekl, že Eduard Ovčáček a Łukasz Nowak přijdou.")
+        self.assertEqual("Rekl, ze Eduard Ovcacek a Łukasz Nowak prijdou.", text)
+        self.assertEqual([(9, 23), (26, 38)], proper_nouns)
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from unittest import TestCase, mock, skipUnless
+
+from ner import ner_knowledge_base
+from ner.lang_modules.cs.ner_knowledge_base import KnowledgeBase
+from ner.tests.test_figa_marker import FIGA_BINARY
+from ner.tests.test_kb_snapshot import KB
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the script ner.py (not the package ner), it imports the marker of figa
+try:
+    _spec = importlib.util.spec_from_file_location("ner_script", os.path.join(ROOT_DIR, "ner.py"))
+    ner_script = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(ner_script)
+except ImportError:
+    ner_script = None
+
+NAMELIST = "Karel Čapek\t1\nČapek\t1\nČesko\t2\n"
+
+DOCUMENTS = [
+    "Karel Čapek se narodil v Česku.\n\nČesko a Čapek.",
+    "Česko",
+    "",
+    "Karel Čapek, Česko, Karel Čapek.",
+]
+
+
+@skipUnless(ner_script is not None and os.access(FIGA_BINARY, os.X_OK), "figa is not built")
+class TestRecognizeMany(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, "namelist.txt"), "w", encoding="utf-8") as f:
+            f.write(NAMELIST)
+        subprocess.run(
+            [FIGA_BINARY, "-n", "-d", "namelist.txt", "-w", "automata.dct"],
+            cwd=self.tmpdir.name, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True,
+        )
+        path_kb = os.path.join(self.tmpdir.name, "KB.tsv")
+        with open(path_kb, "w", encoding="utf-8") as f:
+            f.write(KB)
+
+        patches = (
+            mock.patch.object(ner_script, "DEFAULT_INDIR", self.tmpdir.name),
+            mock.patch.object(ner_script, "seek_names", None),
+            mock.patch.object(ner_knowledge_base, "PATH_KB", path_kb),
+            mock.patch.object(ner_knowledge_base, "SCRIPT_DIR", self.tmpdir.name),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.kb = KnowledgeBase("cs")
+        self.kb.init_embedded(path_kb)
+        self.kb.start()
+        self.addCleanup(self.kb.end)
+        self.kb.initName_dict()
+        # recognize() expects language dependent globals loaded (as by main())
+        ner_script.init_lang(self.kb.lang)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_same_as_recognize(self) -> None:
+        for options in ({}, {"print_score": True}, {"print_all": True}):
+            results = list(ner_script.recognize_many(self.kb, iter(DOCUMENTS), **options))
+            self.assertEqual(len(DOCUMENTS), len(results))
+            for document, result in zip(DOCUMENTS, results):
+                expected = ner_script.recognize(self.kb, document, print_result=False, **options)
+                self.assertEqual(ner_script.format_entities(expected), ner_script.format_entities(result))
+            self.assertIn("Karel Čapek", ner_script.format_entities(results[0]))
+
+        # the setup is done once for the batch
+        with mock.patch.object(self.kb, "check_row_cache", wraps=self.kb.check_row_cache) as check_row_cache, \
+        mock.patch.object(ner_script, "init_lang", wraps=ner_script.init_lang) as init_lang:
+            self.assertEqual(len(DOCUMENTS), len(list(ner_script.recognize_many(self.kb, DOCUMENTS))))
+        check_row_cache.assert_called_once_with()
+        init_lang.assert_called_once_with(self.kb.lang)
+
+    def test_paragraph_shards(self) -> None:
+        # names, a date and an interval in paragraphs split into shards of several paragraphs
+        paragraphs = ["Karel Čapek se narodil 9. ledna 1890 v Česku.", "Čapek a Česko.", "Od 1. 1. 1900 do 2. 2. 1910 Karel Čapek."]
+        document = "\n\n".join(paragraphs[i % len(paragraphs)] for i in range(42))
+        # functions of the script are pickled for the workers by the name of its module
+        with mock.patch.object(ner_script, "PARAGRAPH_SHARD_MIN_LENGTH", 100), mock.patch.dict(sys.modules, {ner_script.__name__: ner_script}):
+            self.assertEqual(4, len(ner_script.shard_paragraphs(document, 4)))
+            for options in ({}, {"print_score": True}, {"print_all": True}, {"find_names": True}):
+                expected = ner_script.recognize(self.kb, document, print_result=False, **options)
+                result = ner_script.recognize(self.kb, document, print_result=False, paragraph_workers=4, **options)
+                self.assertEqual(ner_script.format_entities(expected), ner_script.format_entities(result))
+                self.assertEqual(28, ner_script.format_entities(result).count("Karel Čapek"))
+
+
+@skipUnless(ner_script is not None, "figa is not built")
+class TestDaemonDocuments(TestCase):
+    TOKENS = {"NER_NEW_FILE", "NER_END", "NER_NEW_FILE_SCORE", "NER_END_SCORE"}
+
+    def read(self, data: bytes):
+        return list(ner_script.read_daemon_documents(io.BytesIO(data), self.TOKENS))
+
+    def test_tokens(self) -> None:
+        data = "Karel Čapek\n\nPraha \nNER_NEW_FILE\nNER_NEW_FILE_SCORE\nBrno\nNER_END_SCORE\nignored\nNER_END\n".encode()
+        self.assertEqual([
+            ("NER_NEW_FILE", "Karel Čapek\n\nPraha\n"),
+            ("NER_NEW_FILE_SCORE", ""),
+            ("NER_END_SCORE", "Brno\n"),
+        ], self.read(data))
+        # an unterminated document at the end of the stream is not recognized
+        self.assertEqual([("NER_NEW_FILE", "Brno\n")], self.read(b"Brno\nNER_NEW_FILE\nPraha\n"))
+        self.assertEqual([], self.read(b""))
+
+    def test_length_header(self) -> None:
+        body = "Karel Čapek\nNER_END\nNER_LENGTH 3\r\nPraha  ".encode()
+        data = b"NER_LENGTH %d\n" % len(body) + body + b"\nNER_NEW_FILE_SCORE\n"
+        # the header may be repeated and combined with lines
+        data += b"NER_LENGTH 4\nBrnoNER_LENGTH 6\n\xc4\x8ceskoNER_NEW_FILE\nline\nNER_LENGTH 0\nNER_END\n"
+        self.assertEqual([
+            ("NER_NEW_FILE_SCORE", "Karel Čapek\nNER_END\nNER_LENGTH 3\r\nPraha  \n"),
+            ("NER_NEW_FILE", "Brno\u010cesko"),
+            ("NER_END", "line\n"),
+        ], self.read(data))
+        # a header without a non-negative decimal number is a line of the document
+        self.assertEqual([("NER_NEW_FILE", "NER_LENGTH -1\nabc\n"), ("NER_END", "x\n")],
+                         self.read(b"NER_LENGTH -1\nabc\nNER_NEW_FILE\nx\nNER_END\n"))
+        self.assertEqual([("NER_END", "NER_LENGTH abc\nNER_LENGTH +1\nNER_LENGTH\n")],
+                         self.read(b"NER_LENGTH abc\nNER_LENGTH +1\nNER_LENGTH\nNER_END\n"))
+        # a body may end inside of a character completed by the next body or line
+        self.assertEqual([("NER_END", "\u010c\n")], self.read(b"NER_LENGTH 1\n\xc4\x8c\nNER_END\n"))
+        self.assertEqual([("NER_END", "\u010c")], self.read(b"NER_LENGTH 1\n\xc4NER_LENGTH 1\n\x8cNER_END\n"))
+        # a short body is the end of stream
+        self.assertEqual([("NER_NEW_FILE", "Brno\n")], self.read(b"Brno\nNER_NEW_FILE\nNER_LENGTH 10\nPraha\n"))
+
+    def test_options(self) -> None:
+        self.assertEqual({"print_all": False}, ner_script.daemon_recognize_options("NER_NEW_FILE"))
+        self.assertEqual({"print_all": True}, ner_script.daemon_recognize_options("NER_END_ALL"))
+        self.assertEqual({"print_score": True}, ner_script.daemon_recognize_options("NER_NEW_FILE_SCORE"))
+        self.assertEqual({"find_names": True}, ner_script.daemon_recognize_options("NER_END_NAMES"))
+
+
+def _recognize_request(request):
+    """Recognizes a request of RecognitionServer by echoing its mode and text."""
+    mode, text = request
+    if text == "fail":
+        raise RuntimeError("recognition failed")
+    if text == "slow":
+        time.sleep(0.2)
+    return mode, "\n".join((mode, text)) if text else "", None
+
+
+@skipUnless(ner_script is not None, "figa is not built")
+class TestRecognitionServer(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "ner.sock")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    async def _requests(self, connections):
+        server = ner_script.RecognitionServer(_recognize_request, 2, 2)
+        serving = asyncio.ensure_future(server.serve("unix:" + self.path))
+        try:
+            while not os.path.exists(self.path):
+                await asyncio.sleep(0.01)
+
+            async def send(lines):
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                # all requests are sent before reading responses
+                writer.write(b"".join(line + b"\n" for line in lines))
+                await writer.drain()
+                writer.write_eof()
+                responses = [json.loads(line) async for line in reader]
+                writer.close()
+                return responses
+
+            return await asyncio.gather(*(send(lines) for lines in connections))
+        finally:
+            serving.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await serving
+
+    def test_pipelined_requests(self) -> None:
+        first = [
+            json.dumps({"id": 1, "text": "slow"}).encode(),
+            json.dumps({"id": 2, "text": "Praha", "mode": "score"}).encode(),
+            b"",
+            b"{",
+            json.dumps({"id": 3, "text": "fail"}).encode(),
+            json.dumps({"id": 4, "text": "Brno", "mode": "unknown"}).encode(),
+            json.dumps({"id": 5, "text": 1}).encode(),
+            json.dumps({"id": 6, "text": ""}).encode(),
+        ]
+        second = [json.dumps({"id": i, "text": "Čapek %d" % i, "mode": "all"}, ensure_ascii=False).encode() for i in range(10)]
+        with contextlib.redirect_stderr(io.StringIO()):
+            first_responses, second_responses = asyncio.run(self._requests([first, second]))
+
+        # responses in the order of requests (the slow one is the first), empty lines are skipped
+        self.assertEqual([1, 2, None, 3, 4, 5, 6], [response["id"] for response in first_responses])
+        self.assertEqual({"id": 1, "entities": ["DEFAULT", "slow"]}, first_responses[0])
+        self.assertEqual({"id": 2, "entities": ["SCORE", "Praha"]}, first_responses[1])
+        self.assertTrue(first_responses[2]["error"].startswith("Invalid request:"))
+        self.assertEqual({"id": 3, "error": "recognition failed"}, first_responses[3])
+        self.assertIn("Unknown mode", first_responses[4]["error"])
+        self.assertIn("has to be a string", first_responses[5]["error"])
+        self.assertEqual({"id": 6, "entities": []}, first_responses[6])
+        self.assertEqual([{"id": i, "entities": ["ALL", "Čapek %d" % i]} for i in range(10)], second_responses)
+
+
+@skipUnless(ner_script is not None, "figa is not built")
+class TestShardParagraphs(TestCase):
+    def check_shards(self, text: str, count: int, min_length: int) -> list:
+        with mock.patch.object(ner_script, "PARAGRAPH_SHARD_MIN_LENGTH", min_length):
+            shards = ner_script.shard_paragraphs(text, count)
+        # shards cover the text and start at paragraphs
+        self.assertEqual(0, shards[0][0])
+        self.assertEqual(len(text), shards[-1][1])
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            self.assertEqual(end, start)
+            self.assertIn(start, ner_script.offsets_of_paragraphs(text))
+        self.assertLessEqual(len(shards), count)
+        if len(shards) > 1:
+            for start, end in shards:
+                self.assertGreaterEqual(end - start, min_length)
+        return shards
+
+    def test_boundaries(self) -> None:
+        text = "\n\n".join(["a" * 8] * 10)
+        self.assertEqual([(0, len(text))], self.check_shards(text, 1, 1))
+        self.assertEqual([(0, 50), (50, 98)], self.check_shards(text, 2, 1))
+        self.assertEqual(10, len(self.check_shards(text, 10, 1)))
+        self.assertEqual(10, len(self.check_shards(text, 20, 1)))
+        # no shard is shorter than the minimal length, a short document is not split
+        self.assertEqual([(0, 30), (30, 60), (60, 98)], self.check_shards(text, 10, 25))
+        self.assertEqual([(0, len(text))], self.check_shards(text, 4, 60))
+        self.assertEqual([(0, 100)], self.check_shards("a" * 100, 4, 1))
+        self.assertEqual([(0, 0)], self.check_shards("", 4, 1))
+
+        # paragraphs are separated by more empty lines of any line ends
+        text = "Praha\r\n\r\nBrno\r\rOstrava\n\n\n\nPlzeň\nKladno"
+        self.assertEqual([(0, 9), (9, 15), (15, 26), (26, len(text))], self.check_shards(text, 8, 1))
+
+    def test_random(self) -> None:
+        rnd = random.Random(1)
+        for _ in range(100):
+            text = "\n\n".join("x" * rnd.randrange(1, 50) for _ in range(rnd.randrange(1, 40)))
+            self.check_shards(text, rnd.randrange(1, 10), rnd.randrange(1, 200))
+
+
+Mention = namedtuple("Mention", "start_offset label")
+
+
+def _insert_names_by_loop(entities_and_dates, names):
+    """Inserts names into entities and dates one by one as add_unknown_names() did before insert_names()."""
+    for nne in names:
+        for i in range(len(entities_and_dates)):
+            if i == len(entities_and_dates)-1:
+                entities_and_dates.append(nne)
+                break
+            elif nne.start_offset >= entities_and_dates[i].start_offset and \
+            nne.start_offset < entities_and_dates[i+1].start_offset:
+                entities_and_dates.insert(i+1, nne)
+                break
+            elif nne.start_offset < entities_and_dates[0].start_offset:
+                entities_and_dates.insert(0, nne)
+                break
+    return entities_and_dates
+
+
+@skipUnless(ner_script is not None, "figa is not built")
+class TestInsertNames(TestCase):
+    def test_same_order_as_loop(self) -> None:
+        rnd = random.Random(1)
+        for _ in range(500):
+            # the loop dropped names into an empty list and appended them after a single entity
+            entities_and_dates = sorted((Mention(rnd.randrange(20), "e%d" % i) for i in range(rnd.randrange(2, 10))), key=lambda m: m.start_offset)
+            names = [Mention(rnd.randrange(-2, 22), "n%d" % i) for i in range(rnd.randrange(6))]
+            if rnd.random() < 0.5:
+                # the name recognizer returns names in the order of the text
+                names.sort(key=lambda m: m.start_offset)
+            self.assertEqual(_insert_names_by_loop(list(entities_and_dates), names), ner_script.insert_names(entities_and_dates, names))
+
+    def test_short_lists(self) -> None:
+        names = [Mention(3, "n0"), Mention(1, "n1")]
+        self.assertEqual([names[1], names[0]], ner_script.insert_names([], names))
+        entity = Mention(2, "e0")
+        self.assertEqual([names[1], entity, names[0]], ner_script.insert_names([entity], names))
+        self.assertEqual([entity], ner_script.insert_names([entity], []))
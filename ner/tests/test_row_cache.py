@@ -0,0 +1,134 @@
+from collections import Counter
+from typing import Dict, Optional
+from unittest import TestCase
+
+from ner.lang_modules.cs.ner_knowledge_base import KnowledgeBase
+from ner.row_cache import RowFeatureCache
+
+
+class FakeSharedKB(object):
+    """Shared memory of a KB counting its calls."""
+
+    def __init__(self, rows: Dict[int, Dict[str, str]]) -> None:
+        self.rows = rows
+        self.kb_version = "1"
+        self.calls: Counter = Counter()
+
+    def version(self) -> str:
+        return self.kb_version
+
+    def dataType(self, line: int) -> str:
+        self.calls["dataType"] += 1
+        return self.rows[line]["TYPE"]
+
+    def dataFor(self, line: int, col_name: str, col_name_type: Optional[str] = None) -> str:
+        self.calls["dataFor"] += 1
+        return self.rows[line].get(col_name, "")
+
+
+class TestRowFeatureCache(TestCase):
+    def test_lru(self) -> None:
+        decoded = []
+
+        def decode(line: int) -> int:
+            decoded.append(line)
+            return line * 10
+
+        cache = RowFeatureCache(2)
+        self.assertEqual(10, cache.get(1, "x", decode))
+        self.assertEqual(20, cache.get(2, "x", decode))
+        self.assertEqual(10, cache.get(1, "x", decode))
+        # the least recently used row 2 is evicted
+        self.assertEqual(30, cache.get(3, "x", decode))
+        self.assertEqual(20, cache.get(2, "x", decode))
+        self.assertEqual([1, 2, 3, 2], decoded)
+        self.assertEqual(2, len(cache))
+        self.assertEqual({"hits": 1, "misses": 4, "rows": 2, "capacity": 2, "version": None}, cache.stats())
+
+        # other features of a cached row are decoded separately
+        self.assertEqual(20, cache.get(2, "y", decode))
+        self.assertEqual(5, cache.stats()["misses"])
+
+    def test_version(self) -> None:
+        cache = RowFeatureCache()
+        cache.check_version("1")
+        cache.get(1, "x", lambda line: "old")
+        cache.check_version("1")
+        self.assertEqual("old", cache.get(1, "x", lambda line: "new"))
+        cache.check_version("2")
+        self.assertEqual(0, len(cache))
+        self.assertEqual("new", cache.get(1, "x", lambda line: "new"))
+
+
+class TestKnowledgeBaseRowCache(TestCase):
+    def setUp(self) -> None:
+        self.kb = KnowledgeBase("cs")
+        self.kb.kb_shm = FakeSharedKB({
+            1: {"TYPE": "person", "CONFIDENCE": "12.5", "GENDER": "M", "NATIONALITIES": "Česká|slovenská", "DATE OF BIRTH": "1950", "DATE OF DEATH": ""},
+            2: {"TYPE": "geo:country", "CONFIDENCE": "80"},
+            3: {"TYPE": "organization", "CONFIDENCE": "1", "NAME": "VUT", "LOCATION": "Brno", "FOUNDED": "1899"},
+        })
+
+    def test_cached_features(self) -> None:
+        kb = self.kb
+        kb.check_row_cache()
+        for _ in range(3):
+            self.assertEqual("person", kb.get_ent_type(1))
+            self.assertEqual(12.5, kb.get_score(1))
+            self.assertEqual(80.0, kb.get_score(2))
+            self.assertEqual("M", kb.get_data_for(1, "GENDER"))
+            self.assertEqual(["Česká", "slovenská"], kb.get_data_for(1, "NATIONALITIES", separator="|"))
+            self.assertEqual({"1950"}, kb.get_dates(1))
+            self.assertEqual(frozenset(), kb.get_dates(2))
+            self.assertEqual({"česká", "slovenská"}, kb.get_nationalities(1))
+        # each value is read from the shared memory only once
+        self.assertEqual({"dataType": 2, "dataFor": 6}, dict(kb.kb_shm.calls))
+        # 13 features of both rows (including the columns they are decoded from) are decoded only once
+        self.assertEqual(13, kb.row_cache.stats()["misses"])
+
+    def test_version_change(self) -> None:
+        kb = self.kb
+        kb.check_row_cache()
+        self.assertEqual(12.5, kb.get_score(1))
+        kb.kb_shm.rows[1]["CONFIDENCE"] = "3"
+        kb.check_row_cache()
+        self.assertEqual(12.5, kb.get_score(1))
+        kb.kb_shm.kb_version = "2"
+        kb.check_row_cache()
+        self.assertEqual(3.0, kb.get_score(1))
+
+    def test_prefetch_rows(self) -> None:
+        kb = self.kb
+        kb.check_row_cache()
+        # the row cache can not hold all rows of the document
+        kb.row_cache = RowFeatureCache(1)
+        document_kb = kb.prefetch_rows({3, 1, 2})
+        self.assertIsInstance(document_kb, KnowledgeBase)
+        self.assertIsNone(kb.document_rows)
+        self.assertEqual([1, 2, 3], sorted(document_kb.document_rows))
+        # each row is read once, only columns of its type besides TYPE and CONFIDENCE (7 + 2 + 4)
+        calls = dict(kb.kb_shm.calls)
+        self.assertEqual({"dataType": 3, "dataFor": 3 + 7 + 2 + 4}, calls)
+
+        # the disambiguation of the document reads only prefetched features
+        self.assertEqual("person", document_kb.get_ent_type(1))
+        self.assertEqual(12.5, document_kb.get_score(1))
+        self.assertEqual(frozenset({"1950"}), document_kb.get_dates(1))
+        self.assertEqual({"česká", "slovenská"}, document_kb.get_nationalities(1))
+        self.assertEqual("M", document_kb.get_data_for(1, "GENDER"))
+        self.assertEqual(["Česká", "slovenská"], document_kb.get_data_for(1, "NATIONALITIES", separator="|"))
+        self.assertEqual(80.0, document_kb.get_score(2))
+        self.assertEqual("", document_kb.get_data_for(2, "COUNTRY"))
+        self.assertEqual(["Brno", "1899", ""], [document_kb.get_data_for(3, col) for col in ("LOCATION", "FOUNDED", "CANCELLED")])
+        self.assertEqual(calls, dict(kb.kb_shm.calls))
+
+        # other features are read as by the knowledge base
+        self.assertEqual("", document_kb.get_data_for(2, "GENDER"))
+        self.assertEqual(calls["dataFor"] + 1, kb.kb_shm.calls["dataFor"])
+
+        # features cached by previous documents are not read again
+        kb.row_cache = RowFeatureCache()
+        self.assertEqual(12.5, kb.get_score(1))
+        kb.kb_shm.calls.clear()
+        kb.prefetch_rows([1])
+        self.assertEqual({"dataType": 1, "dataFor": 7}, dict(kb.kb_shm.calls))
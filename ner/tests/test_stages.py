@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from ner.stages import NO_TRACE, StageTrace
+
+
+class TestStageTrace(TestCase):
+    def test_stages(self) -> None:
+        calls = []
+        trace = StageTrace(lambda timing, entities: calls.append((timing.name, entities)))
+        trace.start()
+        trace.stage("preprocessing")
+        trace.stage("figa", [1, 2, 3])
+        trace.stage("filter", [1])
+        trace.stage("output")
+
+        self.assertEqual(
+            [("preprocessing", None, None), ("figa", None, 3), ("filter", 3, 1), ("output", 1, None)],
+            [(t.name, t.entities_in, t.entities_out) for t in trace.timings],
+        )
+        self.assertTrue(all(t.duration >= 0 for t in trace.timings))
+        self.assertEqual([("preprocessing", None), ("figa", [1, 2, 3]), ("filter", [1]), ("output", None)], calls)
+
+        timings = trace.as_dict()
+        self.assertEqual(["preprocessing", "figa", "filter", "output"], [s["name"] for s in timings["stages"]])
+        self.assertAlmostEqual(sum(s["duration"] for s in timings["stages"]), timings["duration"])
+
+        # starting again discards timings of a previous document
+        trace.start()
+        self.assertEqual([], trace.timings)
+
+    def test_no_trace(self) -> None:
+        NO_TRACE.start()
+        NO_TRACE.stage("figa", [1])
+        self.assertFalse(hasattr(NO_TRACE, "timings"))